@@ -11,7 +11,10 @@ https://docs.djangoproject.com/en/6.0/ref/settings/
 """
 
 from pathlib import Path
+
+from corsheaders.defaults import default_headers
 import os
+import sys
 
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
@@ -45,7 +48,10 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "core.middleware.RequestIdMiddleware",  # Primero: todo lo que se loguee lleva el id
     "django.middleware.security.SecurityMiddleware",
+    "core.middleware.CompresionMiddleware",  # Brotli/gzip (antes de todo lo que toque el body)
+    "core.middleware.ReplicaMiddleware",  # Réplica de lectura / "leer lo que escribí"
     "django.contrib.sessions.middleware.SessionMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -73,6 +79,7 @@ TEMPLATES = [
 ]
 
 WSGI_APPLICATION = "backend.wsgi.application"
+ASGI_APPLICATION = "backend.asgi.application"
 
 
 # Database
@@ -89,6 +96,27 @@ DATABASES = {
     }
 }
 
+# --- RÉPLICA DE LECTURA (core/replica.py) ---
+# Con DB_REPLICA_HOST definido, listados, exportaciones y reportes leen de la
+# réplica. Sin réplica todo sigue yendo a "default".
+# En una máquina de desarrollo, DB_REPLICA_HOST=localhost arma los dos alias
+# contra la misma base (sirve para ver el ruteo sin levantar una réplica).
+if os.environ.get("DB_REPLICA_HOST"):
+    DATABASES["replica"] = {
+        **DATABASES["default"],
+        "HOST": os.environ["DB_REPLICA_HOST"],
+        "PORT": os.environ.get("DB_REPLICA_PORT", DATABASES["default"]["PORT"]),
+        "TEST": {"MIRROR": "default"},
+    }
+elif sys.argv[1:2] == ["test"]:
+    # Los tests siempre tienen el alias (espejo de la base de test) para probar
+    # el ruteo y el "leer lo que escribí"; solo lo usa ReplicaTests (core/tests.py)
+    DATABASES["replica"] = {**DATABASES["default"], "TEST": {"MIRROR": "default"}}
+DATABASE_ROUTERS = ["core.replica.ReplicaRouter"]
+REPLICA_PEGADO_SEGUNDOS = 10  # Tras escribir, el cliente lee de la primaria este tiempo
+# False: todo se lee de la primaria aunque haya réplica (p. ej. si se atrasó mucho)
+REPLICA_LECTURAS = os.environ.get("REPLICA_LECTURAS", "1") == "1" and sys.argv[1:2] != ["test"]
+
 
 # Password validation
 # https://docs.djangoproject.com/en/6.0/ref/settings/#auth-password-validators
@@ -132,6 +160,10 @@ CORS_ALLOWED_ORIGINS = [
     "http://127.0.0.1:5173",
     "http://localhost:8080",
 ]
+# El frontend manda Idempotency-Key en altas y cambios de estado (core/idempotencia.py)
+# y reenvía X-Primaria-Hasta después de escribir (core/replica.py)
+CORS_ALLOW_HEADERS = (*default_headers, "idempotency-key", "x-primaria-hasta")
+CORS_EXPOSE_HEADERS = ["Idempotent-Replayed", "X-Primaria-Hasta"]
 
 # Configuración de Email para Desarrollo
 # En lugar de enviar, lo muestra en la consola (Terminal de Python)
@@ -147,3 +179,95 @@ MEDIA_ROOT = BASE_DIR / "media"
 EMAIL_BACKEND = "django.core.mail.backends.console.EmailBackend"
 EMAIL_HOST = "localhost"
 EMAIL_PORT = 1025
+
+# --- EVENTOS EN TIEMPO REAL (SSE) ---
+# La API corre en workers WSGI y /api/eventos/ en un proceso ASGI aparte: el
+# broker tiene que ser compartido. BrokerPostgres usa LISTEN/NOTIFY de la base
+# (una conexión extra por worker ASGI). "core.eventos.BrokerLocal" (en memoria)
+# solo sirve si publicar y escuchar pasan en el mismo proceso (runserver).
+EVENTOS_BROKER = os.environ.get("EVENTOS_BROKER", "core.eventos.BrokerPostgres")
+EVENTOS_HEARTBEAT = 15  # Segundos entre "pings" para mantener viva la conexión
+
+# --- SINCRONIZACIÓN INCREMENTAL (?since=) ---
+# Segundos que se "rebobina" el cursor para no perder transacciones lentas
+DELTA_SYNC_MARGEN = 2
+
+# --- COMPRESIÓN DE RESPUESTAS (core.middleware.CompresionMiddleware) ---
+COMPRESION_MINIMO = 1024  # Bytes: por debajo no vale la pena comprimir
+COMPRESION_NIVEL_BROTLI = 5  # 0-11 (más alto = más chico pero más CPU)
+COMPRESION_NIVEL_GZIP = 6  # 1-9
+
+# --- COLA DE TRABAJO DE RRHH ---
+RRHH_LEASE_MINUTOS = 15  # Tiempo que un operador retiene las solicitudes que reclamó
+
+# --- CALENDARIO LABORAL ---
+CALENDARIO_CACHE_SEGUNDOS = 300  # Cada proceso relee el mapa anual de feriados cada 5 minutos
+
+# --- LÍMITES DE INTENTOS (core.throttles, contadores atómicos en la caché) ---
+# En producción con varios workers, configurar CACHES con Redis o Memcached
+# para que los contadores sean compartidos (LocMemCache es por proceso).
+# Hasta "intentos" por ventana deslizante de "segundos".
+LIMITES_ACCESO = {
+    "login_ip": {"intentos": 30, "segundos": 60},
+    "login_legajo": {"intentos": 5, "segundos": 150},
+    "activacion_ip": {"intentos": 10, "segundos": 120},
+    "activacion_legajo": {"intentos": 5, "segundos": 300},
+}
+
+# Cuántos proxies propios (nginx, balanceador) agregan X-Forwarded-For delante de
+# Django. Con 0 la IP de los límites es REMOTE_ADDR: el header lo puede inventar
+# cualquiera y abriría un contador nuevo por request.
+REST_FRAMEWORK = {
+    "NUM_PROXIES": int(os.environ.get("NUM_PROXIES", "0")),
+}
+
+# --- RESUMEN DE AVISOS PARA JEFES (manage.py enviar_resumenes) ---
+RESUMEN_AVISOS_MINUTOS = 60  # Cada cuánto recibe un jefe el resumen de novedades
+
+# --- BUSCADOR DE AGENTES (core/busqueda.py) ---
+# En PostgreSQL usa pg_trgm. En otras bases arma un índice en memoria que se
+# rearma cada tantos segundos para ver los agentes cargados por otros procesos.
+BUSQUEDA_CACHE_SEGUNDOS = 300
+
+# --- DESCUENTOS PARA LIQUIDACIÓN DE HABERES (manage.py lote_descuentos) ---
+DESCUENTOS_CONCEPTO = "DESC_SIN_AVISO"  # Código de concepto que espera Liquidación
+DESCUENTOS_CONCEPTO_FALTAS = "DESC_FALTA_RELOJ"  # Días sin marcar ni justificar
+
+# --- FORMULARIO DE NUEVA SOLICITUD (/api/agentes/<id>/formulario/) ---
+# Se invalida solo cuando el agente carga/modifica solicitudes; el catálogo
+# de licencias y los jefes se refrescan al vencer este tiempo.
+FORMULARIO_CACHE_SEGUNDOS = 300
+
+# --- IDEMPOTENCY-KEY EN ALTAS Y CAMBIOS DE ESTADO (core/idempotencia.py) ---
+IDEMPOTENCIA_HORAS = 24  # Cuánto se guarda la respuesta de cada clave (purgar_idempotencia)
+IDEMPOTENCIA_RESERVA_SEGUNDOS = 60  # Si el primer intento murió, a los cuánto se puede reintentar (se renueva mientras procesa)
+
+# --- ARCHIVO ANUAL DE SOLICITUDES CERRADAS (manage.py archivar_solicitudes) ---
+ARCHIVO_ANIOS_VIVOS = 1  # Años que quedan en la tabla principal (1 = solo el año en curso)
+
+# --- ADMIN (core/admin.py) ---
+# Por encima de esta cantidad estimada de filas el admin muestra el total
+# aproximado del planificador de PostgreSQL en lugar de hacer COUNT(*).
+ADMIN_CONTEO_EXACTO_HASTA = 10000
+
+# --- LOGS (JSON por una cola, sin bloquear los requests; ver core/registro.py) ---
+LOG_NIVEL = os.environ.get("LOG_NIVEL", "INFO")
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "filters": {"request_id": {"()": "core.registro.FiltroRequestId"}},
+    "formatters": {"json": {"()": "core.registro.FormatoJSON"}},
+    "handlers": {
+        "cola": {
+            "()": "core.registro.ColaHandler",
+            "stream": "ext://sys.stdout",
+            "formatter": "json",
+            "filters": ["request_id"],
+        },
+    },
+    "root": {"handlers": ["cola"], "level": "WARNING"},
+    "loggers": {
+        "core": {"level": LOG_NIVEL},
+        "django": {"handlers": [], "level": "INFO"},  # Sale por la misma cola (root)
+    },
+}
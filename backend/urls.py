@@ -1,7 +1,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from core.views import AgenteViewSet, TipoLicenciaViewSet, SolicitudViewSet
+from core.views import AgenteViewSet, TipoLicenciaViewSet, SolicitudViewSet, stream_eventos
 
 # Importaciones para archivos media
 from django.conf import settings
@@ -17,6 +17,8 @@ urlpatterns = [
     path('admin/', admin.site.urls),
     #Aquí "pegamos" nuestras rutas de la API
     path('api/', include(router.urls)),
+    # Stream SSE para las bandejas (el proxy manda solo esta ruta al proceso ASGI, ver README)
+    path('api/eventos/', stream_eventos, name='eventos'),
 ]
 
 # Truco: Si estamos en modo desarrollo, permitir descargar archivos
@@ -1,17 +1,85 @@
-from django.contrib import admin
-from .models import Agente, TipoLicencia, Solicitud, Area
+import json
 
-# 1. Registrar Áreas
-admin.site.register(Area)
+from django.conf import settings
+from django.contrib import admin, messages
+from django.core.paginator import Paginator
+from django.db import connections, transaction
+from django.utils.functional import cached_property
+
+from . import pendientes
+from .busqueda import ids_agentes
+from .calendario import anios_feriado, recalcular_fechas_fin
+from .historial import registrar_cambio
+from .models import (
+    Agente,
+    TipoLicencia,
+    Solicitud,
+    SolicitudArchivada,
+    Area,
+    HistorialEstado,
+    Feriado,
+    LoteDescuento,
+    LegajoAnual,
+)
+
+
+# 0. Conteo aproximado para tablas grandes
+class PaginadorAproximado(Paginator):
+    """
+    En PostgreSQL pide al planificador cuántas filas estima (EXPLAIN, sin leer
+    la tabla) y solo hace el COUNT(*) exacto si son pocas. Con un millón de
+    solicitudes el total que se muestra es aproximado, pero la página carga.
+    """
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        conexion = connections[queryset.db]
+        if conexion.vendor == "postgresql":
+            sql, params = queryset.query.sql_with_params()
+            with conexion.cursor() as cursor:
+                cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+                plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimadas = int(plan[0]["Plan"]["Plan Rows"])
+            if estimadas > getattr(settings, "ADMIN_CONTEO_EXACTO_HASTA", 10000):
+                return estimadas
+        return super().count
+
+
+class AdminTablaGrande(admin.ModelAdmin):
+    paginator = PaginadorAproximado
+    show_full_result_count = False  # Evita un segundo COUNT(*) sin filtros al buscar
+
+
+# 1. Registrar Áreas (con su unidad superior)
+@admin.register(Area)
+class AreaAdmin(admin.ModelAdmin):
+    list_display = ("nombre", "padre")
+    list_filter = ("padre",)
+    list_select_related = ("padre",)
+    search_fields = ("nombre",)  # Para el autocompletado desde Agente
 
 
 # 2. Registrar Agentes (Con configuración personalizada para ver las columnas nuevas)
 @admin.register(Agente)
-class AgenteAdmin(admin.ModelAdmin):
-    list_display = ("legajo", "apellido", "nombre", "area", "categoria")
+class AgenteAdmin(AdminTablaGrande):
+    list_display = ("legajo", "apellido", "nombre", "area", "categoria", "avisos_inmediatos")
+    list_select_related = ("area",)
+    ordering = ("legajo",)  # Índice único: páginas estables también en el autocompletado
+    autocomplete_fields = ("area",)
+    raw_id_fields = ("usuario",)
     list_filter = ("area", "categoria")
     search_fields = ("legajo", "apellido", "nombre")
 
+    def get_search_results(self, request, queryset, search_term):
+        # Usamos el buscador indexado (sin tildes, con errores de tipeo) en lugar
+        # de un icontains sobre tres columnas. También lo usa el autocompletado.
+        if not search_term.strip():
+            return super().get_search_results(request, queryset, search_term)
+        return queryset.filter(pk__in=ids_agentes(search_term, limite=200)), False
+
 
 # 3. Registrar Tipos de Licencia
 admin.site.register(TipoLicencia)
@@ -19,6 +87,150 @@ admin.site.register(TipoLicencia)
 
 # 4. Registrar Solicitudes
 @admin.register(Solicitud)
-class SolicitudAdmin(admin.ModelAdmin):
+class SolicitudAdmin(AdminTablaGrande):
     list_display = ("agente", "tipo", "fecha_inicio", "estado")
     list_filter = ("estado", "tipo")
+    list_select_related = ("agente", "tipo")  # Un JOIN en lugar de una consulta por fila
+    date_hierarchy = "fecha_inicio"
+    ordering = ("-fecha_inicio", "-id")  # Lo resuelve el índice solicitud_fecha_idx
+    autocomplete_fields = ("agente", "jefe_seleccionado", "reclamada_por")
+    search_fields = ("agente__legajo",)
+    search_help_text = "Legajo, o apellido y nombre del agente"
+
+    def get_search_results(self, request, queryset, search_term):
+        # Legajo: igualdad sobre el índice único. Texto: el buscador de agentes.
+        termino = search_term.strip()
+        if not termino:
+            return queryset, False
+        if termino.isdigit():
+            return queryset.filter(agente__legajo=int(termino)), False
+        return queryset.filter(agente_id__in=ids_agentes(termino, limite=200)), False
+
+    # El admin no pasa por el motor de transiciones: los contadores de
+    # pendientes se ajustan acá, en la misma transacción que el cambio.
+    def save_model(self, request, obj, form, change):
+        antes = None
+        if change:
+            antes = (
+                Solicitud.objects.filter(pk=obj.pk)
+                .values_list("estado", "jefe_seleccionado_id")
+                .first()
+            )
+        with transaction.atomic():
+            super().save_model(request, obj, form, change)
+            # El cambio de estado a mano también queda en el historial (y en el SLA)
+            if not change:
+                registrar_cambio(obj, None, obj.estado, obj.fecha_solicitud)
+            elif antes and antes[0] != obj.estado:
+                registrar_cambio(obj, antes[0], obj.estado)
+            pendientes.mover(antes, (obj.estado, obj.jefe_seleccionado_id))
+
+    def delete_model(self, request, obj):
+        with transaction.atomic():
+            pendientes.quitar(Solicitud.objects.filter(pk=obj.pk))
+            super().delete_model(request, obj)
+
+    def delete_queryset(self, request, queryset):
+        with transaction.atomic():
+            pendientes.quitar(queryset)
+            super().delete_queryset(request, queryset)
+
+
+# 5. Feriados (Al guardar se regenera el calendario y se corren las fechas de fin)
+@admin.register(Feriado)
+class FeriadoAdmin(admin.ModelAdmin):
+    list_display = ("fecha", "descripcion")
+    date_hierarchy = "fecha"
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        self._recalcular(request, anios_feriado(obj))
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        self._recalcular(request, anios_feriado(obj))
+
+    def delete_queryset(self, request, queryset):
+        anios = sorted({fecha.year for fecha in queryset.values_list("fecha", flat=True)})
+        super().delete_queryset(request, queryset)
+        self._recalcular(request, anios)
+
+    def _recalcular(self, request, anios):
+        for anio in anios:
+            cambiadas, conflictos = recalcular_fechas_fin(anio)
+            if cambiadas:
+                self.message_user(request, f"📅 {anio}: {cambiadas} licencias con nueva fecha de fin.")
+            if conflictos:
+                ids = ", ".join(f"#{pk}" for pk, _, _ in conflictos)
+                self.message_user(
+                    request,
+                    f"⚠️ {anio}: {len(conflictos)} licencias se cruzarían con otra del agente y "
+                    f"quedaron con su fecha de fin anterior ({ids}). Corrija las fechas y "
+                    f"ejecute manage.py recalcular_calendario --anio {anio}.",
+                    messages.WARNING,
+                )
+
+
+# 6. Historial de Estados (Solo lectura: es un registro de auditoría)
+@admin.register(HistorialEstado)
+class HistorialEstadoAdmin(AdminTablaGrande):
+    # solicitud_id y no solicitud: la de años archivados ya no está en la tabla principal
+    list_display = ("solicitud_id", "estado_anterior", "estado_nuevo", "fecha", "jefe")
+    list_filter = ("estado_nuevo",)
+    list_select_related = ("jefe",)
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# 7. Lotes de descuento (Se generan con manage.py lote_descuentos)
+@admin.register(LoteDescuento)
+class LoteDescuentoAdmin(admin.ModelAdmin):
+    list_display = ("periodo", "generado", "agentes", "dias", "cantidad_solicitudes", "dias_faltas")
+    readonly_fields = (
+        "periodo", "generado", "agentes", "dias", "cantidad_solicitudes", "dias_faltas", "faltas_hasta"
+    )
+
+    def has_add_permission(self, request):
+        return False
+
+
+# 8. Archivo de solicitudes cerradas (Se llena con manage.py archivar_solicitudes)
+@admin.register(SolicitudArchivada)
+class SolicitudArchivadaAdmin(AdminTablaGrande):
+    list_display = ("id", "agente", "tipo", "fecha_inicio", "estado")
+    list_filter = ("estado",)
+    list_select_related = ("agente", "tipo")
+    date_hierarchy = "fecha_inicio"
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
+
+
+# 9. Legajos anuales en PDF (Se completan al aprobar y con manage.py legajo_anual)
+@admin.register(LegajoAnual)
+class LegajoAnualAdmin(admin.ModelAdmin):
+    list_display = ("agente", "anio", "archivo", "cantidad_solicitudes", "actualizado")
+    list_filter = ("anio",)
+    list_select_related = ("agente",)
+    search_fields = ("agente__legajo",)
+    readonly_fields = ("agente", "anio", "archivo", "paginas_indice", "entradas", "actualizado")
+
+    @admin.display(description="Solicitudes")
+    def cantidad_solicitudes(self, obj):
+        return len(obj.entradas)
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,105 @@
+"""
+Archivo anual de solicitudes cerradas.
+
+Las IMPACTADO/RECHAZADO de años anteriores salen de core_solicitud y pasan,
+con el mismo id, a core_solicitudarchivada. Así la tabla "caliente" (bandejas,
+cola de RRHH, topes, superposiciones) y sus índices quedan del tamaño del año
+en curso más lo que siga abierto.
+
+- En PostgreSQL el archivo está particionado por año (RANGE sobre fecha_inicio):
+  cada año es una partición y las consultas por fecha solo leen la que toca.
+- En otras bases es una tabla común con las mismas columnas.
+
+Mover un año es un INSERT ... SELECT y un DELETE en la misma transacción.
+El historial de estados se queda donde está (su FK no tiene restricción en la
+base). Volver a correr un año mueve solo lo que se cerró después.
+
+Las filas movidas quedan con "actualizado" del momento del archivo: hacen de
+tombstone para las bandejas que sincronizan con ?since=.
+"""
+
+from datetime import date
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from .descuentos import descontables
+from .models import AvisoPendiente, Solicitud, SolicitudArchivada
+
+ESTADOS_ARCHIVABLES = ("IMPACTADO", "RECHAZADO")
+
+
+def primer_anio_vivo():
+    """Desde este año (inclusive) las solicitudes quedan en la tabla principal."""
+    return timezone.localdate().year - getattr(settings, "ARCHIVO_ANIOS_VIVOS", 1) + 1
+
+
+def anio_archivado(anio):
+    if anio >= primer_anio_vivo():
+        return False
+    return SolicitudArchivada.objects.filter(
+        fecha_inicio__gte=date(anio, 1, 1), fecha_inicio__lt=date(anio + 1, 1, 1)
+    ).exists()
+
+
+def archivables(anio):
+    """Cerradas del año que ya no cambian (las SIN AVISO esperan a entrar en un lote)."""
+    return (
+        Solicitud.objects.filter(
+            estado__in=ESTADOS_ARCHIVABLES,
+            fecha_inicio__gte=date(anio, 1, 1),
+            fecha_inicio__lt=date(anio + 1, 1, 1),
+        )
+        .exclude(pk__in=descontables().filter(lote_descuento__isnull=True).values("pk"))
+    )
+
+
+def anios_pendientes():
+    """Años anteriores al vivo que todavía tienen solicitudes cerradas en la tabla principal."""
+    return [
+        fecha.year
+        for fecha in Solicitud.objects.filter(
+            estado__in=ESTADOS_ARCHIVABLES, fecha_inicio__lt=date(primer_anio_vivo(), 1, 1)
+        ).dates("fecha_inicio", "year")
+    ]
+
+
+def archivar(anio):
+    """Mueve al archivo las solicitudes cerradas del año. Devuelve cuántas movió."""
+    if anio >= primer_anio_vivo():
+        raise ValueError(f"El año {anio} todavía está vivo: no se puede archivar.")
+
+    tabla = SolicitudArchivada._meta.db_table
+    campos = SolicitudArchivada._meta.concrete_fields
+    columnas = ", ".join(connection.ops.quote_name(campo.column) for campo in campos)
+    seleccion, params = (
+        archivables(anio).values_list(*(campo.attname for campo in campos)).query.sql_with_params()
+    )
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(
+                f"CREATE TABLE IF NOT EXISTS {tabla}_{anio:d} PARTITION OF {tabla} "
+                f"FOR VALUES FROM ('{anio:d}-01-01') TO ('{anio + 1:d}-01-01')"
+            )
+
+        # Los avisos viejos ya se enviaron: soltamos la referencia (como SET_NULL)
+        AvisoPendiente.objects.filter(solicitud__in=archivables(anio).values("pk")).update(
+            solicitud=None
+        )
+        cursor.execute(f"INSERT INTO {tabla} ({columnas}) {seleccion}", params)
+        movidas = cursor.rowcount
+
+        del_anio = {"fecha_inicio__gte": date(anio, 1, 1), "fecha_inicio__lt": date(anio + 1, 1, 1)}
+        SolicitudArchivada.objects.filter(
+            pk__in=Solicitud.todas.filter(**del_anio).values("pk"), **del_anio
+        ).update(actualizado=timezone.now())
+
+        # DELETE directo: sin pasar por el collector de Django fila por fila
+        cursor.execute(
+            f"DELETE FROM {Solicitud._meta.db_table} WHERE id IN "
+            f"(SELECT id FROM {tabla} WHERE fecha_inicio >= %s AND fecha_inicio < %s)",
+            [date(anio, 1, 1), date(anio + 1, 1, 1)],
+        )
+    return movidas
@@ -0,0 +1,135 @@
+"""
+Avisos por email a los Jefes.
+
+Por defecto los avisos (solicitud nueva / cancelada) se guardan y se envían
+en un único resumen por jefe cada RESUMEN_AVISOS_MINUTOS (comando
+'enviar_resumenes', programado con cron). Los jefes con avisos_inmediatos
+siguen recibiendo un email por cada evento.
+"""
+
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection, send_mail
+from django.db.models import Min
+from django.utils import timezone
+
+from .eventos import canal_jefe
+from .models import AvisoPendiente
+from .pendientes import consultar
+
+logger = logging.getLogger(__name__)
+
+
+def avisar_jefe(jefe, solicitud, tipo, asunto, mensaje):
+    """Envía ya (si el jefe lo pidió) o deja el aviso para el próximo resumen."""
+    avisar_jefe_lote(jefe, [solicitud], tipo, asunto, mensaje)
+
+
+def avisar_jefe_lote(jefe, solicitudes, tipo, asunto, mensaje):
+    """Igual que avisar_jefe para varias solicitudes: a lo sumo un email."""
+    if not jefe or not jefe.email:
+        return
+
+    if jefe.avisos_inmediatos:
+        send_mail(asunto, mensaje, settings.EMAIL_HOST_USER, [jefe.email], fail_silently=False)
+        logger.info("Email enviado al jefe", extra={"para": jefe.email, "solicitudes": len(solicitudes)})
+        return
+
+    AvisoPendiente.objects.bulk_create(
+        [
+            AvisoPendiente(destinatario=jefe, solicitud=s, tipo=tipo, detalle=detalle_aviso(s))
+            for s in solicitudes
+        ]
+    )
+
+
+def detalle_aviso(solicitud):
+    agente = solicitud.agente
+    return (
+        f"{agente.apellido}, {agente.nombre} (Legajo {agente.legajo}) - "
+        f"{solicitud.tipo.descripcion} - {solicitud.fecha_inicio:%d/%m/%Y}"
+        + (f" ({solicitud.dias} días)" if solicitud.dias > 1 else "")
+    )[:255]
+
+
+def enviar_resumenes(ahora=None, forzar=False):
+    """
+    Un email por jefe con todo lo pendiente. Solo se envía a quien tenga un aviso
+    más viejo que la ventana configurada (o a todos si forzar=True).
+    Devuelve (emails enviados, avisos incluidos).
+    """
+    ahora = ahora or timezone.now()
+    ventana = timedelta(minutes=getattr(settings, "RESUMEN_AVISOS_MINUTOS", 60))
+
+    sin_enviar = AvisoPendiente.objects.filter(enviado_en__isnull=True)
+    destinatarios = sin_enviar.values("destinatario").annotate(primero=Min("creado"))
+    if not forzar:
+        destinatarios = destinatarios.filter(primero__lte=ahora - ventana)
+    ids_destinatarios = [d["destinatario"] for d in destinatarios]
+    if not ids_destinatarios:
+        return 0, 0
+
+    # Reservamos los avisos con un UPDATE condicional: si corren dos envíos a la vez,
+    # cada aviso sale en uno solo.
+    sin_enviar.filter(destinatario_id__in=ids_destinatarios).update(enviado_en=ahora)
+    avisos = (
+        AvisoPendiente.objects.filter(enviado_en=ahora, destinatario_id__in=ids_destinatarios)
+        .select_related("destinatario")
+        .order_by("destinatario_id", "creado")
+    )
+
+    por_jefe = {}
+    for aviso in avisos:
+        por_jefe.setdefault(aviso.destinatario, []).append(aviso)
+
+    # Lo que no llegue a salir (SMTP caído a mitad del lote) vuelve a quedar
+    # pendiente para el próximo resumen en vez de perderse.
+    sin_salir = list(por_jefe.items())
+    enviados = 0
+    try:
+        # Cuánto tiene cada uno esperando en la bandeja: una lectura de los contadores
+        en_bandeja = consultar(*(canal_jefe(jefe.pk) for jefe in por_jefe))
+        # Una sola conexión SMTP para todo el lote
+        with get_connection(fail_silently=False) as conexion:
+            while sin_salir:
+                jefe, lista = sin_salir[0]
+                mensaje = _armar_resumen(jefe, lista, en_bandeja[canal_jefe(jefe.pk)])
+                enviados += conexion.send_messages([mensaje]) or 0
+                sin_salir.pop(0)
+    except Exception:
+        AvisoPendiente.objects.filter(
+            pk__in=[aviso.pk for _, lista in sin_salir for aviso in lista]
+        ).update(enviado_en=None)
+        logger.exception(
+            "Falló el envío de resúmenes", extra={"emails": enviados, "sin_enviar": len(sin_salir)}
+        )
+        raise
+
+    logger.info("Resúmenes enviados", extra={"emails": enviados, "jefes": len(por_jefe)})
+    return enviados, sum(len(lista) for lista in por_jefe.values())
+
+
+def _armar_resumen(jefe, avisos, en_bandeja=0):
+    nuevas = [a.detalle for a in avisos if a.tipo == "NUEVA"]
+    canceladas = [a.detalle for a in avisos if a.tipo == "CANCELADA"]
+
+    partes = [f"Hola {jefe.nombre},", "", "Resumen de avisos de su personal a cargo:", ""]
+    if nuevas:
+        partes.append(f"📥 NUEVAS SOLICITUDES PARA VALIDAR ({len(nuevas)}):")
+        partes += [f"  - {d}" for d in nuevas]
+        partes.append("")
+    if canceladas:
+        partes.append(f"🚫 CANCELADAS POR EL AGENTE ({len(canceladas)}) - no requieren acción:")
+        partes += [f"  - {d}" for d in canceladas]
+        partes.append("")
+    if en_bandeja:
+        partes.append(f"⏳ En total tiene {en_bandeja} solicitudes esperando su validación.")
+        partes.append("")
+    if nuevas:
+        partes.append("Por favor, ingrese al sistema para validar si fue avisado en tiempo y forma.")
+    partes += ["", "Saludos,", "Departamento de Personal - UTN"]
+
+    asunto = f"RESUMEN DE AVISOS: {len(nuevas)} nuevas, {len(canceladas)} canceladas"
+    return EmailMessage(asunto, "\n".join(partes), settings.EMAIL_HOST_USER, [jefe.email])
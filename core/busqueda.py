@@ -0,0 +1,143 @@
+"""
+Buscador de agentes por apellido, nombre o legajo (tolera tildes y errores de tipeo).
+
+Cada Agente guarda en 'busqueda' su texto normalizado ("gonzalez maria 1234").
+- Prefijo: "gonz" -> rango sobre el índice de 'busqueda'.
+- Difusa: "gonzales" -> similitud de trigramas.
+  En PostgreSQL usa pg_trgm con un índice GIN (migración 0015). En otras bases
+  se arma en memoria un índice invertido trigrama -> agentes, con vencimiento.
+Las tildes se sacan en Python al guardar, así que no hace falta unaccent()
+(que además no se puede usar dentro de un índice).
+"""
+
+import time
+import unicodedata
+from collections import Counter
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, FloatField, Func, Lookup, Value
+
+from .models import Agente
+
+UMBRAL_SIMILITUD = 0.6  # El mismo que usa pg_trgm por defecto para word_similarity
+COLUMNAS = ("id", "legajo", "apellido", "nombre", "categoria", "area__nombre")
+
+_indice = {"vence": 0, "trigramas": None}
+
+
+# ---------------------------------------------------------
+# NORMALIZACIÓN
+# ---------------------------------------------------------
+def normalizar(texto):
+    """'  González,  MARÍA ' -> 'gonzalez maria'."""
+    sin_tildes = "".join(
+        c for c in unicodedata.normalize("NFKD", str(texto)) if not unicodedata.combining(c)
+    )
+    limpio = "".join(c if c.isalnum() else " " for c in sin_tildes.lower())
+    return " ".join(limpio.split())
+
+
+def texto_busqueda(apellido, nombre, legajo):
+    return normalizar(f"{apellido} {nombre} {legajo}")[:220]
+
+
+def trigramas(texto):
+    """Trigramas por palabra, igual que pg_trgm ('  g', ' go', 'gon', ..., 'ez ')."""
+    resultado = set()
+    for palabra in texto.split():
+        relleno = f"  {palabra} "
+        resultado.update(relleno[i : i + 3] for i in range(len(relleno) - 2))
+    return resultado
+
+
+class ParecidoPorTrigramas(Lookup):
+    """busqueda %> 'texto' de pg_trgm: es el operador que aprovecha el índice GIN."""
+
+    lookup_name = "parecido_por_trigramas"
+
+    def as_sql(self, compiler, connection):
+        lhs, lhs_params = self.process_lhs(compiler, connection)
+        rhs, rhs_params = self.process_rhs(compiler, connection)
+        return f"{lhs} %%> {rhs}", (*lhs_params, *rhs_params)
+
+
+class SimilitudDePalabra(Func):
+    function = "WORD_SIMILARITY"
+    output_field = FloatField()
+
+
+# ---------------------------------------------------------
+# BÚSQUEDA
+# ---------------------------------------------------------
+def buscar_agentes(texto, limite=20):
+    """Primero los que empiezan con el texto (o el legajo exacto), después los parecidos."""
+    ids = ids_agentes(texto, limite)
+    filas = {f["id"]: f for f in Agente.objects.filter(id__in=ids).values(*COLUMNAS)}
+    return [filas[i] for i in ids if i in filas]
+
+
+def ids_agentes(texto, limite=20):
+    """Solo los ids, en orden de relevancia (para filtrar otros querysets)."""
+    consulta = normalizar(texto)
+    if not consulta:
+        return []
+
+    ids = []
+    if consulta.isdigit():
+        ids += Agente.objects.filter(legajo=int(consulta)).values_list("id", flat=True)
+    ids += _por_prefijo(consulta, limite)
+    if len(ids) < limite:
+        ids += _parecidos(consulta, limite)
+    return list(dict.fromkeys(ids))[:limite]  # Sin repetidos, respetando el orden
+
+
+def _por_prefijo(consulta, limite):
+    agentes = Agente.objects.order_by("busqueda")
+    if connection.vendor == "postgresql":
+        # LIKE 'x%' lo resuelve el índice de patrones que Django crea para db_index
+        agentes = agentes.filter(busqueda__startswith=consulta)
+    else:
+        # En SQLite el LIKE no usa índices; un rango sí
+        agentes = agentes.filter(busqueda__gte=consulta, busqueda__lt=consulta + "\uffff")
+    return list(agentes.values_list("id", flat=True)[:limite])
+
+
+def _parecidos(consulta, limite):
+    if connection.vendor == "postgresql":
+        return list(
+            Agente.objects.filter(ParecidoPorTrigramas(F("busqueda"), consulta))
+            .annotate(similitud=SimilitudDePalabra(Value(consulta), F("busqueda")))
+            .order_by("-similitud", "busqueda")
+            .values_list("id", flat=True)[:limite]
+        )
+
+    buscados = trigramas(consulta)
+    indice = indice_local()
+    # Por cada agente: cuántos trigramas de la consulta tiene
+    coincidencias = Counter()
+    for trigrama in buscados:
+        coincidencias.update(indice.get(trigrama, ()))
+    minimo = UMBRAL_SIMILITUD * len(buscados)
+    return [pk for pk, n in coincidencias.most_common() if n >= minimo][:limite]
+
+
+# ---------------------------------------------------------
+# ÍNDICE EN MEMORIA (Bases sin pg_trgm)
+# ---------------------------------------------------------
+def indice_local():
+    if _indice["trigramas"] is not None and _indice["vence"] > time.monotonic():
+        return _indice["trigramas"]
+
+    nuevo = {}
+    for pk, texto in Agente.objects.values_list("id", "busqueda").iterator():
+        for trigrama in trigramas(texto):
+            nuevo.setdefault(trigrama, []).append(pk)
+
+    _indice["trigramas"] = nuevo
+    _indice["vence"] = time.monotonic() + getattr(settings, "BUSQUEDA_CACHE_SEGUNDOS", 300)
+    return nuevo
+
+
+def invalidar_indice_local():
+    _indice["trigramas"] = None
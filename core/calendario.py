@@ -0,0 +1,184 @@
+"""
+Calendario laboral de la Universidad (fines de semana + feriados).
+
+Por cada año se guarda un mapa precalculado (CalendarioAnual) y en memoria se
+arman dos tablas de búsqueda:
+- acumulado[i]: cuántos días hábiles hay ANTES del día i del año.
+- habiles[k]:   qué día del año es el k-ésimo día hábil.
+Con eso "sumar N días hábiles" o "contar hábiles entre dos fechas" es O(1)
+dentro del año, sin recorrer día por día.
+"""
+
+import time
+from datetime import date, timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import CalendarioAnual, Feriado, Solicitud, superposiciones
+
+_tablas = {}  # anio -> (TablaAnual, vence)
+
+
+class TablaAnual:
+    __slots__ = ("anio", "inicio", "mapa", "acumulado", "habiles")
+
+    def __init__(self, anio, mapa):
+        self.anio = anio
+        self.inicio = date(anio, 1, 1)
+        self.mapa = mapa
+        self.acumulado = [0] * (len(mapa) + 1)
+        self.habiles = []
+        for i, caracter in enumerate(mapa):
+            es_habil = caracter == "1"
+            self.acumulado[i + 1] = self.acumulado[i] + es_habil
+            if es_habil:
+                self.habiles.append(i)
+
+    def indice(self, fecha):
+        return (fecha - self.inicio).days
+
+    def fecha(self, indice):
+        return self.inicio + timedelta(days=indice)
+
+
+# ---------------------------------------------------------
+# CONSTRUCCIÓN Y CACHÉ DEL MAPA ANUAL
+# ---------------------------------------------------------
+def construir_mapa(anio):
+    inicio = date(anio, 1, 1)
+    largo = (date(anio + 1, 1, 1) - inicio).days
+    feriados = set(
+        Feriado.objects.filter(fecha__year=anio).values_list("fecha", flat=True)
+    )
+    return "".join(
+        "0" if dia.weekday() >= 5 or dia in feriados else "1"
+        for dia in (inicio + timedelta(days=i) for i in range(largo))
+    )
+
+
+def reconstruir_anio(anio):
+    """Regenera el mapa de un año (llamar al cargar o borrar feriados)."""
+    mapa = construir_mapa(anio)
+    CalendarioAnual.objects.update_or_create(anio=anio, defaults={"mapa": mapa})
+    _tablas.pop(anio, None)
+    return mapa
+
+
+def tabla(anio):
+    guardada = _tablas.get(anio)
+    if guardada and guardada[1] > time.monotonic():
+        return guardada[0]
+
+    mapa = CalendarioAnual.objects.filter(anio=anio).values_list("mapa", flat=True).first()
+    if mapa is None:
+        mapa = reconstruir_anio(anio)
+
+    nueva = TablaAnual(anio, mapa)
+    # Vence para que otros procesos vean los feriados nuevos sin reiniciar
+    vence = time.monotonic() + getattr(settings, "CALENDARIO_CACHE_SEGUNDOS", 300)
+    _tablas[anio] = (nueva, vence)
+    return nueva
+
+
+# ---------------------------------------------------------
+# CONSULTAS (O(1) por año involucrado)
+# ---------------------------------------------------------
+def es_habil(fecha):
+    t = tabla(fecha.year)
+    return t.mapa[t.indice(fecha)] == "1"
+
+
+def sumar_dias_habiles(inicio, dias):
+    """Último día de una licencia de 'dias' hábiles que arranca en 'inicio'."""
+    anio, desde, restantes = inicio.year, inicio, dias
+    while True:
+        t = tabla(anio)
+        # Posición (dentro del año) del primer hábil >= desde, y el objetivo
+        objetivo = t.acumulado[t.indice(desde)] + restantes - 1
+        if objetivo < len(t.habiles):
+            return t.fecha(t.habiles[objetivo])
+        # No alcanza el año: seguimos el 1 de enero con lo que falta
+        restantes = objetivo - len(t.habiles) + 1
+        anio += 1
+        desde = date(anio, 1, 1)
+
+
+def dias_habiles_entre(inicio, fin):
+    """Cantidad de días hábiles en [inicio, fin]."""
+    total = 0
+    for anio in range(inicio.year, fin.year + 1):
+        t = tabla(anio)
+        desde = inicio if anio == inicio.year else date(anio, 1, 1)
+        hasta = fin if anio == fin.year else date(anio, 12, 31)
+        total += t.acumulado[t.indice(hasta) + 1] - t.acumulado[t.indice(desde)]
+    return total
+
+
+def fechas_entre(inicio, fin, habiles=True):
+    """Lista de días cubiertos por [inicio, fin] (solo hábiles si corresponde)."""
+    if not habiles:
+        return [inicio + timedelta(days=i) for i in range((fin - inicio).days + 1)]
+
+    fechas = []
+    for anio in range(inicio.year, fin.year + 1):
+        t = tabla(anio)
+        desde = inicio if anio == inicio.year else date(anio, 1, 1)
+        hasta = fin if anio == fin.year else date(anio, 12, 31)
+        # Cortamos la lista de hábiles del año usando el acumulado (sin recorrer el mapa)
+        primero = t.acumulado[t.indice(desde)]
+        ultimo = t.acumulado[t.indice(hasta) + 1]
+        fechas.extend(t.fecha(i) for i in t.habiles[primero:ultimo])
+    return fechas
+
+
+# ---------------------------------------------------------
+# MANTENIMIENTO
+# ---------------------------------------------------------
+def anios_feriado(feriado):
+    """Años cuyo calendario cambia con este feriado (también el anterior, si se movió de año)."""
+    anterior = getattr(feriado, "_fecha_anterior", None)
+    return sorted({feriado.fecha.year} | ({anterior.year} if anterior else set()))
+
+
+def recalcular_fechas_fin(anio):
+    """
+    Corre el fin de las licencias en días hábiles que tocan ese año (después de
+    cargar, mover o borrar un feriado). Si el nuevo fin se cruza con otra
+    licencia del agente, esa queda como estaba y vuelve en 'conflictos' como
+    (id, nuevo fin, ids con los que choca). Devuelve (cuántas cambiaron, conflictos).
+    """
+    afectadas = Solicitud.todas.filter(
+        tipo__dias_habiles=True,
+        fecha_inicio__lte=date(anio, 12, 31),
+        fecha_fin__gte=date(anio, 1, 1),
+    ).only("id", "agente_id", "estado", "eliminada_en", "fecha_inicio", "dias", "fecha_fin")
+
+    ahora = timezone.now()
+    cambiadas, conflictos = [], []
+    for solicitud in afectadas.iterator():
+        nueva = Solicitud.calcular_fecha_fin(solicitud.fecha_inicio, solicitud.dias, habiles=True)
+        if nueva == solicitud.fecha_fin:
+            continue
+        vigente = solicitud.eliminada_en is None and "RECHAZADO" not in solicitud.estado
+        if vigente and nueva > solicitud.fecha_fin:
+            # Solo el tramo que se agrega puede chocar (el inicio no se mueve)
+            choques = list(
+                superposiciones(
+                    solicitud.agente_id,
+                    solicitud.fecha_fin + timedelta(days=1),
+                    nueva,
+                    excluir=solicitud.pk,
+                ).values_list("id", flat=True)
+            )
+            if choques:
+                conflictos.append((solicitud.pk, nueva, choques))
+                continue
+        solicitud.fecha_fin = nueva
+        solicitud.actualizado = ahora  # bulk_update no pasa por auto_now
+        cambiadas.append(solicitud)
+
+    with transaction.atomic():
+        Solicitud.todas.bulk_update(cambiadas, ["fecha_fin", "actualizado"], batch_size=1000)
+    return len(cambiadas), conflictos
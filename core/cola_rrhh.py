@@ -0,0 +1,77 @@
+"""
+Cola de trabajo compartida para los operadores de RRHH.
+
+Cada operador "reclama" las próximas N solicitudes libres y las tiene en
+exclusiva por unos minutos (lease). Si no las resuelve, el lease vence solo
+y vuelven a la cola: no hace falta ningún proceso de limpieza.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Case, Q, When
+from django.utils import timezone
+
+from .models import Solicitud
+
+# Estados que esperan una decisión de RRHH
+ESTADOS_EN_COLA = ["AVISO_CONFIRMADO", "AVISO_NEGADO"]
+
+
+def duracion_lease():
+    return timedelta(minutes=getattr(settings, "RRHH_LEASE_MINUTOS", 15))
+
+
+def sin_lease_ajeno(ahora, operador=None):
+    """Sin dueño, con lease vencido o ya mío (también lo exige aplicar_transicion)."""
+    condicion = Q(reclamada_hasta__isnull=True) | Q(reclamada_hasta__lt=ahora)
+    if operador is not None:
+        condicion |= Q(reclamada_por=operador)
+    return condicion
+
+
+def libres(ahora, operador=None):
+    """Filtro de lo que se puede tomar."""
+    return Solicitud.objects.filter(sin_lease_ajeno(ahora, operador), estado__in=ESTADOS_EN_COLA)
+
+
+def reclamar(operador, cantidad):
+    """
+    Asigna al operador las próximas 'cantidad' solicitudes libres (las más viejas primero).
+    En PostgreSQL, SELECT ... FOR UPDATE SKIP LOCKED hace que dos operadores que
+    piden al mismo tiempo reciban filas distintas sin esperarse entre sí.
+    Devuelve el queryset de lo que quedó asignado.
+    """
+    ahora = timezone.now()
+    vence = ahora + duracion_lease()
+
+    with transaction.atomic():
+        candidatas = list(
+            libres(ahora, operador)
+            .select_for_update(skip_locked=True)
+            # Primero lo que ya tenía: reclamar de nuevo renueva el lease sin perderlo
+            .order_by(
+                Case(When(reclamada_por=operador, then=0), default=1),
+                "fecha_solicitud",
+                "id",
+            )
+            .values_list("id", flat=True)[:cantidad]
+        )
+        # El UPDATE repite la condición: en motores sin SKIP LOCKED (SQLite)
+        # sigue siendo imposible que dos operadores se queden con la misma fila.
+        libres(ahora, operador).filter(id__in=candidatas).update(
+            reclamada_por=operador, reclamada_hasta=vence, actualizado=ahora
+        )
+
+    return Solicitud.objects.filter(
+        reclamada_por=operador, reclamada_hasta=vence
+    ).order_by("fecha_solicitud", "id")
+
+
+def liberar(operador, ids=None):
+    """Devuelve a la cola lo que el operador tenía tomado (todo o solo 'ids')."""
+    mias = Solicitud.objects.filter(reclamada_por=operador)
+    if ids is not None:
+        mias = mias.filter(id__in=ids)
+    return mias.update(reclamada_por=None, reclamada_hasta=None, actualizado=timezone.now())
@@ -0,0 +1,174 @@
+"""
+Lote mensual de descuentos para Liquidación de Haberes.
+
+Es descontable toda solicitud que el Jefe marcó SIN AVISO (AVISO_NEGADO), aunque
+después RRHH la haya cerrado. Cada lote se queda con las descontables que todavía
+no se informaron y empiezan hasta fin de mes (así entran también las que el Jefe
+negó tarde). Las marca con lote_descuento en un solo UPDATE: volver a correr el
+mes devuelve el mismo lote y ninguna solicitud se descuenta dos veces.
+
+También entran las faltas del reloj (reloj.ausencias_sin_justificar) desde donde
+terminó el lote anterior hasta fin de mes o el último día importado. Cada
+agente/día queda en FaltaDescontada (único): tampoco se descuenta dos veces.
+Los días ya cubiertos por una solicitud descontable no se cuentan como falta.
+"""
+
+import calendar
+import heapq
+from collections import defaultdict
+from datetime import date, timedelta
+from itertools import groupby
+from operator import itemgetter
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, OuterRef, Q, Sum
+from django.utils import timezone
+
+from .models import (
+    Agente,
+    FaltaDescontada,
+    HistorialEstado,
+    LoteDescuento,
+    Presencia,
+    Solicitud,
+    SolicitudArchivada,
+)
+from .reloj import ausencias_sin_justificar
+
+ESTADO_DESCUENTO = "AVISO_NEGADO"
+
+ENCABEZADOS = ["Legajo", "Apellido", "Nombre", "Periodo", "Concepto", "Dias", "Solicitudes"]
+
+
+def rango_mes(anio, mes):
+    return date(anio, mes, 1), date(anio, mes, calendar.monthrange(anio, mes)[1])
+
+
+def descontables(modelo=Solicitud):
+    negada_por_jefe = HistorialEstado.objects.filter(
+        solicitud_id=OuterRef("pk"), estado_nuevo=ESTADO_DESCUENTO
+    )
+    return modelo.objects.filter(Q(estado=ESTADO_DESCUENTO) | Q(Exists(negada_por_jefe)))
+
+
+def generar_lote(anio, mes):
+    """Devuelve (lote, creado). Si el mes ya se generó, devuelve el existente sin tocarlo."""
+    inicio, fin = rango_mes(anio, mes)
+
+    with transaction.atomic():
+        lote, creado = LoteDescuento.objects.get_or_create(periodo=inicio)
+        if not creado:
+            return lote, False
+
+        descontables().filter(lote_descuento__isnull=True, fecha_inicio__lte=fin).update(
+            lote_descuento=lote, actualizado=timezone.now()
+        )
+        lote.faltas_hasta = _descontar_faltas(lote, fin)
+
+        totales = lote.solicitudes.aggregate(dias=Sum("dias"), cantidad=Count("id"))
+        lote.agentes = len(
+            set(lote.solicitudes.values_list("agente_id", flat=True))
+            | set(lote.faltas.values_list("agente_id", flat=True))
+        )
+        lote.dias = totales["dias"] or 0
+        lote.cantidad_solicitudes = totales["cantidad"]
+        lote.dias_faltas = lote.faltas.count()
+        lote.save(
+            update_fields=[
+                "agentes", "dias", "cantidad_solicitudes", "dias_faltas", "faltas_hasta"
+            ]
+        )
+
+    return lote, True
+
+
+def _descontar_faltas(lote, fin):
+    """Registra las faltas nuevas en el lote. Devuelve hasta qué día se revisó el reloj."""
+    anterior = (
+        LoteDescuento.objects.exclude(pk=lote.pk)
+        .filter(faltas_hasta__isnull=False)
+        .order_by("-faltas_hasta")
+        .values_list("faltas_hasta", flat=True)
+        .first()
+    )
+    desde = anterior + timedelta(days=1) if anterior else lote.periodo
+    ultimo_importado = Presencia.objects.order_by("-fecha").values_list("fecha", flat=True).first()
+    if ultimo_importado is None:
+        return anterior
+    hasta = min(fin, ultimo_importado)
+    if hasta < desde:
+        return anterior
+
+    faltas = [
+        (agente["legajo"], fecha)
+        for area in ausencias_sin_justificar(desde, hasta)
+        for agente in area["agentes"]
+        for fecha in agente["fechas"]
+    ]
+    id_de = dict(
+        Agente.objects.filter(legajo__in={legajo for legajo, _ in faltas}).values_list("legajo", "id")
+    )
+
+    # Lo que ya se descuenta como solicitud SIN AVISO no se cobra dos veces
+    negados = defaultdict(list)
+    for modelo in (Solicitud, SolicitudArchivada):
+        for agente_id, inicio, termina in descontables(modelo).filter(
+            agente_id__in=id_de.values(), fecha_inicio__lte=hasta, fecha_fin__gte=desde
+        ).values_list("agente_id", "fecha_inicio", "fecha_fin"):
+            negados[agente_id].append((inicio, termina))
+
+    FaltaDescontada.objects.bulk_create(
+        [
+            FaltaDescontada(lote=lote, agente_id=id_de[legajo], fecha=fecha)
+            for legajo, fecha in faltas
+            if not any(inicio <= fecha <= termina for inicio, termina in negados[id_de[legajo]])
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,  # Un día ya informado en otro lote queda en ese
+    )
+    return hasta
+
+
+def filas_lote(lote, encabezados=True):
+    """
+    Una fila por legajo y concepto (un GROUP BY por tabla), leída por tandas para
+    no cargarla en memoria. Los lotes de años archivados tienen parte de sus
+    solicitudes en el archivo: se suman las dos tablas, ya ordenadas por legajo.
+    Las faltas del reloj van en una fila aparte con su propio concepto.
+    """
+    if encabezados:
+        yield ENCABEZADOS
+
+    periodo = lote.periodo.strftime("%Y%m")
+    faltas = (
+        [legajo, apellido, nombre, periodo, getattr(settings, "DESCUENTOS_CONCEPTO_FALTAS", "DESC_FALTA_RELOJ"), dias, 0]
+        for legajo, apellido, nombre, dias in lote.faltas.values(
+            "agente__legajo", "agente__apellido", "agente__nombre"
+        )
+        .annotate(dias=Count("id"))
+        .order_by("agente__legajo")
+        .values_list("agente__legajo", "agente__apellido", "agente__nombre", "dias")
+        .iterator(chunk_size=2000)
+    )
+    yield from heapq.merge(_filas_solicitudes(lote, periodo), faltas, key=itemgetter(0))
+
+
+def _filas_solicitudes(lote, periodo):
+    concepto = getattr(settings, "DESCUENTOS_CONCEPTO", "DESC_SIN_AVISO")
+    partes = [
+        relacion.values("agente__legajo", "agente__apellido", "agente__nombre")
+        .annotate(dias=Sum("dias"), solicitudes=Count("id"))
+        .order_by("agente__legajo")
+        .values_list("agente__legajo", "agente__apellido", "agente__nombre", "dias", "solicitudes")
+        .iterator(chunk_size=2000)
+        for relacion in (lote.solicitudes, lote.solicitudes_archivadas)
+    ]
+    for (legajo, apellido, nombre), filas in groupby(
+        heapq.merge(*partes, key=itemgetter(0)), key=itemgetter(0, 1, 2)
+    ):
+        dias = solicitudes = 0
+        for *_, dias_fila, solicitudes_fila in filas:
+            dias += dias_fila
+            solicitudes += solicitudes_fila
+        yield [legajo, apellido, nombre, periodo, concepto, dias, solicitudes]
@@ -0,0 +1,197 @@
+"""
+Bus de eventos en tiempo real (Server-Sent Events).
+
+Las bandejas de Jefe y RRHH se suscriben a un "canal" y reciben los IDs de
+las solicitudes nuevas o modificadas, en lugar de recargar la lista entera.
+
+Las vistas que publican corren en los workers WSGI y el stream en un proceso
+ASGI aparte, así que en producción el broker tiene que ser compartido:
+BrokerPostgres usa LISTEN/NOTIFY de la misma base. BrokerLocal (en memoria)
+solo sirve cuando todo corre en un mismo proceso (runserver).
+Se elige con settings.EVENTOS_BROKER.
+"""
+
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+
+from django.conf import settings
+from django.db import connection, connections, transaction
+from django.utils.module_loading import import_string
+
+from .replica import nueva_marca
+
+logger = logging.getLogger(__name__)
+
+# Canales disponibles
+CANAL_RRHH = "rrhh"
+
+# Estados que ve la bandeja de RRHH (mismo criterio que ?modo_rrhh=true)
+ESTADOS_RRHH = [
+    "AVISO_CONFIRMADO",
+    "AVISO_NEGADO",
+    "APROBADO",
+    "IMPACTADO",
+    "RECHAZADO_RRHH",
+    "RECHAZADO",
+]
+
+
+def canal_jefe(jefe_id):
+    return f"jefe:{jefe_id}"
+
+
+# ---------------------------------------------------------
+# BROKER EN MEMORIA (Un proceso, miles de conexiones)
+# ---------------------------------------------------------
+class BrokerLocal:
+    """
+    Cada suscriptor es una asyncio.Queue atada a su event loop.
+    Publicar es thread-safe: las vistas DRF corren en hilos (sync) y las
+    colas viven en el loop del servidor ASGI.
+    """
+
+    def __init__(self, max_pendientes=100):
+        self.max_pendientes = max_pendientes
+        self._suscriptores = {}  # canal -> set[(loop, cola)]
+        self._lock = threading.Lock()
+
+    def suscribir(self, canales):
+        loop = asyncio.get_running_loop()
+        cola = asyncio.Queue(maxsize=self.max_pendientes)
+        with self._lock:
+            for canal in canales:
+                self._suscriptores.setdefault(canal, set()).add((loop, cola))
+        return cola
+
+    def desuscribir(self, canales, cola):
+        with self._lock:
+            for canal in canales:
+                subs = self._suscriptores.get(canal)
+                if not subs:
+                    continue
+                subs.difference_update({s for s in subs if s[1] is cola})
+                if not subs:
+                    del self._suscriptores[canal]
+
+    def publicar(self, canal, evento):
+        with self._lock:
+            subs = list(self._suscriptores.get(canal, ()))
+
+        for loop, cola in subs:
+            try:
+                loop.call_soon_threadsafe(self._encolar, cola, evento)
+            except RuntimeError:
+                # El loop del suscriptor ya se cerró (conexión muerta)
+                self.desuscribir([canal], cola)
+
+    @staticmethod
+    def _encolar(cola, evento):
+        # Si un cliente lento acumula demasiados eventos, descartamos el más viejo.
+        # El cliente igual recibe el último estado (solo viajan IDs).
+        if cola.full():
+            cola.get_nowait()
+        cola.put_nowait(evento)
+
+
+# ---------------------------------------------------------
+# BROKER COMPARTIDO (PostgreSQL LISTEN/NOTIFY, varios procesos)
+# ---------------------------------------------------------
+class BrokerPostgres(BrokerLocal):
+    """
+    Publicar hace pg_notify desde la conexión de Django (cualquier proceso).
+    Cada proceso ASGI abre una sola conexión propia con LISTEN y un hilo que
+    reparte las notificaciones entre sus suscriptores locales, así el stream
+    se puede escalar a varios workers uvicorn.
+    """
+
+    CANAL_PG = "eventos_solicitudes"
+
+    def __init__(self, max_pendientes=100):
+        super().__init__(max_pendientes)
+        self._escuchando = False
+
+    def suscribir(self, canales):
+        cola = super().suscribir(canales)
+        with self._lock:
+            if not self._escuchando:
+                self._escuchando = True
+                threading.Thread(target=self._escuchar, name="eventos-listen", daemon=True).start()
+        return cola
+
+    def publicar(self, canal, evento):
+        mensaje = json.dumps({"canal": canal, "evento": evento})
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT pg_notify(%s, %s)", [self.CANAL_PG, mensaje])
+
+    def _despachar(self, mensaje):
+        datos = json.loads(mensaje)
+        super().publicar(datos["canal"], datos["evento"])
+
+    def _escuchar(self):
+        while True:
+            # Conexión aparte de la del hilo: queda abierta mientras viva el proceso
+            wrapper = connections.create_connection("default")
+            try:
+                wrapper.ensure_connection()
+                with wrapper.cursor() as cursor:
+                    cursor.execute(f"LISTEN {self.CANAL_PG}")
+                conn = wrapper.connection
+                while True:
+                    if select.select([conn], [], [], 60) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        self._despachar(conn.notifies.pop(0).payload)
+            except Exception:
+                # Los eventos de mientras se pierden: las bandejas se ponen al
+                # día con la próxima recarga (?since=) o el botón de actualizar
+                logger.exception("Se cortó el LISTEN de eventos, reconectando")
+                time.sleep(5)
+            finally:
+                wrapper.close()
+
+
+_broker = None
+
+
+def get_broker():
+    global _broker
+    if _broker is None:
+        ruta = getattr(settings, "EVENTOS_BROKER", "core.eventos.BrokerLocal")
+        _broker = import_string(ruta)()
+    return _broker
+
+
+# ---------------------------------------------------------
+# PUBLICACIÓN (Se llama desde las vistas)
+# ---------------------------------------------------------
+def notificar_solicitud(solicitud, evento, estado_anterior=None):
+    """
+    Avisa a las bandejas interesadas que una solicitud cambió.
+    Se dispara al confirmar la transacción para no anunciar datos que no existen.
+    """
+    payload = {"evento": evento, "id": solicitud.pk, "estado": solicitud.estado}
+
+    canales = set()
+    if solicitud.jefe_seleccionado_id:
+        canales.add(canal_jefe(solicitud.jefe_seleccionado_id))
+    if solicitud.estado in ESTADOS_RRHH or estado_anterior in ESTADOS_RRHH:
+        canales.add(CANAL_RRHH)
+
+    def _publicar():
+        # Marca de "leer de la primaria" para la recarga que dispare el evento
+        payload["primaria_hasta"] = nueva_marca()
+        broker = get_broker()
+        for canal in canales:
+            broker.publicar(canal, payload)
+
+    transaction.on_commit(_publicar)
+
+
+def formatear_sse(evento):
+    """Convierte un evento al formato de texto de Server-Sent Events."""
+    return f"event: {evento['evento']}\ndata: {json.dumps(evento)}\n\n"
@@ -0,0 +1,140 @@
+"""
+Historial de cambios de estado y reporte de tiempos (SLA).
+
+Cada cambio agrega una fila a HistorialEstado con el tiempo que la solicitud
+pasó en el estado anterior. El reporte se calcula con agregados de la base
+sobre esas filas, sin reconstruir la historia en Python.
+"""
+
+from django.db import connection
+from django.db.models import Aggregate, Avg, Count, FloatField, Max
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from .models import HistorialEstado
+
+# Qué etapa mide cada estado de origen
+ETAPAS = {
+    "jefe": "PENDIENTE_VALIDACION",  # Cuánto tarda el Jefe en validar el aviso
+    "rrhh": "AVISO_CONFIRMADO",  # Cuánto tarda RRHH en cerrar
+}
+
+AGRUPACIONES = {
+    "jefe": ("jefe_id", "jefe__apellido"),
+    "area": ("area_id", "area__nombre"),
+    "mes": ("mes", None),
+}
+
+PERCENTILES = {"p50": 0.5, "p90": 0.9, "p95": 0.95}
+
+
+def registrar_cambio(solicitud, estado_anterior, estado_nuevo, fecha=None):
+    """Agrega una fila al historial. Debe llamarse dentro de la misma transacción del cambio."""
+    fecha = fecha or timezone.now()
+
+    segundos = None
+    if estado_anterior is not None:
+        # Desde cuándo estaba en el estado anterior: último cambio registrado
+        # (una consulta por índice) o, si no hay, la fecha de carga.
+        desde = (
+            HistorialEstado.objects.filter(solicitud_id=solicitud.pk)
+            .order_by("-fecha")
+            .values_list("fecha", flat=True)
+            .first()
+        ) or solicitud.fecha_solicitud
+        segundos = (fecha - desde).total_seconds()
+
+    return HistorialEstado.objects.create(
+        solicitud_id=solicitud.pk,
+        estado_anterior=estado_anterior,
+        estado_nuevo=estado_nuevo,
+        fecha=fecha,
+        segundos_en_estado=segundos,
+        jefe_id=solicitud.jefe_seleccionado_id,
+        area_id=solicitud.agente.area_id,
+    )
+
+
+class Percentil(Aggregate):
+    """PERCENTILE_CONT(x) WITHIN GROUP (ORDER BY campo) de PostgreSQL."""
+
+    function = "PERCENTILE_CONT"
+    template = "%(function)s(%(fraccion)s) WITHIN GROUP (ORDER BY %(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, fraccion, **extra):
+        super().__init__(expression, fraccion=float(fraccion), **extra)
+
+
+def reporte_sla(etapa="jefe", agrupar="jefe", desde=None, hasta=None):
+    """
+    Tiempos en una etapa (en horas) agrupados por jefe, área o mes:
+    cantidad, promedio, p50, p90, p95 y máximo.
+    """
+    estado = ETAPAS[etapa]
+    campo_grupo, campo_nombre = AGRUPACIONES[agrupar]
+
+    historial = HistorialEstado.objects.filter(
+        estado_anterior=estado, segundos_en_estado__isnull=False
+    )
+    if desde:
+        historial = historial.filter(fecha__date__gte=desde)
+    if hasta:
+        historial = historial.filter(fecha__date__lte=hasta)
+    if agrupar == "mes":
+        historial = historial.annotate(mes=TruncMonth("fecha"))
+
+    columnas = [campo_grupo] + ([campo_nombre] if campo_nombre else [])
+    agregados = {
+        "cantidad": Count("id"),
+        "promedio": Avg("segundos_en_estado"),
+        "maximo": Max("segundos_en_estado"),
+    }
+    es_postgres = connection.vendor == "postgresql"
+    if es_postgres:
+        for nombre, fraccion in PERCENTILES.items():
+            agregados[nombre] = Percentil("segundos_en_estado", fraccion)
+
+    filas = list(historial.values(*columnas).annotate(**agregados).order_by(campo_grupo))
+
+    if not es_postgres:
+        _percentiles_sin_postgres(historial, campo_grupo, filas)
+
+    return [_a_horas(fila, campo_grupo, campo_nombre) for fila in filas]
+
+
+def _percentiles_sin_postgres(historial, campo_grupo, filas):
+    # Fallback (SQLite/dev): la base devuelve las duraciones ya ordenadas por grupo
+    # y calculamos los percentiles con interpolación lineal, igual que PERCENTILE_CONT.
+    valores = {}
+    for grupo, segundos in historial.order_by(campo_grupo, "segundos_en_estado").values_list(
+        campo_grupo, "segundos_en_estado"
+    ):
+        valores.setdefault(grupo, []).append(segundos)
+
+    for fila in filas:
+        datos = valores.get(fila[campo_grupo], [])
+        for nombre, fraccion in PERCENTILES.items():
+            fila[nombre] = _percentil_continuo(datos, fraccion)
+
+
+def _percentil_continuo(ordenados, fraccion):
+    if not ordenados:
+        return None
+    posicion = (len(ordenados) - 1) * fraccion
+    abajo = int(posicion)
+    arriba = min(abajo + 1, len(ordenados) - 1)
+    return ordenados[abajo] + (ordenados[arriba] - ordenados[abajo]) * (posicion - abajo)
+
+
+def _a_horas(fila, campo_grupo, campo_nombre):
+    grupo = fila[campo_grupo]
+    resultado = {
+        "grupo": grupo.strftime("%Y-%m") if hasattr(grupo, "strftime") else grupo,
+        "nombre": fila.get(campo_nombre) if campo_nombre else None,
+        "cantidad": fila["cantidad"],
+    }
+    for clave in ("promedio", *PERCENTILES, "maximo"):
+        segundos = fila.get(clave)
+        resultado[f"{clave}_horas"] = round(segundos / 3600, 2) if segundos is not None else None
+    return resultado
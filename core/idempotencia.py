@@ -0,0 +1,175 @@
+"""
+Idempotency-Key para altas y cambios de estado.
+
+Si el frontend reintenta un POST/PATCH con la misma clave, devolvemos la
+respuesta guardada del primer intento: sin volver a validar, generar el PDF
+ni mandar emails. Solo se guardan las respuestas exitosas (2xx); si el primer
+intento falló, el reintento se procesa de nuevo.
+
+La huella del pedido sale de los campos ya parseados (request.data) y no del
+cuerpo crudo: en multipart el navegador cambia el "boundary" en cada envío, y
+de los adjuntos solo cuentan nombre y tamaño (no se leen los bytes).
+Mientras el primer intento se procesa, la reserva vence a los
+IDEMPOTENCIA_RESERVA_SEGUNDOS y se va renovando mientras la vista trabaja (un
+PDF lento no la deja vencer): si el proceso murió, el reintento no queda
+bloqueado hasta que venza la clave entera.
+
+Cada clave vale para quien la manda (usuario, operador o agente del pedido) y
+para esa ruta: la misma clave de otro agente u otra solicitud es otro pedido.
+"""
+
+import hashlib
+import json
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+from functools import wraps
+
+from django.conf import settings
+from django.db import IntegrityError, connection, transaction
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer
+from rest_framework.response import Response
+
+from .models import ClaveIdempotencia
+
+ENCABEZADO = "Idempotency-Key"
+
+
+def idempotente(vista):
+    """Decorador para métodos de un ViewSet (create, update, acciones POST)."""
+
+    @wraps(vista)
+    def envoltura(self, request, *args, **kwargs):
+        clave = request.headers.get(ENCABEZADO, "").strip()
+        if not clave:
+            return vista(self, request, *args, **kwargs)
+        if len(clave) > 100:
+            return Response({"error": f"{ENCABEZADO} admite hasta 100 caracteres."}, status=400)
+
+        alcance = alcance_pedido(request)
+        huella = huella_pedido(request)
+        ahora = timezone.now()
+
+        # Reservamos la clave (fuera de cualquier transacción de la vista).
+        # Si ya existe, es un reintento: devolvemos lo guardado.
+        ClaveIdempotencia.objects.filter(alcance=alcance, clave=clave, vence__lte=ahora).delete()
+        try:
+            with transaction.atomic():
+                registro = ClaveIdempotencia.objects.create(
+                    alcance=alcance, clave=clave, huella=huella, vence=ahora + duracion_reserva()
+                )
+        except IntegrityError:
+            return _repetir(alcance, clave, huella)
+
+        try:
+            with _renovando(registro):
+                response = vista(self, request, *args, **kwargs)
+        except Exception:
+            registro.delete()  # Falló: el reintento debe poder procesarse
+            raise
+
+        if not 200 <= response.status_code < 300:
+            registro.delete()
+            return response
+
+        # Guardamos el JSON tal como lo va a ver el cliente (fechas ya como texto)
+        datos = response.data
+        if datos is not None:
+            datos = json.loads(JSONRenderer().render(datos))
+        ClaveIdempotencia.objects.filter(pk=registro.pk).update(
+            estado_http=response.status_code, respuesta=datos, vence=timezone.now() + duracion()
+        )
+        return response
+
+    return envoltura
+
+
+def duracion():
+    return timedelta(hours=getattr(settings, "IDEMPOTENCIA_HORAS", 24))
+
+
+def duracion_reserva():
+    return timedelta(seconds=getattr(settings, "IDEMPOTENCIA_RESERVA_SEGUNDOS", 60))
+
+
+@contextmanager
+def _renovando(registro):
+    """Estira la reserva cada tanto mientras la vista sigue procesando."""
+    listo = threading.Event()
+    intervalo = duracion_reserva().total_seconds() / 3
+
+    def renovar():
+        try:
+            while not listo.wait(intervalo):
+                ClaveIdempotencia.objects.filter(pk=registro.pk, estado_http__isnull=True).update(
+                    vence=timezone.now() + duracion_reserva()
+                )
+        finally:
+            connection.close()  # La conexión de este hilo no la cierra nadie más
+
+    hilo = threading.Thread(target=renovar, daemon=True)
+    hilo.start()
+    try:
+        yield
+    finally:
+        listo.set()
+        hilo.join()
+
+
+def alcance_pedido(request):
+    """Quién manda el pedido (usuario, o el operador/agente que viene en los datos) y a qué ruta."""
+    if request.user.is_authenticated:
+        quien = f"usuario:{request.user.pk}"
+    else:
+        quien = "anonimo"
+        datos = request.data if hasattr(request.data, "get") else {}
+        for campo in ("operador", "agente"):
+            valor = datos.get(campo)
+            if valor:
+                quien = f"{campo}:{valor}"
+                break
+    return f"{quien} {request.method} {request.path}"[:150]
+
+
+def huella_pedido(request):
+    """SHA-256 de método, ruta y campos parseados (de los adjuntos, nombre y tamaño)."""
+    datos = request.data
+    if hasattr(datos, "lists"):  # QueryDict de form/multipart: puede haber claves repetidas
+        datos = dict(datos.lists())
+    cuerpo = json.dumps(datos, sort_keys=True, ensure_ascii=False, default=_valor_huella)
+    return hashlib.sha256(
+        "\n".join([request.method, request.path, cuerpo]).encode()
+    ).hexdigest()
+
+
+def _valor_huella(valor):
+    if hasattr(valor, "size") and hasattr(valor, "name"):  # UploadedFile
+        return {"archivo": valor.name, "bytes": valor.size}
+    return str(valor)
+
+
+def _repetir(alcance, clave, huella):
+    registro = ClaveIdempotencia.objects.filter(alcance=alcance, clave=clave).first()
+    if registro is None or registro.estado_http is None:
+        # El primer intento sigue procesándose (o acaba de fallar): que reintente en un rato
+        response = Response(
+            {"error": "⏳ Este envío todavía se está procesando. Espere unos segundos."},
+            status=409,
+        )
+        response["Retry-After"] = "2"
+        return response
+
+    if registro.huella != huella:
+        return Response(
+            {"error": f"⛔ La {ENCABEZADO} ya se usó para otro pedido distinto."}, status=422
+        )
+
+    response = Response(registro.respuesta, status=registro.estado_http)
+    response["Idempotent-Replayed"] = "true"
+    return response
+
+
+def purgar_vencidas():
+    cantidad, _ = ClaveIdempotencia.objects.filter(vence__lte=timezone.now()).delete()
+    return cantidad
@@ -0,0 +1,236 @@
+"""
+Legajo anual en PDF: un solo archivo por agente y por año.
+
+media/legajos/{legajo}/legajo_{año}.pdf tiene primero el índice y después las
+páginas de cada solicitud IMPACTADA. Lo que ya está adentro (y en qué página)
+se guarda en LegajoAnual.
+
+- Al aprobar una solicitud se renderizan solo sus páginas y el índice nuevo;
+  las páginas anteriores se copian tal cual del PDF existente (pypdf), sin
+  volver a pasar por weasyprint, y el archivo se reemplaza de una vez.
+- El render no bloquea la fila de LegajoAnual: al guardar se compara la versión
+  ('actualizado') y, si otro proceso ganó, se vuelve a armar sobre lo suyo. El
+  PDF nuevo se escribe aparte y reemplaza al vigente recién después del commit.
+- Si el archivo falta o no coincide con lo registrado, se arma entero de nuevo.
+- Armar de cero el año de un agente es un solo render de weasyprint con todas
+  sus solicitudes (manage.py legajo_anual reparte los agentes entre procesos).
+"""
+
+import io
+import os
+import tempfile
+from datetime import date
+from functools import partial
+from itertools import chain
+
+from django.conf import settings
+from django.db import transaction
+from django.template.loader import render_to_string
+from django.utils import timezone
+from pypdf import PdfReader, PdfWriter
+from pypdf.errors import PdfReadError
+from weasyprint import HTML
+
+from .calendario import fechas_entre
+from .models import Agente, LegajoAnual, Solicitud, SolicitudArchivada
+
+
+def ruta_legajo(agente, anio):
+    """Ruta del PDF relativa a MEDIA_ROOT."""
+    return os.path.join("legajos", str(agente.legajo), f"legajo_{anio}.pdf")
+
+
+def impactadas(agente, anio):
+    """Solicitudes IMPACTADAS del año (tabla principal y archivo), por fecha de inicio."""
+    filtro = {
+        "agente": agente,
+        "estado": "IMPACTADO",
+        "fecha_inicio__gte": date(anio, 1, 1),
+        "fecha_inicio__lt": date(anio + 1, 1, 1),
+    }
+    return sorted(
+        chain(
+            Solicitud.objects.filter(**filtro).select_related("agente__area", "tipo"),
+            SolicitudArchivada.objects.filter(**filtro).select_related("agente__area", "tipo"),
+        ),
+        key=lambda s: (s.fecha_inicio, s.id),
+    )
+
+
+def agentes_con_impactadas(anio):
+    """Ids de los agentes que tienen algo para el legajo del año."""
+    rango = {"fecha_inicio__gte": date(anio, 1, 1), "fecha_inicio__lt": date(anio + 1, 1, 1)}
+    return sorted(
+        set(
+            Solicitud.objects.filter(estado="IMPACTADO", **rango).values_list("agente_id", flat=True)
+        )
+        | set(
+            SolicitudArchivada.objects.filter(estado="IMPACTADO", **rango).values_list(
+                "agente_id", flat=True
+            )
+        )
+    )
+
+
+# ---------------------------------------------------------
+# RENDER (weasyprint)
+# ---------------------------------------------------------
+def _renderizar_solicitudes(solicitudes):
+    """
+    Todas las solicitudes en un único documento. Devuelve el PDF y una entrada
+    por solicitud, con las páginas contadas desde 1.
+    """
+    contexto = {
+        "solicitudes": [
+            (s, fechas_entre(s.fecha_inicio, s.fecha_fin, s.tipo.dias_habiles))
+            for s in solicitudes
+        ],
+        "fecha_aprobacion": timezone.now(),
+    }
+    documento = HTML(string=render_to_string("core/pdf_legajo_solicitudes.html", contexto)).render()
+
+    # Cada solicitud empieza en la página que tiene su ancla (id="solicitud-N")
+    inicios = {}
+    for numero, pagina in enumerate(documento.pages, start=1):
+        for ancla in pagina.anchors:
+            inicios.setdefault(ancla, numero)
+    cortes = [inicios[f"solicitud-{s.id}"] for s in solicitudes] + [len(documento.pages) + 1]
+
+    entradas = [
+        {
+            "solicitud": s.id,
+            "pagina": cortes[i],
+            "paginas": cortes[i + 1] - cortes[i],
+            "tipo": s.tipo.descripcion,
+            "desde": s.fecha_inicio.isoformat(),
+            "hasta": s.fecha_fin.isoformat(),
+            "dias": s.dias,
+        }
+        for i, s in enumerate(solicitudes)
+    ]
+    return documento.write_pdf(), entradas
+
+
+def _renderizar_indice(legajo):
+    """Índice ordenado por fecha. Devuelve el PDF y cuántas páginas ocupa."""
+    paginas = max(legajo.paginas_indice, 1)
+    while True:
+        # Los números de página dependen del largo del propio índice
+        entradas = sorted(
+            (
+                {
+                    **entrada,
+                    "pagina": entrada["pagina"] + paginas,
+                    "desde": date.fromisoformat(entrada["desde"]),
+                    "hasta": date.fromisoformat(entrada["hasta"]),
+                }
+                for entrada in legajo.entradas
+            ),
+            key=lambda e: (e["desde"], e["solicitud"]),
+        )
+        contexto = {
+            "agente": legajo.agente,
+            "anio": legajo.anio,
+            "entradas": entradas,
+            "fecha_actualizacion": timezone.now(),
+        }
+        documento = HTML(string=render_to_string("core/pdf_legajo_indice.html", contexto)).render()
+        if len(documento.pages) == paginas:
+            return documento.write_pdf(), paginas
+        paginas = len(documento.pages)
+
+
+# ---------------------------------------------------------
+# ARCHIVO (pypdf)
+# ---------------------------------------------------------
+def _lector_vigente(ruta, legajo):
+    """Lector del PDF actual si coincide con lo registrado; si no, None."""
+    if not legajo.paginas_indice:
+        return None
+    try:
+        lector = PdfReader(ruta)
+        paginas = len(lector.pages)
+    except (FileNotFoundError, PdfReadError):
+        return None
+    esperadas = legajo.paginas_indice + sum(e["paginas"] for e in legajo.entradas)
+    return lector if paginas == esperadas else None
+
+
+def _publicar(legajo_id, version, contenido, ruta):
+    """
+    Después del commit: reemplaza el PDF si la fila sigue en la versión que se
+    guardó (si otro proceso ya guardó una más nueva, su archivo es el que va).
+    """
+    with transaction.atomic():
+        if not LegajoAnual.objects.select_for_update().filter(pk=legajo_id, actualizado=version):
+            return
+        os.makedirs(os.path.dirname(ruta), exist_ok=True)
+        descriptor, temporal = tempfile.mkstemp(dir=os.path.dirname(ruta), suffix=".tmp")
+        with os.fdopen(descriptor, "wb") as archivo:
+            archivo.write(contenido)
+        os.replace(temporal, ruta)  # Nunca queda un legajo a medio escribir
+
+
+def actualizar_legajo(agente, anio, solicitudes=None, de_cero=False):
+    """
+    Agrega al legajo del año las solicitudes que falten (por defecto, todas las
+    IMPACTADAS del año). Devuelve (legajo, cuántas se agregaron).
+    """
+    legajo, _ = LegajoAnual.objects.get_or_create(
+        agente=agente, anio=anio, defaults={"archivo": ruta_legajo(agente, anio)}
+    )
+    ruta = os.path.join(settings.MEDIA_ROOT, legajo.archivo)
+    while True:
+        legajo.agente = agente
+        version = legajo.actualizado
+        pedidas = solicitudes
+
+        # El render (lo lento) va sin bloqueos ni transacción abierta
+        vigente = None if de_cero else _lector_vigente(ruta, legajo)
+        if vigente is None:
+            # Sin archivo válido no hay páginas para reutilizar: va el año entero
+            legajo.entradas, legajo.paginas_indice = [], 0
+            pedidas = impactadas(agente, anio)
+        elif pedidas is None:
+            pedidas = impactadas(agente, anio)
+
+        cargadas = {entrada["solicitud"] for entrada in legajo.entradas}
+        nuevas = [s for s in pedidas if s.id not in cargadas]
+        if vigente is not None and not nuevas:
+            return legajo, 0
+
+        anteriores = vigente.pages[legajo.paginas_indice :] if vigente is not None else []
+        paginas_nuevas = []
+        if nuevas:
+            paginas_pdf, entradas = _renderizar_solicitudes(nuevas)
+            for entrada in entradas:
+                entrada["pagina"] += len(anteriores)
+            legajo.entradas = [*legajo.entradas, *entradas]
+            paginas_nuevas = PdfReader(io.BytesIO(paginas_pdf)).pages
+        indice_pdf, legajo.paginas_indice = _renderizar_indice(legajo)
+
+        escritor = PdfWriter()
+        for pagina in chain(PdfReader(io.BytesIO(indice_pdf)).pages, anteriores, paginas_nuevas):
+            escritor.add_page(pagina)
+        contenido = io.BytesIO()
+        escritor.write(contenido)
+
+        with transaction.atomic():
+            # El bloqueo solo cubre comparar la versión y guardar
+            actual = LegajoAnual.objects.select_for_update().only("actualizado").get(pk=legajo.pk)
+            if actual.actualizado == version:
+                legajo.save()
+                # El archivo se reemplaza recién si el commit salió bien
+                transaction.on_commit(
+                    partial(_publicar, legajo.pk, legajo.actualizado, contenido.getvalue(), ruta)
+                )
+                return legajo, len(nuevas)
+
+        # Otro proceso guardó el legajo mientras renderizábamos: se arma sobre lo suyo
+        legajo.refresh_from_db()
+
+
+def actualizar_legajo_de(agente_id, anio, de_cero=False):
+    """Versión por id, para los procesos de manage.py legajo_anual."""
+    agente = Agente.objects.select_related("area").get(pk=agente_id)
+    return actualizar_legajo(agente, anio, de_cero=de_cero)[1]
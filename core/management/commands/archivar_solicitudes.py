@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from core.archivo import anios_pendientes, archivar, primer_anio_vivo
+
+
+class Command(BaseCommand):
+    help = (
+        "Mueve las solicitudes cerradas (IMPACTADO/RECHAZADO) de años anteriores a la "
+        "tabla de archivo. Correrlo una vez por año, después del cierre de liquidación."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--anio", type=int, help="Año a archivar (por defecto, todos los pendientes)")
+
+    def handle(self, *args, **options):
+        if options["anio"] is not None and options["anio"] >= primer_anio_vivo():
+            raise CommandError(f"Solo se pueden archivar años anteriores a {primer_anio_vivo()}.")
+
+        anios = [options["anio"]] if options["anio"] is not None else anios_pendientes()
+        if not anios:
+            self.stdout.write("🗄️ No hay años pendientes de archivar")
+        for anio in anios:
+            self.stdout.write(f"🗄️ {anio}: {archivar(anio)} solicitudes archivadas")
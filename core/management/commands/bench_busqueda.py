@@ -0,0 +1,83 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.busqueda import buscar_agentes, invalidar_indice_local, texto_busqueda
+from core.models import Agente
+
+APELLIDOS = ["González", "Rodríguez", "Fernández", "López", "Martínez", "Pérez", "Gómez",
+             "Sánchez", "Romero", "Díaz", "Álvarez", "Benítez", "Acosta", "Muñoz", "Ibáñez"]
+NOMBRES = ["María", "José", "Juan", "Ana", "Lucía", "Martín", "Sofía", "Raúl", "Inés", "Germán"]
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Mide el buscador de agentes (prefijo y difuso) contra icontains sobre N agentes."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--agentes", type=int, default=30000)
+        parser.add_argument("--repeticiones", type=int, default=20)
+
+    def handle(self, *args, **options):
+        self.repeticiones = options["repeticiones"]
+        try:
+            with transaction.atomic():
+                self._cargar_datos(options["agentes"])
+                self._medir(options["agentes"])
+                raise _Rollback()
+        except _Rollback:
+            pass
+        invalidar_indice_local()
+
+    def _cargar_datos(self, n):
+        azar = random.Random(7)
+        base = Agente.objects.order_by("-legajo").values_list("legajo", flat=True).first() or 0
+        agentes = []
+        for i in range(n):
+            apellido = f"{azar.choice(APELLIDOS)}{i}"
+            nombre = azar.choice(NOMBRES)
+            legajo = base + 1 + i
+            agentes.append(
+                Agente(
+                    legajo=legajo,
+                    apellido=apellido,
+                    nombre=nombre,
+                    busqueda=texto_busqueda(apellido, nombre, legajo),  # bulk_create no pasa por save()
+                )
+            )
+        Agente.objects.bulk_create(agentes, batch_size=2000)
+        invalidar_indice_local()
+        self.legajo = base + n // 2
+
+    def _medir(self, n):
+        casos = [
+            ("prefijo 'gonzalez12'", lambda: buscar_agentes("gonzalez12")),
+            ("sin tilde 'Ibanez99'", lambda: buscar_agentes("Ibanez99")),
+            ("con error 'Fernandes123'", lambda: buscar_agentes("Fernandes123")),
+            (f"legajo {self.legajo}", lambda: buscar_agentes(str(self.legajo))),
+            (
+                "icontains (admin anterior) 'gonzalez12'",
+                lambda: list(Agente.objects.filter(apellido__icontains="gonzalez12")[:20].values("id")),
+            ),
+        ]
+
+        t0 = time.perf_counter()
+        buscar_agentes("xx")  # Arma el índice en memoria si la base no tiene pg_trgm
+        self.stdout.write(f"Primera búsqueda (arma índices): {(time.perf_counter() - t0) * 1000:.1f} ms")
+
+        self.stdout.write(f"Búsqueda sobre {n} agentes (mejor de {self.repeticiones}):")
+        for nombre, funcion in casos:
+            encontrados = len(funcion())
+            mejor = min(self._cronometrar(funcion) for _ in range(self.repeticiones))
+            self.stdout.write(f"  {nombre:<42} {mejor * 1000:8.2f} ms  ({encontrados} resultados)")
+
+    @staticmethod
+    def _cronometrar(funcion):
+        t0 = time.perf_counter()
+        funcion()
+        return time.perf_counter() - t0
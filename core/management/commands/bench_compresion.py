@@ -0,0 +1,96 @@
+import csv
+import io
+import json
+import time
+import zlib
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+
+from core.middleware import brotli
+
+
+class Command(BaseCommand):
+    help = "Mide tamaño y CPU de brotli/gzip sobre un listado JSON y un reporte CSV típicos."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=10000)
+
+    def handle(self, *args, **options):
+        n = options["filas"]
+        cargas = {
+            f"JSON listado ({n} solicitudes)": self._json(n),
+            f"CSV exportar_excel ({n} filas)": self._csv(n),
+        }
+
+        compresores = [
+            (f"gzip -{nivel}", lambda d, nivel=nivel: self._gzip(d, nivel)) for nivel in (1, 6, 9)
+        ]
+        if brotli is not None:
+            compresores += [
+                (f"brotli q{nivel}", lambda d, nivel=nivel: brotli.compress(d, quality=nivel))
+                for nivel in (1, 4, 5, 8, 11)
+            ]
+        else:
+            self.stderr.write("⚠️ brotli no está instalado: solo se mide gzip.")
+
+        for nombre, datos in cargas.items():
+            self.stdout.write(f"\n{nombre}: {len(datos) / 1024:.0f} KB sin comprimir")
+            for etiqueta, comprimir in compresores:
+                t0 = time.perf_counter()
+                salida = comprimir(datos)
+                ms = (time.perf_counter() - t0) * 1000
+                ratio = len(salida) / len(datos) * 100
+                self.stdout.write(
+                    f"  {etiqueta:<10} {len(salida) / 1024:8.1f} KB ({ratio:5.1f}%)  {ms:8.1f} ms CPU"
+                )
+
+    @staticmethod
+    def _gzip(datos, nivel):
+        compresor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+        return compresor.compress(datos) + compresor.flush()
+
+    @staticmethod
+    def _filas(n):
+        inicio = date(2026, 1, 1)
+        estados = ["PENDIENTE_VALIDACION", "AVISO_CONFIRMADO", "IMPACTADO", "RECHAZADO"]
+        for i in range(n):
+            yield {
+                "id": i + 1,
+                "nombre_agente": f"Nombre{i % 700}",
+                "apellido_agente": f"Apellido{i % 700}",
+                "tipo_descripcion": "Razones particulares",
+                "tipo_codigo": "art_85",
+                "fecha_solicitud": f"2026-01-01T08:{i % 60:02d}:00.000000Z",
+                "fecha_inicio": (inicio + timedelta(days=i % 365)).isoformat(),
+                "dias": 1 + i % 3,
+                "motivo": "Trámite personal",
+                "estado": estados[i % len(estados)],
+                "archivo_adjunto": None,
+                "motivo_rechazo": None,
+                "agente": 1 + i % 700,
+                "tipo": 1,
+                "jefe_seleccionado": 1 + i % 40,
+            }
+
+    def _json(self, n):
+        return json.dumps(list(self._filas(n))).encode()
+
+    def _csv(self, n):
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        for fila in self._filas(n):
+            writer.writerow(
+                [
+                    fila["agente"],
+                    fila["apellido_agente"],
+                    fila["nombre_agente"],
+                    fila["tipo_descripcion"],
+                    fila["fecha_inicio"],
+                    fila["dias"],
+                    fila["estado"],
+                    "-",
+                    fila["motivo"],
+                ]
+            )
+        return buffer.getvalue().encode()
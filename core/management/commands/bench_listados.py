@@ -0,0 +1,100 @@
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from core.models import Agente, Area, Solicitud, TipoLicencia
+from core.serializers import SolicitudSerializer, filas_solicitudes
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Compara SolicitudSerializer contra la lectura rápida (.values_list) en N filas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--filas", type=int, default=10000)
+        parser.add_argument("--repeticiones", type=int, default=3)
+
+    def handle(self, *args, **options):
+        n = options["filas"]
+        self.repeticiones = options["repeticiones"]
+
+        # Todo se hace dentro de una transacción que se deshace al final
+        try:
+            with transaction.atomic():
+                self._cargar_datos(n)
+                self._medir(n)
+                raise _Rollback()
+        except _Rollback:
+            pass
+
+    def _cargar_datos(self, n):
+        area = Area.objects.create(nombre="__bench__")
+        tipo = TipoLicencia.objects.create(
+            codigo="__bench__", descripcion="Bench", texto_para_reloj="BENCH"
+        )
+        base = Agente.objects.order_by("-legajo").values_list("legajo", flat=True).first() or 0
+        agentes = Agente.objects.bulk_create(
+            [
+                Agente(legajo=base + 1 + i, nombre=f"N{i}", apellido=f"A{i}", area=area)
+                for i in range(200)
+            ]
+        )
+        inicio = date(2000, 1, 1)
+        Solicitud.objects.bulk_create(
+            [
+                Solicitud(
+                    agente=agentes[i % len(agentes)],
+                    tipo=tipo,
+                    fecha_inicio=inicio + timedelta(days=i),
+                    fecha_fin=inicio + timedelta(days=i),  # bulk_create no pasa por save()
+                    motivo="Motivo de prueba " * 4,
+                )
+                for i in range(n)
+            ],
+            batch_size=2000,
+        )
+        self.filtro = {"tipo": tipo}
+
+    def _medir(self, n):
+        factory = APIRequestFactory()
+        completo = Request(factory.get("/api/solicitudes/"))
+        recortado = Request(factory.get("/api/solicitudes/?fields=id,estado,fecha_inicio"))
+        qs = Solicitud.objects.filter(**self.filtro).order_by("-fecha_inicio")
+
+        casos = [
+            (
+                "SolicitudSerializer (actual)",
+                lambda: SolicitudSerializer(qs.all(), many=True, context={"request": completo}).data,
+            ),
+            (
+                "SolicitudSerializer + select_related",
+                lambda: SolicitudSerializer(
+                    qs.select_related("agente", "tipo"), many=True, context={"request": completo}
+                ).data,
+            ),
+            ("filas_solicitudes (values_list)", lambda: filas_solicitudes(qs.all(), completo)),
+            ("filas_solicitudes ?fields=id,estado,fecha_inicio", lambda: filas_solicitudes(qs.all(), recortado)),
+        ]
+
+        # Verificamos que el camino rápido devuelva exactamente lo mismo
+        esperado = [dict(f) for f in casos[1][1]()]
+        if esperado != casos[2][1]():
+            self.stderr.write(self.style.ERROR("⚠️ La lectura rápida NO coincide con el serializer"))
+
+        self.stdout.write(f"Listado de {n} solicitudes (mejor de {self.repeticiones}):")
+        for nombre, funcion in casos:
+            mejor = min(self._cronometrar(funcion) for _ in range(self.repeticiones))
+            self.stdout.write(f"  {nombre:<50} {mejor * 1000:9.1f} ms")
+
+    @staticmethod
+    def _cronometrar(funcion):
+        t0 = time.perf_counter()
+        funcion()
+        return time.perf_counter() - t0
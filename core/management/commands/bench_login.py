@@ -0,0 +1,167 @@
+import copy
+import logging
+import random
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test import override_settings
+from rest_framework.parsers import JSONParser
+from rest_framework.request import Request
+from rest_framework.test import APIClient, APIRequestFactory
+
+from core.models import Agente
+from core.throttles import LoginIPThrottle
+
+PIN_OK = "482915"
+
+# Los contadores de la prueba van a una caché propia: cache.clear() sobre la
+# real (Redis/Memcached) borraría los límites y sesiones de los usuarios reales.
+CACHE_PRUEBA = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "bench_login",
+    }
+}
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga del login: un ataque de fuerza bruta en paralelo con logins "
+        "legítimos. Muestra que los rechazos son baratos y el login normal sigue rápido. "
+        "Crea datos de prueba en la base configurada (y los borra al final): no correr en producción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--atacantes", type=int, default=4, help="Hilos de ataque")
+        parser.add_argument("--usuarios", type=int, default=10, help="Usuarios legítimos")
+        parser.add_argument("--segundos", type=float, default=20.0)
+        parser.add_argument(
+            "--limite-ip",
+            type=int,
+            default=None,
+            help="Intentos por IP y por minuto para la prueba (por defecto, los de settings)",
+        )
+
+    def handle(self, *args, **options):
+        self.opciones = options
+        # Los 401/404/429 del ataque no nos interesan en consola
+        logging.getLogger("django.request").setLevel(logging.CRITICAL)
+        base = Agente.objects.order_by("-legajo").values_list("legajo", flat=True).first() or 0
+        legajos = list(range(base + 1, base + 1 + options["usuarios"]))
+
+        for legajo in legajos:
+            user = User.objects.create_user(username=str(legajo), password=PIN_OK)
+            Agente.objects.create(legajo=legajo, nombre="Bench", apellido="Login", usuario=user)
+
+        limites = copy.deepcopy(settings.LIMITES_ACCESO)
+        if options["limite_ip"] is not None:
+            limites["login_ip"] = {"intentos": options["limite_ip"], "segundos": 60}
+        self.stdout.write(f"Límites usados: {limites['login_ip']} por IP, {limites['login_legajo']} por legajo")
+
+        try:
+            with override_settings(LIMITES_ACCESO=limites, CACHES=CACHE_PRUEBA):
+                normal = self._logins_legitimos(legajos)
+                cache.clear()
+                ataque, bajo_ataque = self._con_ataque(legajos)
+                cache.clear()
+        finally:
+            User.objects.filter(username__in=[str(l) for l in legajos]).delete()
+            Agente.objects.filter(legajo__in=legajos).delete()
+
+        self._informe("Login legítimo sin ataque", normal)
+        self._informe("Login legítimo DURANTE el ataque", bajo_ataque)
+
+        rechazados = [ms for codigo, ms in ataque if codigo == 429]
+        self.stdout.write(
+            f"\nAtaque: {len(ataque)} intentos en {options['segundos']}s "
+            f"({len(ataque) / options['segundos']:.0f}/s), "
+            f"{len(rechazados)} cortados con 429 antes de authenticate()"
+        )
+        if rechazados:
+            self.stdout.write(
+                f"  Request completo rechazado (test client, con el ataque compitiendo por CPU): "
+                f"p50 {statistics.median(rechazados):.1f} ms"
+            )
+        self.stdout.write(f"  Costo del chequeo con el límite agotado: {self._costo_rechazo(limites):.1f} µs")
+        llegaron = [ms for codigo, ms in ataque if codigo != 429]
+        if llegaron:
+            self.stdout.write(
+                f"  Intentos que llegaron a calcular PBKDF2: {len(llegaron)} "
+                f"(p50 {statistics.median(llegaron):.1f} ms)"
+            )
+
+    def _costo_rechazo(self, limites, n=20000):
+        """Cuánto cuesta decir que no: solo allow_request() con el límite agotado."""
+        request = Request(APIRequestFactory().post("/", {"legajo": 1}, format="json"), parsers=[JSONParser()])
+        request.META["REMOTE_ADDR"] = "198.51.100.1"
+        with override_settings(LIMITES_ACCESO=limites, CACHES=CACHE_PRUEBA):
+            throttle = LoginIPThrottle()
+            while throttle.allow_request(request, None):
+                pass
+            t0 = time.perf_counter()
+            for _ in range(n):
+                throttle.allow_request(request, None)
+            cache.clear()
+        return (time.perf_counter() - t0) / n * 1e6
+
+    def _login(self, cliente, legajo, password, ip):
+        t0 = time.perf_counter()
+        r = cliente.post(
+            "/api/agentes/login/",
+            {"legajo": legajo, "password": password},
+            format="json",
+            REMOTE_ADDR=ip,
+        )
+        return r.status_code, (time.perf_counter() - t0) * 1000
+
+    def _logins_legitimos(self, legajos, repeticiones=3):
+        resultados = []
+        cliente = APIClient()
+        for _ in range(repeticiones):
+            for i, legajo in enumerate(legajos):
+                # Cada login legítimo desde su propia IP (no es lo que medimos aquí)
+                ip = f"10.{len(resultados) // 250}.{len(resultados) % 250}.1"
+                resultados.append(self._login(cliente, legajo, PIN_OK, ip))
+        return resultados
+
+    def _con_ataque(self, legajos):
+        ataque = []
+        fin = time.monotonic() + self.opciones["segundos"]
+
+        # El atacante barre legajos al azar (existan o no: Django calcula el hash igual)
+        objetivo = range(legajos[-1] + 1, legajos[-1] + 1000)
+
+        def atacar(n):
+            cliente = APIClient()
+            ip = f"203.0.113.{n % 4 + 1}"  # Pocas IPs, muchos intentos
+            while time.monotonic() < fin:
+                pin = f"{random.randint(0, 999999):06d}"
+                ataque.append(self._login(cliente, random.choice(objetivo), pin, ip))
+            connection.close()
+
+        hilos = [
+            threading.Thread(target=atacar, args=(n,)) for n in range(self.opciones["atacantes"])
+        ]
+        for h in hilos:
+            h.start()
+        # Medimos a los usuarios legítimos en la segunda mitad, con el ataque ya "frenado"
+        time.sleep(self.opciones["segundos"] / 2)
+        legitimos = self._logins_legitimos(legajos, repeticiones=1)
+        for h in hilos:
+            h.join()
+        return ataque, legitimos
+
+    def _informe(self, titulo, resultados):
+        tiempos = sorted(ms for _, ms in resultados)
+        ok = sum(1 for codigo, _ in resultados if codigo == 200)
+        p95 = tiempos[int(len(tiempos) * 0.95) - 1] if len(tiempos) > 1 else tiempos[0]
+        self.stdout.write(
+            f"\n{titulo}: {ok}/{len(resultados)} OK, "
+            f"p50 {statistics.median(tiempos):.1f} ms, p95 {p95:.1f} ms"
+        )
@@ -0,0 +1,55 @@
+import io
+import logging
+import time
+
+from django.core.management.base import BaseCommand
+
+from core.registro import ColaHandler, FiltroRequestId, FormatoJSON, request_id_actual
+
+
+class _Lento(io.StringIO):
+    """stdout que tarda en aceptar cada línea (pipe lleno, disco lento)."""
+
+    def __init__(self, demora):
+        super().__init__()
+        self.demora = demora
+
+    def write(self, texto):
+        time.sleep(self.demora)
+        return super().write(texto)
+
+
+class Command(BaseCommand):
+    help = "Costo por llamada de logger.info: directo a un stdout lento vs. por la cola (ColaHandler)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--lineas", type=int, default=2000)
+        parser.add_argument("--demora-ms", type=float, default=0.2, help="Demora del stdout por línea")
+
+    def handle(self, *args, **options):
+        n = options["lineas"]
+        demora = options["demora_ms"] / 1000
+        request_id_actual.set("bench")
+
+        directo = logging.StreamHandler(_Lento(demora))
+        cola = ColaHandler(_Lento(demora))
+        for nombre, handler in (("StreamHandler directo", directo), ("ColaHandler (hilo escritor)", cola)):
+            handler.setFormatter(FormatoJSON())
+            handler.addFilter(FiltroRequestId())
+            logger = logging.getLogger(f"bench_registro.{len(nombre)}")
+            logger.handlers = [handler]
+            logger.propagate = False
+            logger.setLevel(logging.INFO)
+
+            t0 = time.perf_counter()
+            for i in range(n):
+                logger.info("Email enviado", extra={"solicitud": i, "para": "jefe@utn"})
+            por_llamada = (time.perf_counter() - t0) / n * 1e6
+            self.stdout.write(f"  {nombre:<30} {por_llamada:9.1f} µs por llamada")
+
+            t0 = time.perf_counter()
+            for i in range(n):
+                logger.debug("Apagado por nivel", extra={"i": i})
+            self.stdout.write(f"  {'  (debug filtrado por nivel)':<30} {(time.perf_counter() - t0) / n * 1e6:9.2f} µs")
+
+        cola.close()  # Espera a que el hilo termine de escribir
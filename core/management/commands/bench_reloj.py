@@ -0,0 +1,84 @@
+import os
+import random
+import tempfile
+import time
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from core.models import Agente, Area
+from core.reloj import ausencias_sin_justificar, importar_marcaciones
+
+
+class _Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = "Genera un año de marcaciones para N agentes y mide importación y conciliación."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--agentes", type=int, default=2000)
+        parser.add_argument("--anio", type=int, default=2025)
+
+    def handle(self, *args, **options):
+        n, anio = options["agentes"], options["anio"]
+        fd, ruta = tempfile.mkstemp(suffix=".txt")
+        os.close(fd)
+        try:
+            with transaction.atomic():
+                self._generar(ruta, n, anio)
+                self._medir(ruta, anio)
+                raise _Rollback()
+        except _Rollback:
+            pass
+        finally:
+            os.remove(ruta)
+
+    def _generar(self, ruta, n, anio):
+        area = Area.objects.create(nombre="__bench_reloj__")
+        base = Agente.objects.order_by("-legajo").values_list("legajo", flat=True).first() or 0
+        base_reloj = Agente.objects.order_by("-id_sistema_reloj").values_list(
+            "id_sistema_reloj", flat=True
+        ).first() or 0
+        Agente.objects.bulk_create(
+            [
+                Agente(legajo=base + 1 + i, id_sistema_reloj=base_reloj + 1 + i,
+                       nombre="N", apellido=f"A{i}", area=area)
+                for i in range(n)
+            ],
+            batch_size=2000,
+        )
+
+        # 4 marcaciones por día hábil, con un 3% de faltas al azar
+        azar = random.Random(3)
+        inicio = date(anio, 1, 1)
+        lineas = 0
+        with open(ruta, "w") as archivo:
+            for d in range((date(anio + 1, 1, 1) - inicio).days):
+                dia = inicio + timedelta(days=d)
+                if dia.weekday() >= 5:
+                    continue
+                texto = dia.isoformat()
+                for i in range(n):
+                    if azar.random() < 0.03:
+                        continue
+                    id_reloj = base_reloj + 1 + i
+                    for hora in ("07:58:12", "12:01:40", "12:59:03", "17:02:55"):
+                        archivo.write(f"{id_reloj:>9}\t{texto} {hora}\t1\t0\n")
+                        lineas += 1
+        self.stdout.write(f"Archivo: {lineas} marcaciones de {n} agentes ({os.path.getsize(ruta) // 2**20} MB)")
+        self.area = area
+
+    def _medir(self, ruta, anio):
+        t0 = time.perf_counter()
+        with open(ruta) as archivo:
+            resumen = importar_marcaciones(archivo)
+        t1 = time.perf_counter()
+        reporte = ausencias_sin_justificar(date(anio, 1, 1), date(anio, 12, 31), self.area.id)
+        t2 = time.perf_counter()
+
+        self.stdout.write(f"  Importación: {t1 - t0:6.2f} s ({resumen['dias_presencia']} días de presencia)")
+        faltas = sum(a["dias"] for a in reporte)
+        self.stdout.write(f"  Conciliación: {t2 - t1:6.2f} s ({faltas} faltas sin justificar)")
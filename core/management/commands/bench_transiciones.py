@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import Counter
+from datetime import date, timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+
+from core.models import Agente, Area, Solicitud, TipoLicencia
+from core.transiciones import ConflictoDeEstado, aplicar_transicion, eliminar_si_pendiente
+
+
+class Command(BaseCommand):
+    help = (
+        "Prueba de carga concurrente: N hilos intentan la misma transición a la vez. "
+        "Debe ganar exactamente uno por solicitud. "
+        "Crea datos de prueba en la base configurada (y los borra al final): no correr en producción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--hilos", type=int, default=8)
+        parser.add_argument("--rondas", type=int, default=50)
+
+    def handle(self, *args, **options):
+        hilos, rondas = options["hilos"], options["rondas"]
+        self.dia = date(1990, 1, 1)  # Cada solicitud en un día distinto (no se superponen)
+        area = Area.objects.create(nombre="__bench_transiciones__")
+        tipo = TipoLicencia.objects.create(
+            codigo="__bench_tr__", descripcion="Bench", texto_para_reloj="BENCH"
+        )
+        base = Agente.objects.order_by("-legajo").values_list("legajo", flat=True).first() or 0
+        agente = Agente.objects.create(legajo=base + 1, nombre="Bench", apellido="Bench", area=area)
+
+        try:
+            self._escenario(
+                "RRHH vs RRHH (AVISO_CONFIRMADO -> IMPACTADO)",
+                agente, tipo, hilos, rondas, "AVISO_CONFIRMADO",
+                lambda s: aplicar_transicion(s, "IMPACTADO"),
+            )
+            self._escenario(
+                "Jefe vs Agente (confirmar vs borrar)",
+                agente, tipo, hilos, rondas, "PENDIENTE_VALIDACION",
+                lambda s, i: (
+                    aplicar_transicion(s, "AVISO_CONFIRMADO") if i % 2 else eliminar_si_pendiente(s)
+                ),
+                con_indice=True,
+            )
+        finally:
+            Solicitud.todas.filter(agente=agente).delete()
+            agente.delete()
+            tipo.delete()
+            area.delete()
+
+    def _escenario(self, titulo, agente, tipo, hilos, rondas, estado_inicial, accion, con_indice=False):
+        resultados = Counter()
+        rondas_rotas = 0
+        t0 = time.perf_counter()
+
+        for ronda in range(rondas):
+            self.dia += timedelta(days=1)
+            solicitud = Solicitud.objects.create(
+                agente=agente, tipo=tipo, fecha_inicio=self.dia, estado=estado_inicial
+            )
+            barrera = threading.Barrier(hilos)
+            ganadores = []
+
+            def trabajar(i):
+                # Cada hilo lee su propia copia, como dos requests distintos
+                copia = Solicitud.objects.get(pk=solicitud.pk)
+                barrera.wait()
+                try:
+                    accion(copia, i) if con_indice else accion(copia)
+                    ganadores.append(i)
+                    resultados["ok"] += 1
+                except ConflictoDeEstado:
+                    resultados["409"] += 1
+                except Exception as e:  # Ej: "database is locked" en SQLite
+                    resultados[type(e).__name__] += 1
+                finally:
+                    connection.close()
+
+            threads = [threading.Thread(target=trabajar, args=(i,)) for i in range(hilos)]
+            for t in threads:
+                t.start()
+            for t in threads:
+                t.join()
+
+            if len(ganadores) != 1:
+                rondas_rotas += 1
+
+        total = time.perf_counter() - t0
+        estilo = self.style.SUCCESS if rondas_rotas == 0 else self.style.ERROR
+        self.stdout.write(f"\n{titulo}")
+        self.stdout.write(f"  {rondas} rondas x {hilos} hilos en {total:.2f}s -> {dict(resultados)}")
+        self.stdout.write(estilo(f"  Rondas con más (o menos) de un ganador: {rondas_rotas}"))
@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from core.avisos import enviar_resumenes
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía un email de resumen por jefe con los avisos acumulados "
+        "(programar con cron, ej: cada 5 minutos)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--forzar",
+            action="store_true",
+            help="Enviar todo lo pendiente sin esperar la ventana RESUMEN_AVISOS_MINUTOS",
+        )
+
+    def handle(self, *args, **options):
+        emails, avisos = enviar_resumenes(forzar=options["forzar"])
+        self.stdout.write(f"📧 {emails} resúmenes enviados ({avisos} avisos)")
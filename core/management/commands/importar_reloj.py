@@ -0,0 +1,32 @@
+from django.core.management.base import BaseCommand
+
+from core.reloj import importar_marcaciones
+
+
+class Command(BaseCommand):
+    help = (
+        "Importa el archivo de marcaciones exportado por el reloj "
+        "(id_reloj y fecha/hora por línea). Se puede reimportar sin duplicar."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("archivo")
+        parser.add_argument("--encoding", default="utf-8")
+
+    def handle(self, *args, **options):
+        with open(options["archivo"], encoding=options["encoding"], errors="replace") as archivo:
+            resumen = importar_marcaciones(archivo)
+
+        self.stdout.write(
+            f"⏱️ {resumen['lineas']} líneas leídas, {resumen['dias_presencia']} días de presencia "
+            f"({resumen['ignoradas']} ignoradas)"
+        )
+        if "desde" in resumen:
+            self.stdout.write(f"📅 Período: {resumen['desde']:%d/%m/%Y} al {resumen['hasta']:%d/%m/%Y}")
+        if resumen["desconocidos"]:
+            self.stdout.write(
+                self.style.WARNING(
+                    f"⚠️ {len(resumen['desconocidos'])} ids de reloj sin agente: "
+                    f"{', '.join(map(str, resumen['desconocidos'][:20]))}"
+                )
+            )
@@ -0,0 +1,65 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import django
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.utils import timezone
+
+from core.legajo import actualizar_legajo_de, agentes_con_impactadas
+
+
+def _iniciar_proceso():
+    # Con "spawn"/"forkserver" el proceso hijo arranca sin Django configurado
+    django.setup()
+
+
+def _procesar(agente_id, anio, de_cero):
+    try:
+        return agente_id, actualizar_legajo_de(agente_id, anio, de_cero), None
+    except Exception as error:
+        return agente_id, 0, repr(error)
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera (o completa) el legajo anual en PDF de todos los agentes con licencias "
+        "impactadas en el año. Los agentes se reparten entre varios procesos."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--anio", type=int, help="Año (por defecto, el actual)")
+        parser.add_argument(
+            "--procesos", type=int, default=os.cpu_count() or 1, help="Procesos en paralelo"
+        )
+        parser.add_argument(
+            "--de-cero", action="store_true", help="Vuelve a armar los legajos aunque ya existan"
+        )
+
+    def handle(self, *args, **options):
+        anio = options["anio"] or timezone.localdate().year
+        agentes = agentes_con_impactadas(anio)
+        self.stdout.write(f"📚 Legajos {anio}: {len(agentes)} agentes, {options['procesos']} procesos")
+
+        t0 = time.perf_counter()
+        agregadas, errores = 0, []
+        # Los hijos no pueden compartir la conexión abierta del padre
+        connections.close_all()
+        with ProcessPoolExecutor(options["procesos"], initializer=_iniciar_proceso) as pool:
+            pendientes = [
+                pool.submit(_procesar, agente_id, anio, options["de_cero"]) for agente_id in agentes
+            ]
+            for hecho, futuro in enumerate(as_completed(pendientes), start=1):
+                agente_id, cantidad, error = futuro.result()
+                agregadas += cantidad
+                if error:
+                    errores.append((agente_id, error))
+                if hecho % 100 == 0:
+                    self.stdout.write(f"   {hecho}/{len(agentes)} agentes")
+
+        self.stdout.write(
+            f"✅ {agregadas} solicitudes agregadas en {time.perf_counter() - t0:.1f} s"
+        )
+        for agente_id, error in errores:
+            self.stderr.write(f"❌ Agente {agente_id}: {error}")
@@ -0,0 +1,41 @@
+import csv
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.descuentos import filas_lote, generar_lote
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera el lote mensual de descuentos (solicitudes SIN AVISO) y escribe el "
+        "archivo para Liquidación de Haberes. Volver a correrlo devuelve el mismo lote."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--mes", help="AAAA-MM (por defecto, el mes anterior)")
+        parser.add_argument("--salida", help="Archivo CSV a escribir (por defecto, solo genera)")
+
+    def handle(self, *args, **options):
+        anio, mes = self._mes(options["mes"])
+        lote, creado = generar_lote(anio, mes)
+        estado = "generado" if creado else "ya existía"
+        self.stdout.write(f"💸 Lote {lote.periodo:%m/%Y} {estado}: {lote}")
+
+        if options["salida"]:
+            with open(options["salida"], "w", newline="", encoding="utf-8") as archivo:
+                csv.writer(archivo).writerows(filas_lote(lote))
+            self.stdout.write(f"📄 Archivo escrito en {options['salida']}")
+
+    @staticmethod
+    def _mes(texto):
+        if not texto:
+            hoy = timezone.localdate()
+            return (hoy.year, hoy.month - 1) if hoy.month > 1 else (hoy.year - 1, 12)
+        try:
+            anio, mes = (int(parte) for parte in texto.split("-"))
+            date(anio, mes, 1)
+        except ValueError:
+            raise CommandError("El mes debe tener el formato AAAA-MM (ej: 2026-09)")
+        return anio, mes
@@ -0,0 +1,10 @@
+from django.core.management.base import BaseCommand
+
+from core.idempotencia import purgar_vencidas
+
+
+class Command(BaseCommand):
+    help = "Borra las claves de idempotencia vencidas (programar con cron, ej: una vez por día)."
+
+    def handle(self, *args, **options):
+        self.stdout.write(f"🧹 {purgar_vencidas()} claves vencidas borradas")
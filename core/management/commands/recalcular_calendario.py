@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from django.db.models.functions import ExtractYear
+
+from core.calendario import recalcular_fechas_fin, reconstruir_anio
+from core.models import Solicitud
+
+
+class Command(BaseCommand):
+    help = (
+        "Regenera el mapa de días hábiles y recalcula fecha_fin de las licencias "
+        "en días hábiles (por defecto, todos los años con solicitudes). Las que "
+        "chocarían con otra licencia del agente se informan y no se tocan."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--anio", type=int, action="append", help="Año a procesar (repetible)")
+
+    def handle(self, *args, **options):
+        anios = options["anio"] or sorted(
+            Solicitud.todas.annotate(anio=ExtractYear("fecha_inicio"))
+            .values_list("anio", flat=True)
+            .distinct()
+        )
+        for anio in anios:
+            reconstruir_anio(anio)
+            cambiadas, conflictos = recalcular_fechas_fin(anio)
+            self.stdout.write(f"📅 {anio}: mapa regenerado, {cambiadas} solicitudes con nueva fecha de fin")
+            for pk, fin, choques in conflictos:
+                self.stderr.write(
+                    f"⚠️ Solicitud #{pk}: terminaría el {fin:%d/%m/%Y} y se cruza con "
+                    + ", ".join(f"#{otra}" for otra in choques)
+                    + " (quedó con su fecha de fin anterior)"
+                )
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+
+from core.models import ContadorPendientes
+from core.pendientes import reconstruir
+
+
+class Command(BaseCommand):
+    help = (
+        "Vuelve a contar desde cero las solicitudes pendientes de cada jefe y de RRHH "
+        "(los contadores de los badges). Muestra los que estaban desfasados."
+    )
+
+    def handle(self, *args, **options):
+        diferencias = reconstruir()
+        for clave, (antes, ahora) in sorted(diferencias.items()):
+            self.stdout.write(f"   {clave}: {antes} -> {ahora}")
+        self.stdout.write(
+            f"🔢 {ContadorPendientes.objects.count()} contadores recalculados "
+            f"({len(diferencias)} corregidos)"
+        )
@@ -0,0 +1,351 @@
+import json
+import logging
+import shutil
+import tempfile
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from urllib.error import HTTPError, URLError
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.core.servers.basehttp import ThreadedWSGIServer, WSGIRequestHandler
+from django.core.wsgi import get_wsgi_application
+from django.db import transaction
+from django.test.utils import override_settings
+
+from core import pendientes
+from core.eventos import canal_jefe
+from core.models import (
+    Agente,
+    Area,
+    ClaveIdempotencia,
+    ContadorPendientes,
+    HistorialEstado,
+    Solicitud,
+    TipoLicencia,
+)
+
+PIN = "583920"  # Pasa las reglas de activación para los datos que se generan abajo
+NACIMIENTO = date(1980, 11, 25)
+PREFIJO_CLAVE = "simulacion-"
+
+PASOS = (
+    "validar_identidad",
+    "activar_cuenta",
+    "login",
+    "formulario",
+    "crear",
+    "bandeja_jefe",
+    "validar_jefe",
+    "reclamar_rrhh",
+    "aprobar_rrhh",
+)
+
+
+class _Silencioso(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class Cliente:
+    """Un usuario del frontend: su marca de "leer lo que escribí" y sus mediciones."""
+
+    def __init__(self, base, mediciones):
+        self.base = base
+        self.mediciones = mediciones
+        self.primaria_hasta = None
+
+    def pedir(self, paso, metodo, ruta, datos=None, idempotente=False):
+        headers = {"Content-Type": "application/json"}
+        if idempotente:
+            headers["Idempotency-Key"] = PREFIJO_CLAVE + uuid.uuid4().hex
+        if self.primaria_hasta:
+            headers["X-Primaria-Hasta"] = self.primaria_hasta
+        cuerpo = json.dumps(datos).encode() if datos is not None else None
+        pedido = Request(self.base + ruta, data=cuerpo, headers=headers, method=metodo)
+
+        t0 = time.perf_counter()
+        try:
+            with urlopen(pedido, timeout=60) as respuesta:
+                contenido = respuesta.read()
+                estado = respuesta.status
+                self.primaria_hasta = respuesta.headers.get("X-Primaria-Hasta") or self.primaria_hasta
+        except HTTPError as e:
+            contenido, estado = e.read(), e.code
+        except (URLError, OSError):
+            contenido, estado = b"", 0  # Conexión rechazada o timeout
+        self.mediciones[paso].append((time.perf_counter() - t0, estado))
+
+        if not 200 <= estado < 300:
+            return None
+        return json.loads(contenido) if contenido else {}
+
+
+class Command(BaseCommand):
+    help = (
+        "Simula el pico de 7 a 9: muchos agentes activan la cuenta, entran, abren el "
+        "formulario y cargan su aviso mientras los jefes validan y RRHH aprueba. "
+        "Levanta un servidor local (o usa --url) y reporta por paso: pedidos por "
+        "segundo, % de errores y latencias p50/p90/p99."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--agentes", type=int, default=200)
+        parser.add_argument("--jefes", type=int, default=5)
+        parser.add_argument("--rrhh", type=int, default=3)
+        parser.add_argument("--concurrencia", type=int, default=50, help="Agentes a la vez")
+        parser.add_argument("--pausa", type=float, default=1.0, help="Segundos entre vistazos a la bandeja")
+        parser.add_argument("--limite", type=float, default=600, help="Segundos máximos de simulación")
+        parser.add_argument(
+            "--url", help="Servidor ya levantado (ej: gunicorn de staging) que use esta misma base"
+        )
+
+    def handle(self, *args, **options):
+        self.mediciones = defaultdict(list)
+        datos = self._crear_datos(options["agentes"], options["jefes"], options["rrhh"])
+        media = tempfile.mkdtemp(prefix="simulacion_")
+        servidor = None
+        # Los 4xx esperables (409 entre operadores) no deben tapar el reporte
+        logging.getLogger("django.request").setLevel(logging.ERROR)
+
+        try:
+            # Emails a memoria y PDFs a una carpeta temporal: se paga su costo sin dejar rastros.
+            # Todos los clientes salen de 127.0.0.1, así que los límites por IP se abren para
+            # el servidor propio; con --url rigen los del servidor probado.
+            with override_settings(
+                EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend",
+                MEDIA_ROOT=media,
+                LIMITES_ACCESO=self._limites_sin_ip(),
+            ):
+                if options["url"]:
+                    base = options["url"].rstrip("/")
+                else:
+                    servidor = ThreadedWSGIServer(("127.0.0.1", 0), _Silencioso)
+                    servidor.set_app(get_wsgi_application())
+                    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+                    base = f"http://127.0.0.1:{servidor.server_address[1]}"
+
+                self.stdout.write(
+                    f"🚦 {options['agentes']} agentes ({options['concurrencia']} a la vez), "
+                    f"{options['jefes']} jefes y {options['rrhh']} operadores de RRHH contra {base}"
+                )
+                total = self._simular(base, datos, options)
+        finally:
+            if servidor is not None:
+                servidor.shutdown()
+                servidor.server_close()
+            self._borrar_datos(datos)
+            shutil.rmtree(media, ignore_errors=True)
+
+        self._reportar(total)
+
+    @staticmethod
+    def _limites_sin_ip():
+        limites = {scope: dict(limite) for scope, limite in settings.LIMITES_ACCESO.items()}
+        for scope, limite in limites.items():
+            if scope.endswith("_ip"):
+                limite["intentos"] = 1_000_000
+        return limites
+
+    # ---------------------------------------------------------
+    # DATOS DE PRUEBA
+    # ---------------------------------------------------------
+    def _crear_datos(self, cantidad, jefes, operadores):
+        base = Agente.objects.order_by("-legajo").values_list("legajo", flat=True).first() or 0
+        tipo = TipoLicencia.objects.create(
+            codigo="__simulacion__", descripcion="Simulación", texto_para_reloj="SIM"
+        )
+        areas = [Area.objects.create(nombre=f"__simulacion_{i}__") for i in range(jefes)]
+
+        legajo = iter(range(base + 1, base + 1 + cantidad + jefes + operadores))
+        lista_jefes = [
+            Agente.objects.create(
+                legajo=next(legajo), nombre="Jefe", apellido=f"Simulado {i}", area=area, categoria="03"
+            )
+            for i, area in enumerate(areas)
+        ]
+        lista_rrhh = [
+            Agente.objects.create(
+                legajo=next(legajo), nombre="RRHH", apellido=f"Simulado {i}", area=areas[0], es_rrhh=True
+            )
+            for i in range(operadores)
+        ]
+        agentes = []
+        for i in range(cantidad):
+            numero = next(legajo)
+            agentes.append(
+                Agente.objects.create(
+                    legajo=numero,
+                    nombre="Agente",
+                    apellido=f"Simulado {i}",
+                    area=areas[i % jefes],
+                    dni=str(70000000 + i),
+                    fecha_nacimiento=NACIMIENTO,
+                    email=f"simulado{numero}@example.com",
+                )
+            )
+        return {"tipo": tipo, "areas": areas, "jefes": lista_jefes, "rrhh": lista_rrhh, "agentes": agentes}
+
+    def _borrar_datos(self, datos):
+        todos = datos["agentes"] + datos["jefes"] + datos["rrhh"]
+        with transaction.atomic():
+            simuladas = Solicitud.todas.filter(agente__in=todos)
+            pendientes.quitar(simuladas)
+            # El historial no se borra en cascada (DO_NOTHING): sin esto las
+            # transiciones simuladas quedarían para siempre en reporte_sla y /sla/
+            HistorialEstado.objects.filter(solicitud_id__in=simuladas.values("pk")).delete()
+            simuladas.delete()
+        ContadorPendientes.objects.filter(pk__in=[canal_jefe(j.pk) for j in datos["jefes"]]).delete()
+        User.objects.filter(agente_perfil__in=todos).delete()
+        ClaveIdempotencia.objects.filter(clave__startswith=PREFIJO_CLAVE).delete()
+        Agente.objects.filter(pk__in=[a.pk for a in todos]).delete()
+        Area.objects.filter(pk__in=[a.pk for a in datos["areas"]]).delete()
+        datos["tipo"].delete()
+
+    # ---------------------------------------------------------
+    # FLUJOS
+    # ---------------------------------------------------------
+    def _simular(self, base, datos, options):
+        cantidad = len(datos["agentes"])
+        fin_agentes = threading.Event()
+        vence = time.monotonic() + options["limite"]
+        fecha = date.today() + timedelta(days=1)
+
+        def agente(i, a):
+            cliente = Cliente(base, self.mediciones)
+            paso1 = cliente.pedir(
+                "validar_identidad", "POST", "/api/agentes/validar_identidad/",
+                {"legajo": a.legajo, "dni": a.dni, "fecha_nacimiento": NACIMIENTO.isoformat()},
+            )
+            if paso1 is None or cliente.pedir(
+                "activar_cuenta", "POST", "/api/agentes/activar_cuenta/",
+                {"token": paso1["token"], "password": PIN},
+            ) is None:
+                return
+            perfil = cliente.pedir("login", "POST", "/api/agentes/login/", {"legajo": a.legajo, "password": PIN})
+            if perfil is None:
+                return
+            formulario = cliente.pedir("formulario", "GET", f"/api/agentes/{perfil['id']}/formulario/")
+            if not formulario or not formulario["supervisores"]:
+                return
+            cliente.pedir(
+                "crear", "POST", "/api/solicitudes/",
+                {
+                    "agente": perfil["id"],
+                    "tipo": datos["tipo"].pk,
+                    "jefe_seleccionado": formulario["supervisores"][0]["id"],
+                    "fecha_inicio": fecha.isoformat(),
+                    "dias": 1,
+                    "motivo": "Simulación de pico",
+                },
+                idempotente=True,
+            )
+
+        # Jefes y RRHH no reintentan lo que ya les falló (queda contado como error)
+        def jefe(i, j):
+            cliente = Cliente(base, self.mediciones)
+            vistas = set()
+            while time.monotonic() < vence:
+                bandeja = cliente.pedir("bandeja_jefe", "GET", f"/api/solicitudes/?jefe={j.pk}") or []
+                nuevas = [fila["id"] for fila in bandeja if fila["id"] not in vistas]
+                for pk in nuevas:
+                    vistas.add(pk)
+                    cliente.pedir(
+                        "validar_jefe", "PATCH", f"/api/solicitudes/{pk}/",
+                        {"estado": "AVISO_CONFIRMADO"}, idempotente=True,
+                    )
+                if not nuevas:
+                    if fin_agentes.is_set():
+                        return
+                    time.sleep(options["pausa"])
+
+        def rrhh(i, operador):
+            cliente = Cliente(base, self.mediciones)
+            vistas, vacias = set(), 0
+            while time.monotonic() < vence:
+                tomadas = cliente.pedir(
+                    "reclamar_rrhh", "POST", "/api/solicitudes/reclamar/",
+                    {"operador": operador.pk, "cantidad": 10},
+                )
+                nuevas = [
+                    fila["id"] for fila in (tomadas or {}).get("reclamadas", []) if fila["id"] not in vistas
+                ]
+                for pk in nuevas:
+                    vistas.add(pk)
+                    cliente.pedir(
+                        "aprobar_rrhh", "PATCH", f"/api/solicitudes/{pk}/",
+                        {"estado": "IMPACTADO", "operador": operador.pk}, idempotente=True,
+                    )
+                if nuevas:
+                    vacias = 0
+                    continue
+                # Cuando los agentes terminaron, dos vueltas vacías seguidas = cola vacía
+                vacias = vacias + 1 if fin_agentes.is_set() else 0
+                if vacias >= 2:
+                    return
+                time.sleep(options["pausa"])
+
+        t0 = time.perf_counter()
+        hilos = [threading.Thread(target=jefe, args=(i, j)) for i, j in enumerate(datos["jefes"])]
+        hilos += [threading.Thread(target=rrhh, args=(i, r)) for i, r in enumerate(datos["rrhh"])]
+        for hilo in hilos:
+            hilo.start()
+
+        with ThreadPoolExecutor(max_workers=options["concurrencia"]) as pool:
+            list(pool.map(agente, range(cantidad), datos["agentes"]))
+        fin_agentes.set()
+        for hilo in hilos:
+            hilo.join()
+        return time.perf_counter() - t0
+
+    # ---------------------------------------------------------
+    # REPORTE
+    # ---------------------------------------------------------
+    def _reportar(self, total):
+        self.stdout.write(f"\n⏱️ Simulación completa en {total:.1f}s\n")
+        self.stdout.write(
+            f"  {'paso':<18}{'pedidos':>8}{'req/s':>8}{'errores':>9}"
+            f"{'p50 ms':>9}{'p90 ms':>9}{'p99 ms':>9}{'máx ms':>9}"
+        )
+        pedidos = errores = 0
+        for paso in PASOS:
+            medidas = self.mediciones.get(paso)
+            if not medidas:
+                continue
+            tiempos = sorted(segundos * 1000 for segundos, _ in medidas)
+            fallidos = sum(1 for _, estado in medidas if not 200 <= estado < 300)
+            pedidos += len(medidas)
+            errores += fallidos
+            estilo = self.style.ERROR if fallidos else (lambda texto: texto)
+            self.stdout.write(
+                estilo(
+                    f"  {paso:<18}{len(medidas):>8}{len(medidas) / total:>8.1f}"
+                    f"{100 * fallidos / len(medidas):>8.1f}%"
+                    f"{_percentil(tiempos, 50):>9.0f}{_percentil(tiempos, 90):>9.0f}"
+                    f"{_percentil(tiempos, 99):>9.0f}{tiempos[-1]:>9.0f}"
+                )
+            )
+        if pedidos:
+            self.stdout.write(
+                f"\n  Total: {pedidos} pedidos, {pedidos / total:.1f} req/s, "
+                f"{100 * errores / pedidos:.1f}% de errores"
+            )
+        estados = defaultdict(int)
+        for medidas in self.mediciones.values():
+            for _, estado in medidas:
+                if not 200 <= estado < 300:
+                    estados[estado or "sin respuesta"] += 1
+        if estados:
+            self.stdout.write(f"  Errores por código HTTP: {dict(estados)}")
+
+
+def _percentil(ordenados, p):
+    # Nearest-rank: el valor por debajo del cual queda el p% de las mediciones
+    indice = max(0, min(len(ordenados) - 1, -(-len(ordenados) * p // 100) - 1))
+    return ordenados[indice]
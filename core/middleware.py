@@ -0,0 +1,200 @@
+import uuid
+import zlib
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.signals import request_finished
+from django.dispatch import receiver
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+
+from .registro import request_id_actual
+from .replica import leer_de_primaria, marca_vigente, marcar_escritura
+
+try:
+    import brotli
+except ImportError:  # Sin brotli instalado seguimos ofreciendo gzip
+    brotli = None
+
+
+re_accepts_br = _lazy_re_compile(r"\bbr\b")
+re_accepts_gzip = _lazy_re_compile(r"\bgzip\b")
+
+# Tipos que no conviene tocar: ya vienen comprimidos o necesitan llegar al instante
+TIPOS_EXCLUIDOS = ("text/event-stream", "image/", "application/pdf", "application/zip")
+
+
+# ---------------------------------------------------------
+# COMPRESORES (Misma interfaz para brotli y gzip)
+# ---------------------------------------------------------
+def _nuevo_compresor(encoding):
+    if encoding == "br":
+        nivel = getattr(settings, "COMPRESION_NIVEL_BROTLI", 5)
+        compresor = brotli.Compressor(quality=nivel)
+        return compresor.process, compresor.finish
+
+    nivel = getattr(settings, "COMPRESION_NIVEL_GZIP", 6)
+    # wbits 16+MAX_WBITS -> formato gzip (con cabecera y CRC)
+    compresor = zlib.compressobj(nivel, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compresor.compress, compresor.flush
+
+
+def comprimir(contenido, encoding):
+    procesar, terminar = _nuevo_compresor(encoding)
+    return procesar(contenido) + terminar()
+
+
+def comprimir_stream(partes, encoding):
+    """Comprime un iterador de bytes pedazo a pedazo (sin cargarlo entero en memoria)."""
+    procesar, terminar = _nuevo_compresor(encoding)
+    for parte in partes:
+        salida = procesar(parte)
+        if salida:
+            yield salida
+    yield terminar()
+
+
+async def comprimir_stream_async(partes, encoding):
+    procesar, terminar = _nuevo_compresor(encoding)
+    async for parte in partes:
+        salida = procesar(parte)
+        if salida:
+            yield salida
+    yield terminar()
+
+
+def elegir_encoding(request):
+    """Brotli si el navegador lo acepta (comprime más), si no gzip."""
+    aceptados = request.META.get("HTTP_ACCEPT_ENCODING", "")
+    if brotli is not None and re_accepts_br.search(aceptados):
+        return "br"
+    if re_accepts_gzip.search(aceptados):
+        return "gzip"
+    return None
+
+
+# ---------------------------------------------------------
+# MIDDLEWARE
+# ---------------------------------------------------------
+class MiddlewareSyncAsync:
+    """
+    Base de los middlewares propios: sirven bajo WSGI y bajo ASGI sin que Django
+    tenga que pasar la cadena de sync a async (y sin un hilo por request en el
+    stream de eventos). Las subclases definen antes() y procesar_respuesta().
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        self.antes(request)
+        return self.procesar_respuesta(request, self.get_response(request))
+
+    async def __acall__(self, request):
+        self.antes(request)
+        return self.procesar_respuesta(request, await self.get_response(request))
+
+    def antes(self, request):
+        pass
+
+    def procesar_respuesta(self, request, response):
+        return response
+
+
+class CompresionMiddleware(MiddlewareSyncAsync):
+    """
+    Comprime las respuestas de la API y los reportes con brotli o gzip.
+    - Respuestas normales: solo si superan settings.COMPRESION_MINIMO bytes.
+    - StreamingHttpResponse (ej: exportar_excel): se comprime pedazo a pedazo.
+    """
+
+    def procesar_respuesta(self, request, response):
+        if response.has_header("Content-Encoding") or response.status_code < 200:
+            return response
+
+        tipo = response.get("Content-Type", "")
+        if any(tipo.startswith(t) for t in TIPOS_EXCLUIDOS):
+            return response
+
+        # Aunque no comprimamos esta vez, la respuesta depende del Accept-Encoding
+        patch_vary_headers(response, ("Accept-Encoding",))
+
+        encoding = elegir_encoding(request)
+        if encoding is None:
+            return response
+
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = comprimir_stream_async(
+                    response.streaming_content, encoding
+                )
+            else:
+                response.streaming_content = comprimir_stream(
+                    response.streaming_content, encoding
+                )
+            # El largo final no se conoce de antemano
+            del response["Content-Length"]
+        else:
+            if len(response.content) < getattr(settings, "COMPRESION_MINIMO", 1024):
+                return response
+
+            comprimido = comprimir(response.content, encoding)
+            # Si no ganamos nada, mandamos el original
+            if len(comprimido) >= len(response.content):
+                return response
+
+            response.content = comprimido
+            response["Content-Length"] = str(len(comprimido))
+
+        # Un ETag fuerte deja de ser válido al cambiar los bytes
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+
+        response["Content-Encoding"] = encoding
+        return response
+
+
+class RequestIdMiddleware(MiddlewareSyncAsync):
+    """
+    Asigna un id a cada request (o respeta el X-Request-ID que mande el proxy)
+    para que todas las líneas de log del mismo pedido se puedan agrupar.
+    """
+
+    def antes(self, request):
+        request.request_id = request.headers.get("X-Request-ID", "")[:64] or uuid.uuid4().hex
+        # Se limpia con request_finished (y no al volver de get_response), porque
+        # Django loguea los 4xx/5xx después de recorrer los middlewares.
+        request_id_actual.set(request.request_id)
+
+    def procesar_respuesta(self, request, response):
+        response["X-Request-ID"] = request.request_id
+        return response
+
+
+class ReplicaMiddleware(MiddlewareSyncAsync):
+    """
+    Arranca cada request leyendo de la primaria (las vistas de solo lectura
+    piden la réplica) y marca al cliente después de cada escritura exitosa.
+    """
+
+    def antes(self, request):
+        leer_de_primaria()
+        request.primaria_pegada = marca_vigente(request)
+
+    def procesar_respuesta(self, request, response):
+        if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+            marcar_escritura(response)
+        return response
+
+
+@receiver(request_finished)
+def limpiar_request_id(sender, **kwargs):
+    request_id_actual.set(None)
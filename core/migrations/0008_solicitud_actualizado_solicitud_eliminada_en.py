@@ -0,0 +1,25 @@
+# Generated by Django 6.0.1 on 2026-10-19 10:00
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0007_area_remove_agente_supervisores_agente_categoria_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitud',
+            name='actualizado',
+            field=models.DateTimeField(auto_now=True, db_index=True, default=django.utils.timezone.now),
+            preserve_default=False,
+        ),
+        migrations.AddField(
+            model_name='solicitud',
+            name='eliminada_en',
+            field=models.DateTimeField(blank=True, editable=False, help_text='Borrado lógico (tombstone)', null=True),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0008_solicitud_actualizado_solicitud_eliminada_en'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitud',
+            name='reclamada_hasta',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='solicitud',
+            name='reclamada_por',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='solicitudes_reclamadas', to='core.agente'),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['estado', 'reclamada_hasta'], name='solicitud_cola_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:39
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0009_solicitud_reclamada'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HistorialEstado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('estado_anterior', models.CharField(blank=True, max_length=30, null=True)),
+                ('estado_nuevo', models.CharField(max_length=30)),
+                ('fecha', models.DateTimeField(default=django.utils.timezone.now)),
+                ('segundos_en_estado', models.FloatField(blank=True, null=True)),
+                ('area', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.area')),
+                ('jefe', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.agente')),
+                ('solicitud', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='historial', to='core.solicitud')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['estado_anterior', 'fecha'], name='historial_sla_idx'), models.Index(fields=['solicitud', 'fecha'], name='historial_solicitud_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,100 @@
+# Generated by Django 6.0.1 on 2026-10-19 11:00
+
+from datetime import timedelta
+
+from django.db import migrations, models
+
+# Sin superposición de períodos por agente, salvo rechazadas o borradas.
+# Requiere btree_gist para poder comparar agente_id (=) dentro de un índice GiST.
+SQL_EXCLUSION = """
+CREATE EXTENSION IF NOT EXISTS btree_gist;
+ALTER TABLE core_solicitud ADD CONSTRAINT solicitud_sin_superposicion
+    EXCLUDE USING gist (
+        agente_id WITH =,
+        daterange(fecha_inicio, fecha_fin, '[]') WITH &&
+    )
+    WHERE (estado NOT LIKE '%%RECHAZADO%%' AND eliminada_en IS NULL);
+"""
+
+SQL_EXCLUSION_REVERSA = """
+ALTER TABLE core_solicitud DROP CONSTRAINT IF EXISTS solicitud_sin_superposicion;
+"""
+
+
+def calcular_fechas_fin(apps, schema_editor):
+    Solicitud = apps.get_model("core", "Solicitud")
+    pendientes = []
+    for solicitud in Solicitud._base_manager.only("id", "fecha_inicio", "dias").iterator():
+        solicitud.fecha_fin = solicitud.fecha_inicio + timedelta(days=max(solicitud.dias or 1, 1) - 1)
+        pendientes.append(solicitud)
+    Solicitud._base_manager.bulk_update(pendientes, ["fecha_fin"], batch_size=1000)
+
+
+def superpuestas(Solicitud):
+    """Pares (agente, id, id) de solicitudes vigentes que ya se cruzan entre sí."""
+    vigentes = (
+        Solicitud._base_manager.filter(eliminada_en__isnull=True)
+        .exclude(estado__contains="RECHAZADO")
+        .order_by("agente_id", "fecha_inicio", "id")
+        .values_list("agente_id", "id", "fecha_inicio", "fecha_fin")
+    )
+    pares, agente_actual, abierta = [], None, None  # abierta: (id, fin) que llega más lejos
+    for agente_id, pk, inicio, fin in vigentes.iterator():
+        if agente_id != agente_actual:
+            agente_actual, abierta = agente_id, (pk, fin)
+            continue
+        if inicio <= abierta[1]:
+            pares.append((agente_id, abierta[0], pk))
+        if fin > abierta[1]:
+            abierta = (pk, fin)
+    return pares
+
+
+def crear_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor != "postgresql":
+        return
+    # Antes solo se comparaba fecha_inicio, así que puede haber períodos cruzados:
+    # con ellos el ALTER TABLE falla a mitad de camino sin decir cuáles son.
+    pares = superpuestas(apps.get_model("core", "Solicitud"))
+    if pares:
+        detalle = "\n".join(
+            f"  agente {agente_id}: solicitudes #{uno} y #{otro}" for agente_id, uno, otro in pares[:100]
+        )
+        resto = f"\n  ... y {len(pares) - 100} más" if len(pares) > 100 else ""
+        raise RuntimeError(
+            f"⛔ Hay {len(pares)} pares de solicitudes vigentes con períodos superpuestos:\n"
+            f"{detalle}{resto}\n"
+            "Rechazá o borrá la que corresponda en cada par y volvé a correr migrate."
+        )
+    schema_editor.execute(SQL_EXCLUSION)
+
+
+def borrar_exclusion(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(SQL_EXCLUSION_REVERSA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0010_historialestado'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='solicitud',
+            name='fecha_fin',
+            field=models.DateField(editable=False, null=True),
+        ),
+        migrations.RunPython(calcular_fechas_fin, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='solicitud',
+            name='fecha_fin',
+            field=models.DateField(editable=False),
+        ),
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['agente', 'fecha_inicio', 'fecha_fin'], name='solicitud_periodo_idx'),
+        ),
+        migrations.RunPython(crear_exclusion, borrar_exclusion),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:43
+
+import logging
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import migrations, models
+from django.utils import timezone
+
+logger = logging.getLogger(__name__)
+
+
+def fin_habil(inicio, dias):
+    """Último día de 'dias' hábiles desde 'inicio' (acá todavía no hay feriados cargados)."""
+    fecha, restantes = inicio, max(dias or 1, 1)
+    while True:
+        if fecha.weekday() < 5:
+            restantes -= 1
+            if not restantes:
+                return fecha
+        fecha += timedelta(days=1)
+
+
+def pasar_a_dias_habiles(apps, schema_editor):
+    """
+    0011 calculó fecha_fin en días corridos; con dias_habiles=True por defecto
+    hay que correrla a días hábiles. Si el fin nuevo se cruza con otra licencia
+    vigente del agente, esa queda como estaba (recalcular_calendario la informa).
+    """
+    Solicitud = apps.get_model("core", "Solicitud")
+    por_agente = defaultdict(list)
+    filas = Solicitud._base_manager.filter(tipo__dias_habiles=True).only(
+        "id", "agente_id", "estado", "eliminada_en", "fecha_inicio", "dias", "fecha_fin"
+    )
+    for solicitud in filas.order_by("agente_id", "fecha_inicio", "id").iterator():
+        por_agente[solicitud.agente_id].append(solicitud)
+
+    ahora = timezone.now()
+    cambiadas, conflictos = [], []
+    for solicitudes in por_agente.values():
+        vigentes = [s for s in solicitudes if s.eliminada_en is None and "RECHAZADO" not in s.estado]
+        for solicitud in solicitudes:
+            nueva = fin_habil(solicitud.fecha_inicio, solicitud.dias)
+            if nueva == solicitud.fecha_fin:
+                continue
+            if solicitud in vigentes and any(
+                otra.pk != solicitud.pk and otra.fecha_inicio <= nueva and otra.fecha_fin > solicitud.fecha_fin
+                for otra in vigentes
+            ):
+                conflictos.append(solicitud.pk)
+                continue
+            solicitud.fecha_fin = nueva
+            solicitud.actualizado = ahora  # bulk_update no pasa por auto_now
+            cambiadas.append(solicitud)
+
+    Solicitud._base_manager.bulk_update(cambiadas, ["fecha_fin", "actualizado"], batch_size=1000)
+    if conflictos:
+        logger.warning(
+            "Solicitudes que quedaron con fecha_fin en días corridos por cruzarse con otra: %s",
+            ", ".join(f"#{pk}" for pk in conflictos),
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0011_solicitud_fecha_fin'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CalendarioAnual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.IntegerField(unique=True)),
+                ('mapa', models.CharField(max_length=366)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='Feriado',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField(unique=True)),
+                ('descripcion', models.CharField(help_text='Ej: Día de la Bandera, Asueto', max_length=100)),
+            ],
+            options={
+                'ordering': ['fecha'],
+            },
+        ),
+        migrations.AddField(
+            model_name='tipolicencia',
+            name='dias_habiles',
+            field=models.BooleanField(default=True, help_text='Los días se cuentan hábiles (sin fines de semana ni feriados)'),
+        ),
+        migrations.RunPython(pasar_a_dias_habiles, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:43
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def cierre_inicial(apps, schema_editor):
+    # Todas las áreas existentes son raíces: solo el vínculo consigo mismas
+    Area = apps.get_model("core", "Area")
+    AreaCierre = apps.get_model("core", "AreaCierre")
+    AreaCierre.objects.bulk_create(
+        [AreaCierre(ancestro_id=pk, descendiente_id=pk, profundidad=0) for pk in Area.objects.values_list("pk", flat=True)]
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0012_calendario_laboral'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='area',
+            name='padre',
+            field=models.ForeignKey(blank=True, help_text='Unidad de la que depende (Ej: Alumnado -> Secretaría Académica)', null=True, on_delete=django.db.models.deletion.PROTECT, related_name='subareas', to='core.area'),
+        ),
+        migrations.CreateModel(
+            name='AreaCierre',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('profundidad', models.PositiveIntegerField()),
+                ('ancestro', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cierre_descendientes', to='core.area')),
+                ('descendiente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='cierre_ancestros', to='core.area')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['descendiente', 'profundidad'], name='area_cierre_subida_idx')],
+                'constraints': [models.UniqueConstraint(fields=('ancestro', 'descendiente'), name='area_cierre_unico')],
+            },
+        ),
+        migrations.RunPython(cierre_inicial, migrations.RunPython.noop),
+    ]
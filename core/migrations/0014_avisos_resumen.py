@@ -0,0 +1,35 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:48
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0013_area_jerarquia'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agente',
+            name='avisos_inmediatos',
+            field=models.BooleanField(default=False, help_text='Jefes: recibir un email por cada aviso en lugar de un resumen periódico'),
+        ),
+        migrations.CreateModel(
+            name='AvisoPendiente',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('NUEVA', 'Nueva solicitud'), ('CANCELADA', 'Solicitud cancelada por el agente')], max_length=10)),
+                ('detalle', models.CharField(max_length=255)),
+                ('creado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('enviado_en', models.DateTimeField(blank=True, null=True)),
+                ('destinatario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='avisos_pendientes', to='core.agente')),
+                ('solicitud', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.solicitud')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['enviado_en', 'destinatario'], name='aviso_pendiente_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:51
+
+from django.db import migrations, models
+
+SQL_TRIGRAMAS = """
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+CREATE INDEX agente_busqueda_trgm ON core_agente USING gin (busqueda gin_trgm_ops);
+"""
+
+SQL_TRIGRAMAS_REVERSA = "DROP INDEX IF EXISTS agente_busqueda_trgm;"
+
+
+def completar_busqueda(apps, schema_editor):
+    from core.busqueda import texto_busqueda
+
+    Agente = apps.get_model("core", "Agente")
+    pendientes = []
+    for agente in Agente.objects.only("id", "apellido", "nombre", "legajo").iterator():
+        agente.busqueda = texto_busqueda(agente.apellido, agente.nombre, agente.legajo)
+        pendientes.append(agente)
+    Agente.objects.bulk_update(pendientes, ["busqueda"], batch_size=1000)
+
+
+def crear_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(SQL_TRIGRAMAS)
+
+
+def borrar_indice_trigramas(apps, schema_editor):
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.execute(SQL_TRIGRAMAS_REVERSA)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0014_avisos_resumen'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='agente',
+            name='busqueda',
+            field=models.CharField(db_index=True, default='', editable=False, max_length=220),
+        ),
+        migrations.RunPython(completar_busqueda, migrations.RunPython.noop),
+        migrations.RunPython(crear_indice_trigramas, borrar_indice_trigramas),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:54
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0015_agente_busqueda'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LoteDescuento',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('periodo', models.DateField(help_text='Primer día del mes liquidado', unique=True)),
+                ('generado', models.DateTimeField(default=django.utils.timezone.now)),
+                ('agentes', models.PositiveIntegerField(default=0)),
+                ('dias', models.PositiveIntegerField(default=0)),
+                ('cantidad_solicitudes', models.PositiveIntegerField(default=0)),
+            ],
+            options={
+                'ordering': ['-periodo'],
+            },
+        ),
+        migrations.AddField(
+            model_name='solicitud',
+            name='lote_descuento',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='solicitudes', to='core.lotedescuento'),
+        ),
+    ]
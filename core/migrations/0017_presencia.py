@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-19 18:56
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0016_lote_descuento'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Presencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('agente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='presencias', to='core.agente')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['fecha'], name='presencia_fecha_idx')],
+                'constraints': [models.UniqueConstraint(fields=('agente', 'fecha'), name='presencia_unica')],
+            },
+        ),
+    ]
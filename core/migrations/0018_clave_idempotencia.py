@@ -0,0 +1,26 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:03
+
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0017_presencia'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClaveIdempotencia',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('clave', models.CharField(max_length=100, unique=True)),
+                ('huella', models.CharField(help_text='SHA-256 de método, ruta y cuerpo', max_length=64)),
+                ('estado_http', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('respuesta', models.JSONField(blank=True, null=True)),
+                ('creada', models.DateTimeField(default=django.utils.timezone.now)),
+                ('vence', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:10
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# En PostgreSQL el archivo es una tabla particionada por año de fecha_inicio:
+# core/archivo.py crea la partición de cada año antes de mover sus filas.
+# La PK incluye fecha_inicio porque PostgreSQL lo exige en tablas particionadas
+# (el id sigue siendo único: viene de la secuencia de core_solicitud).
+SQL_ARCHIVO = """
+CREATE TABLE core_solicitudarchivada (
+    id bigint NOT NULL,
+    agente_id bigint NOT NULL
+        REFERENCES core_agente (id) DEFERRABLE INITIALLY DEFERRED,
+    tipo_id bigint NOT NULL
+        REFERENCES core_tipolicencia (id) DEFERRABLE INITIALLY DEFERRED,
+    fecha_solicitud timestamp with time zone NOT NULL,
+    fecha_inicio date NOT NULL,
+    dias integer NOT NULL,
+    fecha_fin date NOT NULL,
+    jefe_seleccionado_id bigint NULL
+        REFERENCES core_agente (id) DEFERRABLE INITIALLY DEFERRED,
+    motivo text NULL,
+    estado varchar(30) NOT NULL,
+    archivo_adjunto varchar(100) NULL,
+    motivo_rechazo text NULL,
+    actualizado timestamp with time zone NOT NULL,
+    eliminada_en timestamp with time zone NULL,
+    reclamada_por_id bigint NULL
+        REFERENCES core_agente (id) DEFERRABLE INITIALLY DEFERRED,
+    reclamada_hasta timestamp with time zone NULL,
+    lote_descuento_id bigint NULL
+        REFERENCES core_lotedescuento (id) DEFERRABLE INITIALLY DEFERRED,
+    PRIMARY KEY (id, fecha_inicio)
+) PARTITION BY RANGE (fecha_inicio);
+CREATE INDEX archivo_agente_idx ON core_solicitudarchivada (agente_id, fecha_inicio);
+CREATE INDEX archivo_fecha_idx ON core_solicitudarchivada (fecha_inicio);
+CREATE INDEX archivo_lote_idx ON core_solicitudarchivada (lote_descuento_id);
+"""
+
+
+def particionar_archivo(apps, schema_editor):
+    # La tabla recién creada está vacía: en PostgreSQL la rehacemos particionada.
+    # delete_model (y no un DROP a mano) descarta también los índices y FKs que
+    # Django deja para el final de la migración.
+    if schema_editor.connection.vendor == "postgresql":
+        schema_editor.delete_model(apps.get_model("core", "SolicitudArchivada"))
+        schema_editor.execute(SQL_ARCHIVO)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0018_clave_idempotencia'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historialestado',
+            name='solicitud',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='historial', to='core.solicitud'),
+        ),
+        migrations.CreateModel(
+            name='SolicitudArchivada',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('fecha_solicitud', models.DateTimeField()),
+                ('fecha_inicio', models.DateField()),
+                ('dias', models.IntegerField()),
+                ('fecha_fin', models.DateField()),
+                ('motivo', models.TextField(blank=True, null=True)),
+                ('estado', models.CharField(choices=[('PENDIENTE_VALIDACION', 'Esperando validación de aviso (Jefe)'), ('AVISO_CONFIRMADO', 'Aviso OK - Pasa a RRHH'), ('AVISO_NEGADO', 'Jefe indica SIN AVISO (A Descuento)'), ('APROBADO', 'Finalizado OK (Listo para inyectar)'), ('RECHAZADO', 'Rechazado por RRHH'), ('IMPACTADO', 'Ya inyectado en el Reloj')], max_length=30)),
+                ('archivo_adjunto', models.FileField(blank=True, null=True, upload_to='certificados/')),
+                ('motivo_rechazo', models.TextField(blank=True, null=True)),
+                ('actualizado', models.DateTimeField()),
+                ('eliminada_en', models.DateTimeField(blank=True, null=True)),
+                ('reclamada_hasta', models.DateTimeField(blank=True, null=True)),
+                ('agente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.agente')),
+                ('jefe_seleccionado', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.agente')),
+                ('lote_descuento', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.PROTECT, related_name='solicitudes_archivadas', to='core.lotedescuento')),
+                ('reclamada_por', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='core.agente')),
+                ('tipo', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='+', to='core.tipolicencia')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['agente', 'fecha_inicio'], name='archivo_agente_idx'), models.Index(fields=['fecha_inicio'], name='archivo_fecha_idx')],
+            },
+        ),
+        migrations.RunPython(particionar_archivo, migrations.RunPython.noop),
+    ]
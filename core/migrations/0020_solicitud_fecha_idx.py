@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:14
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0019_solicitud_archivada'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solicitud',
+            index=models.Index(fields=['fecha_inicio', 'id'], name='solicitud_fecha_idx'),
+        ),
+    ]
@@ -0,0 +1,29 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:22
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0020_solicitud_fecha_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='LegajoAnual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('anio', models.IntegerField()),
+                ('archivo', models.CharField(help_text='Ruta relativa a MEDIA_ROOT', max_length=255)),
+                ('paginas_indice', models.PositiveSmallIntegerField(default=0)),
+                ('entradas', models.JSONField(blank=True, default=list)),
+                ('actualizado', models.DateTimeField(auto_now=True)),
+                ('agente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='legajos_anuales', to='core.agente')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('agente', 'anio'), name='legajo_anual_unico')],
+            },
+        ),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:27
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def contar_pendientes(apps, schema_editor):
+    # Mismo criterio que core.pendientes.reconstruir() (sin las eliminadas)
+    Solicitud = apps.get_model("core", "Solicitud")
+    ContadorPendientes = apps.get_model("core", "ContadorPendientes")
+    activas = Solicitud.objects.filter(eliminada_en__isnull=True)
+
+    por_jefe = (
+        activas.filter(estado="PENDIENTE_VALIDACION", jefe_seleccionado__isnull=False)
+        .order_by()
+        .values_list("jefe_seleccionado_id")
+        .annotate(cantidad=Count("id"))
+    )
+    contadores = [ContadorPendientes(clave=f"jefe:{jefe_id}", cantidad=cantidad) for jefe_id, cantidad in por_jefe]
+    contadores.append(
+        ContadorPendientes(
+            clave="rrhh",
+            cantidad=activas.filter(estado__in=["AVISO_CONFIRMADO", "AVISO_NEGADO"]).count(),
+        )
+    )
+    ContadorPendientes.objects.bulk_create(contadores)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0021_legajo_anual'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ContadorPendientes',
+            fields=[
+                ('clave', models.CharField(max_length=30, primary_key=True, serialize=False)),
+                ('cantidad', models.IntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(contar_pendientes, migrations.RunPython.noop),
+    ]
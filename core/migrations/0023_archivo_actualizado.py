@@ -0,0 +1,17 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:37
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0022_contador_pendientes'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='solicitudarchivada',
+            index=models.Index(fields=['actualizado'], name='archivo_actualizado_idx'),
+        ),
+    ]
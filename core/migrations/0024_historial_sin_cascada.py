@@ -0,0 +1,19 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:38
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0023_archivo_actualizado'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='historialestado',
+            name='solicitud',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.DO_NOTHING, related_name='historial', to='core.solicitud'),
+        ),
+    ]
@@ -0,0 +1,36 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:41
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0024_historial_sin_cascada'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lotedescuento',
+            name='dias_faltas',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='lotedescuento',
+            name='faltas_hasta',
+            field=models.DateField(blank=True, help_text='Último día del reloj revisado; el próximo lote sigue desde acá', null=True),
+        ),
+        migrations.CreateModel(
+            name='FaltaDescontada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('fecha', models.DateField()),
+                ('agente', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='core.agente')),
+                ('lote', models.ForeignKey(on_delete=django.db.models.deletion.PROTECT, related_name='faltas', to='core.lotedescuento')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('agente', 'fecha'), name='falta_descontada_unica')],
+            },
+        ),
+    ]
@@ -0,0 +1,27 @@
+# Generated by Django 6.0.1 on 2026-10-19 19:56
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0025_faltas_descontadas'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='claveidempotencia',
+            name='alcance',
+            field=models.CharField(default='', max_length=150),
+        ),
+        migrations.AlterField(
+            model_name='claveidempotencia',
+            name='clave',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AddConstraint(
+            model_name='claveidempotencia',
+            constraint=models.UniqueConstraint(fields=('alcance', 'clave'), name='clave_idempotencia_unica'),
+        ),
+    ]
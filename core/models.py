@@ -1,5 +1,11 @@
-from django.db import models
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
 from django.contrib.auth.models import User
+from django.utils import timezone
+from datetime import timedelta
+
+
+ERROR_CICLO_AREA = "⛔ Un área no puede depender de sí misma ni de una de sus propias subáreas."
 
 
 # 1. NUEVA TABLA: ÁREAS DE TRABAJO
@@ -7,12 +13,113 @@ class Area(models.Model):
     nombre = models.CharField(
         max_length=100, unique=True, help_text="Ej: Servicios Generales, RRHH, Alumnado"
     )
+    padre = models.ForeignKey(
+        "self",
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="subareas",
+        help_text="Unidad de la que depende (Ej: Alumnado -> Secretaría Académica)",
+    )
 
     def __str__(self):
         return self.nombre
 
+    def clean(self):
+        # El admin (full_clean) muestra el error junto al campo en lugar de un 500
+        if self._crea_ciclo():
+            raise ValidationError({"padre": ERROR_CICLO_AREA})
+
+    def _crea_ciclo(self):
+        """True si el padre elegido es esta misma área o una de sus subáreas."""
+        if self._state.adding or not self.padre_id:
+            return False
+        return AreaCierre.objects.filter(ancestro=self, descendiente_id=self.padre_id).exists()
+
+    def save(self, *args, **kwargs):
+        # Detectamos si cambió el padre para mantener la tabla de cierre
+        padre_anterior = None
+        if self.pk:
+            padre_anterior = (
+                Area.objects.filter(pk=self.pk).values_list("padre_id", flat=True).first()
+            )
+        es_nueva = self._state.adding
+
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if es_nueva:
+                AreaCierre.objects.create(ancestro=self, descendiente=self, profundidad=0)
+                if self.padre_id:
+                    self._colgar_subarbol()
+            elif padre_anterior != self.padre_id:
+                self._colgar_subarbol()
+
+    def _colgar_subarbol(self):
+        """Rehace los vínculos entre este subárbol y sus nuevos ancestros."""
+        subarbol = AreaCierre.objects.filter(ancestro=self)
+        ids_subarbol = list(subarbol.values_list("descendiente_id", flat=True))
+
+        # Red de seguridad para los save() que no pasan por clean() (shell, scripts)
+        if self.padre_id in ids_subarbol:
+            raise ValidationError({"padre": ERROR_CICLO_AREA})
+
+        # 1. Cortamos los vínculos con los ancestros viejos
+        AreaCierre.objects.filter(descendiente_id__in=ids_subarbol).exclude(
+            ancestro_id__in=ids_subarbol
+        ).delete()
+
+        # 2. Cada ancestro del nuevo padre pasa a serlo de todo el subárbol
+        if self.padre_id:
+            ancestros = AreaCierre.objects.filter(descendiente_id=self.padre_id).values_list(
+                "ancestro_id", "profundidad"
+            )
+            nodos = subarbol.values_list("descendiente_id", "profundidad")
+            AreaCierre.objects.bulk_create(
+                [
+                    AreaCierre(
+                        ancestro_id=ancestro,
+                        descendiente_id=nodo,
+                        profundidad=prof_ancestro + prof_nodo + 1,
+                    )
+                    for ancestro, prof_ancestro in ancestros
+                    for nodo, prof_nodo in nodos
+                ]
+            )
+
+
+class AreaCierre(models.Model):
+    """
+    Tabla de cierre (closure table) de la jerarquía de áreas: una fila por cada
+    par ancestro/descendiente, incluida el área consigo misma (profundidad 0).
+    "Todas las áreas por encima de la mía" es un solo JOIN por índice.
+    """
+
+    ancestro = models.ForeignKey(
+        Area, on_delete=models.CASCADE, related_name="cierre_descendientes"
+    )
+    descendiente = models.ForeignKey(
+        Area, on_delete=models.CASCADE, related_name="cierre_ancestros"
+    )
+    profundidad = models.PositiveIntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["ancestro", "descendiente"], name="area_cierre_unico"
+            )
+        ]
+        indexes = [
+            models.Index(fields=["descendiente", "profundidad"], name="area_cierre_subida_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.ancestro} > {self.descendiente} ({self.profundidad})"
+
 
 # 2. TABLA DE AGENTES (EMPLEADOS)
+CATEGORIAS_AUTORIDAD = ["02", "03", "04"]  # Director, Jefe de Depto., Jefe de División
+
+
 class Agente(models.Model):
     # Definición de Jerarquías según tu estructura
     CATEGORIAS = [
@@ -63,14 +170,61 @@ class Agente(models.Model):
     es_rrhh = models.BooleanField(
         default=False, help_text="Marcar si pertenece a Personal (Gestión Global)"
     )
+    avisos_inmediatos = models.BooleanField(
+        default=False,
+        help_text="Jefes: recibir un email por cada aviso en lugar de un resumen periódico",
+    )
+
+    # Texto normalizado para el buscador: "gonzalez maria jose 1234" (sin tildes ni mayúsculas)
+    busqueda = models.CharField(max_length=220, editable=False, db_index=True, default="")
 
     def __str__(self):
         return f"{self.legajo} - {self.apellido}, {self.nombre}"
 
+    def save(self, *args, **kwargs):
+        from .busqueda import texto_busqueda
+
+        self.busqueda = texto_busqueda(self.apellido, self.nombre, self.legajo)
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"apellido", "nombre", "legajo"} & set(update_fields):
+            kwargs["update_fields"] = [*update_fields, "busqueda"]
+
+        super().save(*args, **kwargs)
+
     # Método auxiliar para saber si es Autoridad (Cat 02, 03, 04)
     @property
     def es_autoridad(self):
-        return self.categoria in ["02", "03", "04"]
+        return self.categoria in CATEGORIAS_AUTORIDAD
+
+    def autoridades_disponibles(self):
+        """
+        Posibles Jefes para avisar:
+        - Las autoridades del nivel más cercano (mi área o, si no hay, la de arriba) y
+        - los Directores (Cat 02) de las unidades superiores.
+        Una sola consulta sobre la tabla de cierre de áreas.
+        """
+        if not self.area_id:
+            return []  # Si no tiene área asignada, no tiene jefes
+
+        candidatos = list(
+            Agente.objects.filter(
+                categoria__in=CATEGORIAS_AUTORIDAD,
+                area__cierre_descendientes__descendiente_id=self.area_id,
+            )
+            .exclude(id=self.id)  # Me excluyo a mí mismo (si yo fuera jefe también)
+            .annotate(nivel=models.F("area__cierre_descendientes__profundidad"))
+            .order_by("nivel", "categoria", "apellido")
+        )
+        if not candidatos:
+            return []
+
+        nivel_cercano = candidatos[0].nivel
+        return [
+            jefe
+            for jefe in candidatos
+            if jefe.nivel == nivel_cercano or jefe.categoria == "02"
+        ]
 
 
 # 3. TABLA DE TIPOS DE LICENCIA
@@ -82,12 +236,22 @@ class TipoLicencia(models.Model):
     es_franquicia = models.BooleanField(default=False)
     limite_mensual = models.IntegerField(default=0)
     limite_anual = models.IntegerField(default=0)
+    dias_habiles = models.BooleanField(
+        default=True, help_text="Los días se cuentan hábiles (sin fines de semana ni feriados)"
+    )
 
     def __str__(self):
         return f"{self.codigo} - {self.descripcion}"
 
 
 # 4. TABLA DE SOLICITUDES
+class SolicitudActivaManager(models.Manager):
+    """Oculta las solicitudes borradas (tombstones) del uso normal."""
+
+    def get_queryset(self):
+        return super().get_queryset().filter(eliminada_en__isnull=True)
+
+
 class Solicitud(models.Model):
     ESTADOS = [
         ("PENDIENTE_VALIDACION", "Esperando validación de aviso (Jefe)"),
@@ -105,6 +269,8 @@ class Solicitud(models.Model):
     fecha_solicitud = models.DateTimeField(auto_now_add=True)
     fecha_inicio = models.DateField()
     dias = models.IntegerField(default=1)
+    # Último día cubierto: el período es [fecha_inicio, fecha_fin] (se calcula al guardar)
+    fecha_fin = models.DateField(editable=False)
 
     # El agente selecciona a QUÉ jefe le avisó (Se filtrará por Área)
     jefe_seleccionado = models.ForeignKey(
@@ -122,5 +288,329 @@ class Solicitud(models.Model):
     archivo_adjunto = models.FileField(upload_to="certificados/", blank=True, null=True)
     motivo_rechazo = models.TextField(blank=True, null=True)
 
+    # Sincronización incremental (?since=): cuándo cambió y si fue borrada
+    actualizado = models.DateTimeField(auto_now=True, db_index=True)
+    eliminada_en = models.DateTimeField(
+        null=True, blank=True, editable=False, help_text="Borrado lógico (tombstone)"
+    )
+
+    # Cola de trabajo de RRHH: qué operador la tomó y hasta cuándo
+    reclamada_por = models.ForeignKey(
+        Agente,
+        on_delete=models.SET_NULL,
+        related_name="solicitudes_reclamadas",
+        null=True,
+        blank=True,
+    )
+    reclamada_hasta = models.DateTimeField(null=True, blank=True)
+
+    # Lote de descuentos de haberes en el que ya se informó (ver core/descuentos.py)
+    lote_descuento = models.ForeignKey(
+        "LoteDescuento",
+        on_delete=models.PROTECT,
+        related_name="solicitudes",
+        null=True,
+        blank=True,
+        editable=False,
+    )
+
+    objects = SolicitudActivaManager()
+    todas = models.Manager()  # Incluye las eliminadas
+
+    class Meta:
+        indexes = [
+            # Para encontrar rápido lo libre (o vencido) en la cola de RRHH
+            models.Index(fields=["estado", "reclamada_hasta"], name="solicitud_cola_idx"),
+            # Búsqueda de superposición de períodos por agente (fallback sin PostgreSQL)
+            models.Index(
+                fields=["agente", "fecha_inicio", "fecha_fin"], name="solicitud_periodo_idx"
+            ),
+            # Listados "más nuevas primero" (API y admin) sin ordenar toda la tabla
+            models.Index(fields=["fecha_inicio", "id"], name="solicitud_fecha_idx"),
+        ]
+        # En PostgreSQL además hay una restricción EXCLUDE USING gist que impide
+        # períodos superpuestos (ver migración 0011).
+
     def __str__(self):
         return f"{self.agente} - {self.tipo} ({self.fecha_inicio})"
+
+    @staticmethod
+    def calcular_fecha_fin(fecha_inicio, dias, habiles=False):
+        dias = max(dias or 1, 1)
+        if habiles:
+            from .calendario import sumar_dias_habiles
+
+            return sumar_dias_habiles(fecha_inicio, dias)
+        return fecha_inicio + timedelta(days=dias - 1)
+
+    def fechas_cubiertas(self):
+        """Días que efectivamente cubre la licencia (para PDF, reloj y topes)."""
+        from .calendario import fechas_entre
+
+        return fechas_entre(self.fecha_inicio, self.fecha_fin, self.tipo.dias_habiles)
+
+    def save(self, *args, **kwargs):
+        self.fecha_fin = self.calcular_fecha_fin(
+            self.fecha_inicio, self.dias, self.tipo.dias_habiles
+        )
+
+        update_fields = kwargs.get("update_fields")
+        if update_fields is not None and {"fecha_inicio", "dias", "tipo"} & set(update_fields):
+            kwargs["update_fields"] = [*update_fields, "fecha_fin"]
+
+        super().save(*args, **kwargs)
+
+
+def superposiciones(agente_id, inicio, fin, excluir=None):
+    """Solicitudes vigentes del agente cuyo período se cruza con [inicio, fin]."""
+    queryset = Solicitud.objects.filter(
+        agente_id=agente_id, fecha_inicio__lte=fin, fecha_fin__gte=inicio
+    ).exclude(estado__contains="RECHAZADO")  # Las rechazadas no bloquean
+    if excluir is not None:
+        queryset = queryset.exclude(pk=excluir)
+    return queryset
+
+
+# 5. CALENDARIO LABORAL
+class Feriado(models.Model):
+    fecha = models.DateField(unique=True)
+    descripcion = models.CharField(max_length=100, help_text="Ej: Día de la Bandera, Asueto")
+
+    class Meta:
+        ordering = ["fecha"]
+
+    def __str__(self):
+        return f"{self.fecha} - {self.descripcion}"
+
+
+class CalendarioAnual(models.Model):
+    """
+    Mapa precalculado de un año: un carácter por día ('1' hábil, '0' no hábil).
+    Se regenera al cargar o borrar feriados (ver core.calendario).
+    """
+
+    anio = models.IntegerField(unique=True)
+    mapa = models.CharField(max_length=366)
+
+    def __str__(self):
+        return f"Calendario {self.anio}"
+
+
+# 6. HISTORIAL DE ESTADOS (Solo se agrega, nunca se modifica)
+class HistorialEstado(models.Model):
+    # Sin FK en la base ni cascada: el historial se queda aunque la solicitud pase
+    # al archivo o se borre desde el admin (es un registro de auditoría)
+    solicitud = models.ForeignKey(
+        Solicitud, on_delete=models.DO_NOTHING, related_name="historial", db_constraint=False
+    )
+    estado_anterior = models.CharField(max_length=30, null=True, blank=True)
+    estado_nuevo = models.CharField(max_length=30)
+    fecha = models.DateTimeField(default=timezone.now)
+
+    # Cuánto tiempo estuvo la solicitud en 'estado_anterior' (se calcula al escribir)
+    segundos_en_estado = models.FloatField(null=True, blank=True)
+
+    # Copias para agrupar el reporte de SLA sin JOINs (al momento del cambio)
+    jefe = models.ForeignKey(
+        Agente, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    area = models.ForeignKey(
+        Area, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["estado_anterior", "fecha"], name="historial_sla_idx"),
+            models.Index(fields=["solicitud", "fecha"], name="historial_solicitud_idx"),
+        ]
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            raise ValueError("El historial de estados no se puede modificar.")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise ValueError("El historial de estados no se puede borrar.")
+
+    def __str__(self):
+        return f"{self.solicitud_id}: {self.estado_anterior} -> {self.estado_nuevo} ({self.fecha})"
+
+
+# 7. AVISOS PARA JEFES (Se agrupan en un resumen periódico)
+class AvisoPendiente(models.Model):
+    TIPOS = [
+        ("NUEVA", "Nueva solicitud"),
+        ("CANCELADA", "Solicitud cancelada por el agente"),
+    ]
+
+    destinatario = models.ForeignKey(
+        Agente, on_delete=models.CASCADE, related_name="avisos_pendientes"
+    )
+    solicitud = models.ForeignKey(
+        Solicitud, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    tipo = models.CharField(max_length=10, choices=TIPOS)
+    detalle = models.CharField(max_length=255)
+    creado = models.DateTimeField(default=timezone.now)
+    enviado_en = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            # El envío de resúmenes solo recorre lo no enviado
+            models.Index(fields=["enviado_en", "destinatario"], name="aviso_pendiente_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.destinatario} - {self.tipo} ({self.creado})"
+
+
+# 8. LOTES DE DESCUENTO (Lo que se informa a Liquidación de Haberes cada mes)
+class LoteDescuento(models.Model):
+    periodo = models.DateField(unique=True, help_text="Primer día del mes liquidado")
+    generado = models.DateTimeField(default=timezone.now)
+    agentes = models.PositiveIntegerField(default=0)
+    dias = models.PositiveIntegerField(default=0)
+    cantidad_solicitudes = models.PositiveIntegerField(default=0)
+    # Faltas del reloj (días hábiles sin marcar ni justificar, ver FaltaDescontada)
+    dias_faltas = models.PositiveIntegerField(default=0)
+    faltas_hasta = models.DateField(
+        null=True, blank=True, help_text="Último día del reloj revisado; el próximo lote sigue desde acá"
+    )
+
+    class Meta:
+        ordering = ["-periodo"]
+
+    def __str__(self):
+        return (
+            f"Descuentos {self.periodo:%m/%Y} ({self.agentes} agentes, {self.dias} días, "
+            f"{self.dias_faltas} faltas)"
+        )
+
+
+class FaltaDescontada(models.Model):
+    """Un día sin marcar ni justificar que ya se informó en un lote (nunca dos veces)."""
+
+    lote = models.ForeignKey(LoteDescuento, on_delete=models.PROTECT, related_name="faltas")
+    agente = models.ForeignKey(Agente, on_delete=models.CASCADE, related_name="+")
+    fecha = models.DateField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["agente", "fecha"], name="falta_descontada_unica"),
+        ]
+
+    def __str__(self):
+        return f"{self.agente_id} - {self.fecha}"
+
+
+# 9. PRESENCIAS (Días en que el agente marcó en el reloj, ver core/reloj.py)
+class Presencia(models.Model):
+    agente = models.ForeignKey(Agente, on_delete=models.CASCADE, related_name="presencias")
+    fecha = models.DateField()
+
+    class Meta:
+        constraints = [
+            # Volver a importar el mismo archivo no duplica días
+            models.UniqueConstraint(fields=["agente", "fecha"], name="presencia_unica"),
+        ]
+        indexes = [models.Index(fields=["fecha"], name="presencia_fecha_idx")]
+
+    def __str__(self):
+        return f"{self.agente_id} - {self.fecha}"
+
+
+# 10. CLAVES DE IDEMPOTENCIA (Reintentos del frontend con el header Idempotency-Key)
+class ClaveIdempotencia(models.Model):
+    # Quién la mandó y a qué ruta: la misma clave de dos agentes no se cruza
+    alcance = models.CharField(max_length=150, default="")
+    clave = models.CharField(max_length=100)
+    huella = models.CharField(max_length=64, help_text="SHA-256 de método, ruta y cuerpo")
+    estado_http = models.PositiveSmallIntegerField(null=True, blank=True)  # None = en proceso
+    respuesta = models.JSONField(null=True, blank=True)
+    creada = models.DateTimeField(default=timezone.now)
+    vence = models.DateTimeField(db_index=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["alcance", "clave"], name="clave_idempotencia_unica"),
+        ]
+
+    def __str__(self):
+        return f"{self.clave} ({self.estado_http or 'en proceso'})"
+
+
+# 11. ARCHIVO DE SOLICITUDES CERRADAS (Años anteriores, ver core/archivo.py)
+class SolicitudArchivada(models.Model):
+    """
+    Mismas columnas que Solicitud (y el mismo id) para las IMPACTADO/RECHAZADO de
+    años ya cerrados. En PostgreSQL la tabla está particionada por año de
+    fecha_inicio. Es de solo lectura: la API la consulta junto con Solicitud.
+    """
+
+    id = models.BigIntegerField(primary_key=True)
+    agente = models.ForeignKey(Agente, on_delete=models.CASCADE, related_name="+")
+    tipo = models.ForeignKey(TipoLicencia, on_delete=models.PROTECT, related_name="+")
+    fecha_solicitud = models.DateTimeField()
+    fecha_inicio = models.DateField()
+    dias = models.IntegerField()
+    fecha_fin = models.DateField()
+    jefe_seleccionado = models.ForeignKey(
+        Agente, on_delete=models.PROTECT, null=True, blank=True, related_name="+"
+    )
+    motivo = models.TextField(blank=True, null=True)
+    estado = models.CharField(max_length=30, choices=Solicitud.ESTADOS)
+    archivo_adjunto = models.FileField(upload_to="certificados/", blank=True, null=True)
+    motivo_rechazo = models.TextField(blank=True, null=True)
+    actualizado = models.DateTimeField()
+    eliminada_en = models.DateTimeField(null=True, blank=True)
+    reclamada_por = models.ForeignKey(
+        Agente, on_delete=models.SET_NULL, null=True, blank=True, related_name="+"
+    )
+    reclamada_hasta = models.DateTimeField(null=True, blank=True)
+    lote_descuento = models.ForeignKey(
+        LoteDescuento,
+        on_delete=models.PROTECT,
+        null=True,
+        blank=True,
+        related_name="solicitudes_archivadas",
+    )
+
+    class Meta:
+        indexes = [
+            models.Index(fields=["agente", "fecha_inicio"], name="archivo_agente_idx"),
+            models.Index(fields=["fecha_inicio"], name="archivo_fecha_idx"),
+            models.Index(fields=["actualizado"], name="archivo_actualizado_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.agente} - {self.tipo} ({self.fecha_inicio}) [archivada]"
+
+
+# 12. LEGAJO ANUAL EN PDF (Un archivo por agente y año, ver core/legajo.py)
+class LegajoAnual(models.Model):
+    agente = models.ForeignKey(Agente, on_delete=models.CASCADE, related_name="legajos_anuales")
+    anio = models.IntegerField()
+    archivo = models.CharField(max_length=255, help_text="Ruta relativa a MEDIA_ROOT")
+    paginas_indice = models.PositiveSmallIntegerField(default=0)
+    # Una entrada por solicitud en el orden de las páginas:
+    # {"solicitud", "pagina" (sin contar el índice), "paginas", "tipo", "desde", "hasta", "dias"}
+    entradas = models.JSONField(default=list, blank=True)
+    actualizado = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["agente", "anio"], name="legajo_anual_unico"),
+        ]
+
+    def __str__(self):
+        return f"{self.agente} - {self.anio} ({len(self.entradas)} solicitudes)"
+
+
+# 13. CONTADORES DE PENDIENTES (Badges de las bandejas, ver core/pendientes.py)
+class ContadorPendientes(models.Model):
+    # "jefe:<id>" o "rrhh": los mismos nombres que los canales de core/eventos.py
+    clave = models.CharField(max_length=30, primary_key=True)
+    cantidad = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.clave}: {self.cantidad}"
@@ -0,0 +1,110 @@
+"""
+Contadores materializados de lo que espera en cada bandeja.
+
+Una fila por jefe ("jefe:<id>": sus PENDIENTE_VALIDACION) y una para la cola de
+RRHH ("rrhh": AVISO_CONFIRMADO y AVISO_NEGADO). "¿Tengo algo pendiente?" es una
+lectura por clave primaria, sin contar ni traer la bandeja.
+
+- Se mueven en la misma transacción que el cambio (alta, transición, borrado,
+  cambio de jefe): nunca cuentan algo que no se confirmó.
+- manage.py recalcular_pendientes los vuelve a armar desde Solicitud (por
+  ejemplo, si se borraron agentes o se tocó la base a mano).
+"""
+
+from collections import Counter
+
+from django.db import connection, transaction
+from django.db.models import Count, F
+
+from .cola_rrhh import ESTADOS_EN_COLA
+from .eventos import CANAL_RRHH, canal_jefe
+from .models import ContadorPendientes, Solicitud
+
+ESTADO_JEFE = "PENDIENTE_VALIDACION"
+
+
+def claves(estado, jefe_id):
+    """Contadores en los que cuenta una solicitud con ese estado y ese jefe."""
+    resultado = []
+    if estado == ESTADO_JEFE and jefe_id:
+        resultado.append(canal_jefe(jefe_id))
+    if estado in ESTADOS_EN_COLA:
+        resultado.append(CANAL_RRHH)
+    return resultado
+
+
+def mover(antes, despues, cantidad=1):
+    """
+    Ajusta los contadores cuando 'cantidad' solicitudes pasan de 'antes' a 'despues',
+    cada uno (estado, jefe_id) o None (alta / borrado). Llamar dentro de la
+    transacción del cambio.
+    """
+    deltas = Counter()
+    for clave in claves(*antes) if antes else ():
+        deltas[clave] -= cantidad
+    for clave in claves(*despues) if despues else ():
+        deltas[clave] += cantidad
+
+    # Siempre en el mismo orden: dos transacciones no se bloquean cruzadas
+    for clave in sorted(deltas):
+        if not deltas[clave]:
+            continue
+        sumar = {"cantidad": F("cantidad") + deltas[clave]}
+        if not ContadorPendientes.objects.filter(pk=clave).update(**sumar):
+            ContadorPendientes.objects.get_or_create(pk=clave)
+            ContadorPendientes.objects.filter(pk=clave).update(**sumar)
+
+
+def quitar(solicitudes):
+    """Descuenta un queryset de solicitudes que se va a borrar de verdad (no tombstone)."""
+    grupos = (
+        solicitudes.filter(eliminada_en__isnull=True)
+        .order_by()
+        .values_list("estado", "jefe_seleccionado_id")
+        .annotate(cantidad=Count("id"))
+    )
+    for estado, jefe_id, cantidad in grupos:
+        mover((estado, jefe_id), None, cantidad)
+
+
+def consultar(*pedidas):
+    """{clave: cantidad} en una sola lectura por clave primaria (0 si no hay fila)."""
+    encontradas = dict(
+        ContadorPendientes.objects.filter(pk__in=pedidas).values_list("clave", "cantidad")
+    )
+    return {clave: encontradas.get(clave, 0) for clave in pedidas}
+
+
+def reconstruir():
+    """
+    Vuelve a contar todo desde Solicitud. Devuelve {clave: (antes, ahora)} con
+    los contadores que estaban desfasados.
+    """
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            # Los cambios que lleguen mientras tanto esperan y suman sobre lo nuevo
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    f"LOCK TABLE {ContadorPendientes._meta.db_table} IN EXCLUSIVE MODE"
+                )
+
+        por_jefe = (
+            Solicitud.objects.filter(estado=ESTADO_JEFE, jefe_seleccionado__isnull=False)
+            .order_by()
+            .values_list("jefe_seleccionado_id")
+            .annotate(cantidad=Count("id"))
+        )
+        ahora = {canal_jefe(jefe_id): cantidad for jefe_id, cantidad in por_jefe}
+        ahora[CANAL_RRHH] = Solicitud.objects.filter(estado__in=ESTADOS_EN_COLA).count()
+
+        antes = dict(ContadorPendientes.objects.values_list("clave", "cantidad"))
+        ContadorPendientes.objects.all().delete()
+        ContadorPendientes.objects.bulk_create(
+            ContadorPendientes(clave=clave, cantidad=cantidad) for clave, cantidad in ahora.items()
+        )
+
+    return {
+        clave: (antes.get(clave, 0), ahora.get(clave, 0))
+        for clave in antes.keys() | ahora.keys()
+        if antes.get(clave, 0) != ahora.get(clave, 0)
+    }
@@ -0,0 +1,92 @@
+"""
+Logs estructurados (JSON) que no frenan los requests.
+
+- ColaHandler: el request solo deja el registro en una cola en memoria; un hilo
+  aparte lo formatea como JSON y lo escribe. Si stdout está lento o lleno, el
+  que espera es ese hilo, no el usuario.
+- FiltroRequestId + RequestIdMiddleware: cada línea lleva el id del request
+  (X-Request-ID) para seguir un pedido entre logs.
+- El nivel se filtra en el logger (settings.LOGGING): un logger.debug apagado
+  no llega ni a la cola.
+"""
+
+import contextvars
+import json
+import logging
+import queue
+import sys
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+request_id_actual = contextvars.ContextVar("request_id", default=None)
+
+# Atributos propios de LogRecord: todo lo demás vino en extra={...}
+_ATRIBUTOS_BASE = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {
+    "message",
+    "asctime",
+    "request_id",
+}
+
+
+class FiltroRequestId(logging.Filter):
+    def filter(self, record):
+        # Corre en el hilo del request, donde la variable de contexto tiene valor
+        record.request_id = request_id_actual.get()
+        return True
+
+
+class FormatoJSON(logging.Formatter):
+    """Una línea JSON por registro: fecha, nivel, logger, mensaje, request_id y los extra."""
+
+    def format(self, record):
+        datos = {
+            "fecha": datetime.fromtimestamp(record.created, timezone.utc).isoformat(
+                timespec="milliseconds"
+            ),
+            "nivel": record.levelname,
+            "logger": record.name,
+            "mensaje": record.getMessage(),
+        }
+        if getattr(record, "request_id", None):
+            datos["request_id"] = record.request_id
+        for clave, valor in vars(record).items():
+            if clave not in _ATRIBUTOS_BASE:
+                datos[clave] = valor
+        if record.exc_text:
+            datos["excepcion"] = record.exc_text
+        return json.dumps(datos, ensure_ascii=False, default=str)
+
+
+class ColaHandler(QueueHandler):
+    """
+    QueueHandler con su propio hilo escritor. Uso en settings.LOGGING:
+        "()": "core.registro.ColaHandler", "stream": "ext://sys.stdout"
+    """
+
+    def __init__(self, stream=None):
+        super().__init__(queue.SimpleQueue())
+        self.destino = logging.StreamHandler(stream or sys.stderr)
+        self.escritor = QueueListener(self.queue, self.destino, respect_handler_level=False)
+        self.escritor.start()
+
+    def close(self):
+        # logging.shutdown() lo llama al salir: esperamos a que se escriba lo pendiente
+        if self.escritor is not None:
+            self.escritor.stop()
+            self.escritor = None
+        super().close()
+
+    def setFormatter(self, fmt):
+        # El formato (JSON) lo aplica el hilo escritor, no el request
+        self.destino.setFormatter(fmt)
+
+    def prepare(self, record):
+        # Lo mínimo en el hilo del request: resolver el mensaje y la excepción
+        # (después pueden cambiar o dejar de existir) y soltar referencias.
+        record = logging.makeLogRecord(vars(record))
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
@@ -0,0 +1,220 @@
+"""
+Marcaciones del reloj y ausencias sin justificar.
+
+1. importar_marcaciones: lee el archivo exportado por el reloj línea por línea
+   ("id_reloj<sep>AAAA-MM-DD hh:mm:ss<sep>..." con tab, ';', ',' o espacios) y
+   guarda un día de Presencia por agente y fecha. El archivo nunca se carga
+   entero: en memoria solo quedan los pares agente/día.
+2. ausencias_sin_justificar: arma con NumPy la matriz agente x día
+       esperado (hábil) AND NOT presente AND NOT cubierto por una solicitud
+   y la resume por área.
+"""
+
+from datetime import date, datetime
+from itertools import chain
+
+import numpy as np
+from django.db import connection, transaction
+
+from .calendario import fechas_entre
+from .models import Agente, Presencia, Solicitud, SolicitudArchivada
+
+# Solicitudes que justifican la ausencia
+ESTADOS_JUSTIFICAN = ("APROBADO", "IMPACTADO")
+
+FILAS_POR_INSERT = 500  # 1000 parámetros por sentencia (dentro del límite de SQLite)
+
+
+# ---------------------------------------------------------
+# IMPORTACIÓN
+# ---------------------------------------------------------
+def importar_marcaciones(lineas):
+    """
+    'lineas' es cualquier iterable de texto (ej: un archivo abierto).
+    Devuelve un resumen: líneas leídas, días de presencia, ids desconocidos, etc.
+    """
+    agente_de = dict(
+        Agente.objects.filter(id_sistema_reloj__isnull=False).values_list("id_sistema_reloj", "id")
+    )
+
+    resumen = {"lineas": 0, "ignoradas": 0, "desconocidos": set(), "dias_presencia": 0}
+    dias = set()  # (agente_id, "AAAA-MM-DD"): el reloj marca varias veces por día
+    fechas = {}  # Texto del archivo -> fecha ISO (hay pocas fechas distintas)
+    separador = False  # Se detecta con la primera línea con datos
+    anterior = None
+
+    for linea in lineas:
+        resumen["lineas"] += 1
+        if separador is False:
+            if not linea.strip():
+                continue
+            separador = _detectar_separador(linea)
+
+        partes = linea.split(separador, 2)
+        if len(partes) < 2:
+            resumen["ignoradas"] += 1
+            continue
+        clave = (partes[0], partes[1][:11])
+        if clave == anterior:
+            continue  # Otra marcación del mismo agente el mismo día (lo más común)
+        anterior = clave
+
+        id_texto = partes[0].strip()
+        if not id_texto.isdigit():
+            resumen["ignoradas"] += 1  # Encabezados
+            continue
+        agente_id = agente_de.get(int(id_texto))
+        if agente_id is None:
+            resumen["desconocidos"].add(int(id_texto))
+            continue
+
+        texto_fecha = partes[1].strip()[:10]
+        fecha = fechas.get(texto_fecha)
+        if fecha is None:
+            fecha = fechas[texto_fecha] = _fecha_iso(texto_fecha)
+        if not fecha:
+            resumen["ignoradas"] += 1
+            continue
+        dias.add((agente_id, fecha))
+
+    _guardar_presencias(dias)
+
+    resumen["dias_presencia"] = len(dias)
+    resumen["desconocidos"] = sorted(resumen["desconocidos"])
+    validas = [f for f in fechas.values() if f]
+    if dias and validas:
+        resumen["desde"] = date.fromisoformat(min(validas))
+        resumen["hasta"] = date.fromisoformat(max(validas))
+    return resumen
+
+
+def _detectar_separador(linea):
+    for separador in ("\t", ";", ","):
+        if separador in linea:
+            return separador
+    return None  # Espacios
+
+
+def _fecha_iso(texto):
+    for formato in ("%Y-%m-%d", "%d/%m/%Y"):
+        try:
+            return datetime.strptime(texto, formato).date().isoformat()
+        except ValueError:
+            continue
+    return ""
+
+
+def _guardar_presencias(dias):
+    # INSERT de varias filas por sentencia, sin pasar por instancias del ORM.
+    # ON CONFLICT DO NOTHING (PostgreSQL y SQLite): reimportar no duplica.
+    tabla = connection.ops.quote_name(Presencia._meta.db_table)
+    pendientes = sorted(dias)  # En el orden del índice único: inserta mucho más rápido
+    with transaction.atomic(), connection.cursor() as cursor:
+        for inicio in range(0, len(pendientes), FILAS_POR_INSERT):
+            tanda = pendientes[inicio : inicio + FILAS_POR_INSERT]
+            valores = ", ".join(["(%s, %s)"] * len(tanda))
+            cursor.execute(
+                f"INSERT INTO {tabla} (agente_id, fecha) VALUES {valores} ON CONFLICT DO NOTHING",
+                [dato for par in tanda for dato in par],
+            )
+
+
+# ---------------------------------------------------------
+# CONCILIACIÓN
+# ---------------------------------------------------------
+def ausencias_sin_justificar(desde, hasta, area_id=None):
+    """
+    Días hábiles entre desde y hasta (sin pasar del último día importado) en que
+    un agente con reloj no marcó y no tenía una solicitud aprobada. Por área.
+    """
+    ultimo_importado = Presencia.objects.order_by("-fecha").values_list("fecha", flat=True).first()
+    if ultimo_importado is None:
+        return []
+    hasta = min(hasta, ultimo_importado)
+    if hasta < desde:
+        return []
+
+    agentes = Agente.objects.filter(id_sistema_reloj__isnull=False)
+    if area_id:
+        agentes = agentes.filter(area_id=area_id)
+    datos = list(agentes.order_by("area__nombre", "apellido").values_list(
+        "id", "legajo", "apellido", "nombre", "area_id", "area__nombre"
+    ))
+    if not datos:
+        return []
+
+    fila_de = {fila[0]: i for i, fila in enumerate(datos)}
+    base = desde.toordinal()
+    dias = hasta.toordinal() - base + 1
+
+    # Días esperados: vector de hábiles (mismo para todos)
+    esperado = np.zeros(dias, dtype=bool)
+    esperado[[f.toordinal() - base for f in fechas_entre(desde, hasta, habiles=True)]] = True
+
+    presente = _matriz_presencia(fila_de, desde, hasta, base, (len(datos), dias))
+    cubierto = _matriz_cubierta(fila_de, desde, hasta, base, (len(datos), dias))
+
+    faltas = esperado & ~presente & ~cubierto  # Matriz agente x día
+    return _por_area(datos, faltas, base)
+
+
+def _matriz_presencia(fila_de, desde, hasta, base, forma):
+    presente = np.zeros(forma, dtype=bool)
+    pares = Presencia.objects.filter(
+        agente_id__in=fila_de, fecha__range=(desde, hasta)
+    ).values_list("agente_id", "fecha")
+    filas, columnas = [], []
+    for agente_id, fecha in pares.iterator(chunk_size=10000):
+        filas.append(fila_de[agente_id])
+        columnas.append(fecha.toordinal() - base)
+    presente[filas, columnas] = True
+    return presente
+
+
+def _matriz_cubierta(fila_de, desde, hasta, base, forma):
+    # Cada solicitud cubre un rango de días: marcamos +1 al inicio y -1 al día
+    # siguiente del fin, y la suma acumulada por fila da los días cubiertos.
+    # Los años cerrados están en el archivo (core/archivo.py): leemos las dos tablas
+    rangos = [
+        modelo.objects.filter(
+            agente_id__in=fila_de,
+            estado__in=ESTADOS_JUSTIFICAN,
+            fecha_inicio__lte=hasta,
+            fecha_fin__gte=desde,
+        )
+        .values_list("agente_id", "fecha_inicio", "fecha_fin")
+        .iterator(chunk_size=10000)
+        for modelo in (Solicitud, SolicitudArchivada)
+    ]
+
+    filas, inicios, fines = [], [], []
+    for agente_id, inicio, fin in chain(*rangos):
+        filas.append(fila_de[agente_id])
+        inicios.append(max(inicio.toordinal() - base, 0))
+        fines.append(min(fin.toordinal() - base, forma[1] - 1) + 1)
+
+    marcas = np.zeros((forma[0], forma[1] + 1), dtype=np.int32)
+    np.add.at(marcas, (filas, inicios), 1)
+    np.add.at(marcas, (filas, fines), -1)
+    return np.cumsum(marcas, axis=1)[:, :-1] > 0
+
+
+def _por_area(datos, faltas, base):
+    por_agente = faltas.sum(axis=1)
+    areas = {}
+    for i in np.flatnonzero(por_agente):
+        _, legajo, apellido, nombre, area_id, area_nombre = datos[i]
+        area = areas.setdefault(
+            area_id, {"area": area_id, "nombre": area_nombre, "dias": 0, "agentes": []}
+        )
+        area["dias"] += int(por_agente[i])
+        area["agentes"].append(
+            {
+                "legajo": legajo,
+                "apellido": apellido,
+                "nombre": nombre,
+                "dias": int(por_agente[i]),
+                "fechas": [date.fromordinal(base + int(d)) for d in np.flatnonzero(faltas[i])],
+            }
+        )
+    return sorted(areas.values(), key=lambda a: -a["dias"])
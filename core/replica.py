@@ -0,0 +1,112 @@
+"""
+Lecturas pesadas en la réplica de PostgreSQL, sin perder "leer lo que escribí".
+
+- ReplicaRouter: toda escritura va a "default". Las lecturas van a "replica"
+  solo si la vista lo pidió (LecturaEnReplicaMixin) y hay réplica configurada.
+- Después de una escritura, la respuesta lleva X-Primaria-Hasta (y una cookie
+  con el mismo valor). Mientras el cliente la reenvíe y no haya vencido, sus
+  lecturas siguen en la primaria: la réplica puede estar unos segundos atrasada
+  y el agente no vería la solicitud que acaba de cargar.
+- Los eventos SSE (core/eventos.py) llevan la misma marca en "primaria_hasta":
+  la recarga que dispara un evento la reenvía y lee de la primaria, que ya
+  tiene el cambio anunciado.
+- Fuera de un request (comandos, shell) todo se lee de la primaria.
+"""
+
+import time
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.permissions import SAFE_METHODS
+
+ALIAS_REPLICA = "replica"
+HEADER_PRIMARIA = "X-Primaria-Hasta"
+COOKIE_PRIMARIA = "primaria_hasta"
+
+_en_replica = ContextVar("en_replica", default=False)
+
+
+def hay_replica():
+    return getattr(settings, "REPLICA_LECTURAS", True) and ALIAS_REPLICA in settings.DATABASES
+
+
+def alias_lectura():
+    """Base de la que lee el request en curso."""
+    return ALIAS_REPLICA if _en_replica.get() else DEFAULT_DB_ALIAS
+
+
+def leer_de_primaria():
+    # Lo llama el middleware al empezar cada request: un hilo de WSGI reutiliza
+    # el contexto del request anterior.
+    _en_replica.set(False)
+
+
+def leer_de_replica():
+    _en_replica.set(hay_replica())
+
+
+# ---------------------------------------------------------
+# "LEER LO QUE ESCRIBÍ" (marca que viaja con el cliente)
+# ---------------------------------------------------------
+def marca_vigente(request):
+    """True si el cliente escribió hace poco y tiene que seguir en la primaria."""
+    valor = request.headers.get(HEADER_PRIMARIA) or request.COOKIES.get(COOKIE_PRIMARIA)
+    try:
+        hasta = float(valor)
+    except (TypeError, ValueError):
+        return False
+    ahora = time.time()
+    # Una marca más lejana que la ventana no la emitimos nosotros: se ignora
+    return ahora < hasta <= ahora + settings.REPLICA_PEGADO_SEGUNDOS
+
+
+def nueva_marca():
+    return int(time.time()) + settings.REPLICA_PEGADO_SEGUNDOS
+
+
+def marcar_escritura(response):
+    hasta = nueva_marca()
+    response[HEADER_PRIMARIA] = str(hasta)
+    response.set_cookie(
+        COOKIE_PRIMARIA, str(hasta), max_age=settings.REPLICA_PEGADO_SEGUNDOS, samesite="Lax"
+    )
+
+
+# ---------------------------------------------------------
+# ROUTER Y MIXIN PARA LOS VIEWSETS
+# ---------------------------------------------------------
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        # Los objetos relacionados se leen de la misma base que su "dueño"
+        instancia = hints.get("instance")
+        if instancia is not None and instancia._state.db:
+            return instancia._state.db
+        return alias_lectura()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True  # La réplica es una copia de la primaria: mismos datos
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
+
+
+class LecturaEnReplicaMixin:
+    """Las acciones listadas en acciones_en_replica leen de la réplica (solo GET/HEAD)."""
+
+    acciones_en_replica = ()
+
+    def lectura_en_replica(self, request):
+        return (
+            self.action in self.acciones_en_replica
+            and request.method in SAFE_METHODS
+            and not getattr(request, "primaria_pegada", False)
+        )
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if self.lectura_en_replica(request):
+            leer_de_replica()
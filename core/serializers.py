@@ -1,6 +1,69 @@
 from rest_framework import serializers
-from .models import Agente, TipoLicencia, Solicitud
+from .models import Agente, HistorialEstado, TipoLicencia, Solicitud, superposiciones
+from .archivo import anio_archivado
+from .pendientes import mover
 from django.core.signing import TimestampSigner, BadSignature, SignatureExpired
+from django.core.exceptions import FieldDoesNotExist
+from django.core.files.storage import default_storage
+from django.db import models
+from django.utils import timezone
+from collections import Counter
+from datetime import date, timedelta
+
+
+# Topes del Art. 85 (cantidad de solicitudes no rechazadas)
+TOPE_ART85_MENSUAL = 2
+TOPE_ART85_ANUAL = 6
+MAXIMO_FECHAS_LOTE = 31
+
+
+# ---------------------------------------------------------
+# CAMPOS A PEDIDO (?fields= / ?omit=)
+# ---------------------------------------------------------
+def campos_pedidos(request):
+    """
+    Lee de la URL qué columnas quiere la pantalla.
+    ?fields=id,estado,fecha_inicio -> Solo esas
+    ?omit=motivo,archivo_adjunto   -> Todas menos esas
+    """
+    if request is None:
+        return None, set()
+
+    fields = request.query_params.get("fields")
+    omit = request.query_params.get("omit")
+
+    incluir = {c.strip() for c in fields.split(",") if c.strip()} if fields else None
+    omitir = {c.strip() for c in omit.split(",") if c.strip()} if omit else set()
+    return incluir, omitir
+
+
+def filtrar_nombres(nombres, incluir, omitir):
+    # El "id" viaja siempre: el frontend lo necesita para ubicar cada fila
+    return [
+        n
+        for n in nombres
+        if n == "id" or ((incluir is None or n in incluir) and n not in omitir)
+    ]
+
+
+class CamposDinamicosMixin:
+    """Recorta los campos del serializer según ?fields= / ?omit= (solo en lecturas)."""
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        request = self.context.get("request")
+        if request is None or request.method != "GET":
+            return
+
+        incluir, omitir = campos_pedidos(request)
+        if incluir is None and not omitir:
+            return
+
+        permitidos = set(filtrar_nombres(self.fields.keys(), incluir, omitir))
+        for nombre in list(self.fields.keys()):
+            if nombre not in permitidos:
+                self.fields.pop(nombre)
 
 
 # 1. Serializer pequeñito para mostrar datos básicos de jefes en el dropdown
@@ -11,7 +74,7 @@ class AgenteSimpleSerializer(serializers.ModelSerializer):
 
 
 # 2. El serializer principal de Agentes
-class AgenteSerializer(serializers.ModelSerializer):
+class AgenteSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     # CAMBIO CRÍTICO: Ya no leemos una lista fija, la calculamos al vuelo
     supervisores_detalle = serializers.SerializerMethodField()
 
@@ -36,17 +99,10 @@ class AgenteSerializer(serializers.ModelSerializer):
     def get_supervisores_detalle(self, obj):
         """
         Retorna la lista de posibles Jefes para este agente.
-        Regla: Misma Área + Categoría (02, 03 o 04).
+        Regla: Autoridades (02, 03 o 04) del nivel más cercano hacia arriba
+        en el árbol de áreas, más los Directores de las unidades superiores.
         """
-        if not obj.area:
-            return []  # Si no tiene área asignada, no tiene jefes
-
-        # Buscamos agentes de la MISMA ÁREA que sean AUTORIDADES
-        jefes = Agente.objects.filter(
-            area=obj.area, categoria__in=["02", "03", "04"]
-        ).exclude(id=obj.id)  # Me excluyo a mí mismo (si yo fuera jefe también)
-
-        return AgenteSimpleSerializer(jefes, many=True).data
+        return AgenteSimpleSerializer(obj.autoridades_disponibles(), many=True).data
 
 
 class TipoLicenciaSerializer(serializers.ModelSerializer):
@@ -55,7 +111,7 @@ class TipoLicenciaSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
-class SolicitudSerializer(serializers.ModelSerializer):
+class SolicitudSerializer(CamposDinamicosMixin, serializers.ModelSerializer):
     nombre_agente = serializers.CharField(source="agente.nombre", read_only=True)
     apellido_agente = serializers.CharField(source="agente.apellido", read_only=True)
     tipo_descripcion = serializers.CharField(source="tipo.descripcion", read_only=True)
@@ -64,6 +120,16 @@ class SolicitudSerializer(serializers.ModelSerializer):
     class Meta:
         model = Solicitud
         fields = "__all__"
+        # La cola de RRHH se maneja solo con /reclamar/ y /liberar/
+        read_only_fields = ["reclamada_por", "reclamada_hasta"]
+
+    def update(self, instance, validated_data):
+        # Guardamos solo las columnas que vinieron: una edición del agente
+        # no puede pisar un cambio de estado que otro hizo en paralelo.
+        for campo, valor in validated_data.items():
+            setattr(instance, campo, valor)
+        instance.save(update_fields=[*validated_data.keys(), "actualizado"])
+        return instance
 
     def validate(self, data):
         # 1. RECUPERACIÓN DE DATOS (Strategy: Incoming Data > Existing Data)
@@ -105,15 +171,23 @@ class SolicitudSerializer(serializers.ModelSerializer):
                 and data["fecha_inicio"] != self.instance.fecha_inicio
             )
             cambia_tipo = "tipo" in data and data["tipo"] != self.instance.tipo
+            cambian_dias = "dias" in data and data["dias"] != self.instance.dias
 
-            # Si NO cambia ni fecha ni tipo, asumimos que es solo un cambio de estado/motivo
+            # Si NO cambia ni fecha, ni tipo, ni días, asumimos que es solo un cambio de estado/motivo
             # y retornamos data directamente.
-            if not cambia_fecha and not cambia_tipo:
+            if not cambia_fecha and not cambia_tipo and not cambian_dias:
                 return data
         # ------------------------------------------------------------------
 
         # PASO 3: VALIDACIÓN DE REGLAS DE NEGOCIO
 
+        # --- REGLA 0: Los años archivados están cerrados (topes y superposiciones
+        # ya no se controlan contra la tabla principal, ver core/archivo.py) ---
+        if anio_archivado(fecha_obj.year):
+            raise serializers.ValidationError(
+                {"fecha_inicio": f"⛔ El año {fecha_obj.year} ya está cerrado y archivado. Comuníquese con RRHH."}
+            )
+
         # --- REGLA 1: ART 85 (Topes Mensuales y Anuales) ---
         # Aseguramos obtener el código string correctamente
         try:
@@ -134,7 +208,7 @@ class SolicitudSerializer(serializers.ModelSerializer):
             if self.instance:
                 query_mensual = query_mensual.exclude(pk=self.instance.pk)
 
-            if query_mensual.count() >= 2:
+            if query_mensual.count() >= TOPE_ART85_MENSUAL:
                 raise serializers.ValidationError(
                     {
                         "non_field_errors": [
@@ -153,7 +227,7 @@ class SolicitudSerializer(serializers.ModelSerializer):
             if self.instance:
                 query_anual = query_anual.exclude(pk=self.instance.pk)
 
-            if query_anual.count() >= 6:
+            if query_anual.count() >= TOPE_ART85_ANUAL:
                 raise serializers.ValidationError(
                     {
                         "non_field_errors": [
@@ -162,23 +236,242 @@ class SolicitudSerializer(serializers.ModelSerializer):
                     }
                 )
 
-        # --- REGLA 2: Duplicados (Mismo día) ---
-        duplicados = Solicitud.objects.filter(
-            agente=agente, fecha_inicio=fecha_obj
-        ).exclude(
-            estado__contains="RECHAZADO"
+        # --- REGLA 2: Superposición de períodos (fecha_inicio + días) ---
+        # Una sola consulta sobre el índice (agente, fecha_inicio, fecha_fin).
+        # En PostgreSQL la restricción EXCLUDE garantiza lo mismo ante carreras.
+        dias = data.get("dias", self.instance.dias if self.instance else 1)
+        fecha_fin = Solicitud.calcular_fecha_fin(
+            fecha_obj, dias, getattr(tipo_licencia, "dias_habiles", False)
+        )
+
+        superpuestas = superposiciones(
+            agente.pk, fecha_obj, fecha_fin, excluir=self.instance.pk if self.instance else None
         )  # Permitimos re-pedir si la anterior fue rechazada
 
-        if self.instance:
-            duplicados = duplicados.exclude(pk=self.instance.pk)
+        if superpuestas.exists():
+            raise serializers.ValidationError(
+                {"fecha_inicio": "⚠️ Ya existe una solicitud activa que cubre alguna de estas fechas."}
+            )
+
+        return data
+
+
+class SolicitudLoteSerializer(serializers.Serializer):
+    """
+    Varias fechas sueltas con el mismo tipo, jefe y motivo (ej: 3 días de Art. 85).
+    Se valida todo junto: una consulta para superposiciones y otra para topes,
+    en lugar de repetir validate() por cada fecha.
+    """
+
+    agente = serializers.PrimaryKeyRelatedField(queryset=Agente.objects.all())
+    tipo = serializers.PrimaryKeyRelatedField(queryset=TipoLicencia.objects.all())
+    jefe_seleccionado = serializers.PrimaryKeyRelatedField(queryset=Agente.objects.all())
+    fechas = serializers.ListField(
+        child=serializers.DateField(), min_length=1, max_length=MAXIMO_FECHAS_LOTE
+    )
+    dias = serializers.IntegerField(min_value=1, default=1)
+    motivo = serializers.CharField(required=False, allow_blank=True, default="")
+
+    def validate(self, data):
+        agente, tipo = data["agente"], data["tipo"]
+        fechas = sorted(set(data["fechas"]))
+        periodos = [
+            (inicio, Solicitud.calcular_fecha_fin(inicio, data["dias"], tipo.dias_habiles))
+            for inicio in fechas
+        ]
+
+        cerrados = sorted(anio for anio in {f.year for f in fechas} if anio_archivado(anio))
+        if cerrados:
+            raise serializers.ValidationError(
+                {"fechas": f"⛔ El año {cerrados[0]} ya está cerrado y archivado. Comuníquese con RRHH."}
+            )
+
+        # --- Entre ellas: ordenadas por inicio, cada una debe empezar después del fin anterior ---
+        for (_, fin_anterior), (inicio, _) in zip(periodos, periodos[1:]):
+            if inicio <= fin_anterior:
+                raise serializers.ValidationError(
+                    {"fechas": f"⚠️ La fecha {inicio:%d/%m/%Y} se superpone con otra del mismo pedido."}
+                )
 
-        if duplicados.exists():
+        # --- Contra lo ya cargado: UNA consulta por el rango completo ---
+        existentes = list(
+            superposiciones(agente.pk, periodos[0][0], max(fin for _, fin in periodos))
+            .order_by("fecha_inicio")
+            .values_list("fecha_inicio", "fecha_fin")
+        )
+        chocan = [
+            inicio
+            for inicio, fin in periodos
+            if any(e_inicio <= fin and e_fin >= inicio for e_inicio, e_fin in existentes)
+        ]
+        if chocan:
             raise serializers.ValidationError(
-                {"fecha_inicio": "⚠️ Ya existe una solicitud activa para esta fecha."}
+                {
+                    "fechas": "⚠️ Ya existe una solicitud activa que cubre: "
+                    + ", ".join(f"{f:%d/%m/%Y}" for f in chocan)
+                }
             )
 
+        # --- Topes Art. 85: UNA consulta con lo ya usado en los años del pedido ---
+        if tipo.codigo.lower() == "art_85":
+            usadas = Solicitud.objects.filter(
+                agente=agente,
+                tipo__codigo__iexact="art_85",
+                fecha_inicio__gte=date(fechas[0].year, 1, 1),
+                fecha_inicio__lte=date(fechas[-1].year, 12, 31),
+            ).exclude(estado__contains="RECHAZADO").values_list("fecha_inicio", flat=True)
+
+            por_mes = Counter((f.year, f.month) for f in usadas)
+            por_anio = Counter(f.year for f in usadas)
+            for fecha in fechas:
+                por_mes[(fecha.year, fecha.month)] += 1
+                por_anio[fecha.year] += 1
+
+            meses = sorted(m for m, n in por_mes.items() if n > TOPE_ART85_MENSUAL)
+            if meses:
+                raise serializers.ValidationError(
+                    {
+                        "non_field_errors": [
+                            f"⛔ Tope mensual para Art. 85 superado (máximo {TOPE_ART85_MENSUAL}) en: "
+                            + ", ".join(f"{mes:02d}/{anio}" for anio, mes in meses)
+                        ]
+                    }
+                )
+            anios = sorted(a for a, n in por_anio.items() if n > TOPE_ART85_ANUAL)
+            if anios:
+                raise serializers.ValidationError(
+                    {
+                        "non_field_errors": [
+                            f"⛔ Tope anual para Art. 85 superado (máximo {TOPE_ART85_ANUAL}) en: "
+                            + ", ".join(map(str, anios))
+                        ]
+                    }
+                )
+
+        data["periodos"] = periodos
         return data
 
+    def create(self, validated_data):
+        """Un solo INSERT para todas (más el historial), dentro de la transacción de la vista."""
+        solicitudes = Solicitud.objects.bulk_create(
+            [
+                Solicitud(
+                    agente=validated_data["agente"],
+                    tipo=validated_data["tipo"],
+                    jefe_seleccionado=validated_data["jefe_seleccionado"],
+                    fecha_inicio=inicio,
+                    fecha_fin=fin,  # bulk_create no pasa por save()
+                    dias=validated_data["dias"],
+                    motivo=validated_data["motivo"],
+                )
+                for inicio, fin in validated_data["periodos"]
+            ]
+        )
+        HistorialEstado.objects.bulk_create(
+            [
+                HistorialEstado(
+                    solicitud_id=solicitud.pk,
+                    estado_nuevo=solicitud.estado,
+                    fecha=solicitud.fecha_solicitud,
+                    jefe_id=solicitud.jefe_seleccionado_id,
+                    area_id=solicitud.agente.area_id,
+                )
+                for solicitud in solicitudes
+            ]
+        )
+        # Todas nacen con el mismo estado y el mismo jefe: un solo ajuste de contadores
+        primera = solicitudes[0]
+        mover(None, (primera.estado, primera.jefe_seleccionado_id), len(solicitudes))
+        return solicitudes
+
+
+# ---------------------------------------------------------
+# LECTURA RÁPIDA DE LISTADOS (Sin la maquinaria de DRF por objeto)
+# ---------------------------------------------------------
+# Campo de salida -> columna para .values_list(). Mismo JSON que SolicitudSerializer.
+COLUMNAS_SOLICITUD = {
+    "id": "id",
+    "nombre_agente": "agente__nombre",
+    "apellido_agente": "agente__apellido",
+    "tipo_descripcion": "tipo__descripcion",
+    "tipo_codigo": "tipo__codigo",
+    "agente": "agente_id",
+    "tipo": "tipo_id",
+    "jefe_seleccionado": "jefe_seleccionado_id",
+    "reclamada_por": "reclamada_por_id",
+    "lote_descuento": "lote_descuento_id",
+}
+
+
+def _formato_fecha_hora(valor):
+    # Igual que serializers.DateTimeField: hora local y "Z" para UTC
+    if valor is None:
+        return None
+    texto = timezone.localtime(valor).isoformat()
+    return texto[:-6] + "Z" if texto.endswith("+00:00") else texto
+
+
+def _formato_fecha(valor):
+    return valor.isoformat() if valor is not None else None
+
+
+def _formateador_archivo(request):
+    def formatear(valor):
+        if not valor:
+            return None
+        url = default_storage.url(valor)
+        return request.build_absolute_uri(url) if request is not None else url
+
+    return formatear
+
+
+def filas_solicitudes(queryset, request=None):
+    """
+    Equivalente a SolicitudSerializer(queryset, many=True).data para listados,
+    pero armando cada fila directo desde tuplas de .values_list().
+    """
+    incluir, omitir = campos_pedidos(request)
+    nombres = filtrar_nombres(_nombres_solicitud(), incluir, omitir)
+    columnas = [COLUMNAS_SOLICITUD.get(n, n) for n in nombres]
+
+    # Solo formateamos las columnas que lo necesitan
+    conversiones = []
+    for i, nombre in enumerate(nombres):
+        campo = _campo_modelo(nombre)
+        if isinstance(campo, models.DateTimeField):
+            conversiones.append((i, _formato_fecha_hora))
+        elif isinstance(campo, models.DateField):
+            conversiones.append((i, _formato_fecha))
+        elif isinstance(campo, models.FileField):
+            conversiones.append((i, _formateador_archivo(request)))
+
+    filas = []
+    for tupla in queryset.values_list(*columnas):
+        if conversiones:
+            tupla = list(tupla)
+            for i, formatear in conversiones:
+                tupla[i] = formatear(tupla[i])
+        filas.append(dict(zip(nombres, tupla)))
+    return filas
+
+
+_NOMBRES_SOLICITUD = None
+
+
+def _nombres_solicitud():
+    # Tomamos el orden de campos del serializer una sola vez (sin request: todos)
+    global _NOMBRES_SOLICITUD
+    if _NOMBRES_SOLICITUD is None:
+        _NOMBRES_SOLICITUD = list(SolicitudSerializer().fields.keys())
+    return _NOMBRES_SOLICITUD
+
+
+def _campo_modelo(nombre):
+    try:
+        return Solicitud._meta.get_field(nombre)
+    except FieldDoesNotExist:
+        return None  # Campos calculados (nombre_agente, tipo_codigo, ...)
+
 
 # ---------------------------------------------------------
 # WIZARD DE ACTIVACIÓN - PASO 1: IDENTIFICACIÓN
@@ -345,3 +638,60 @@ class ActivacionPaso2Serializer(serializers.Serializer):
 
         self.context["agente"] = agente
         return data
+
+
+# ---------------------------------------------------------
+# DATOS PARA ABRIR EL FORMULARIO (NuevaSolicitud.vue en un solo viaje)
+# ---------------------------------------------------------
+def datos_formulario(agente_id, hoy=None):
+    """
+    Catálogo de licencias + perfil + jefes posibles + cupos usados del mes y el año.
+    Siempre 4 consultas, sin importar cuántos tipos o jefes haya.
+    """
+    hoy = hoy or timezone.localdate()
+    agente = Agente.objects.select_related("area").get(pk=agente_id)  # 1
+    perfil = AgenteSerializer(agente).data  # 2 (autoridades_disponibles)
+    tipos = TipoLicenciaSerializer(TipoLicencia.objects.order_by("descripcion"), many=True).data  # 3
+
+    # 4. Cuántas solicitudes (no rechazadas) lleva de cada tipo en el mes y en el año
+    inicio_anio = hoy.replace(month=1, day=1)
+    inicio_mes = hoy.replace(day=1)
+    usadas = {
+        fila["tipo_id"]: fila
+        for fila in Solicitud.objects.filter(
+            agente_id=agente_id,
+            fecha_inicio__gte=inicio_anio,
+            fecha_inicio__lt=inicio_anio.replace(year=hoy.year + 1),
+        )
+        .exclude(estado__contains="RECHAZADO")
+        .values("tipo_id")
+        .annotate(
+            anio=models.Count("id"),
+            mes=models.Count(
+                "id",
+                filter=models.Q(
+                    fecha_inicio__gte=inicio_mes,
+                    fecha_inicio__lt=(inicio_mes + timedelta(days=32)).replace(day=1),
+                ),
+            ),
+        )
+    }
+
+    cupos = [
+        {
+            "tipo": tipo["id"],
+            "limite_mensual": tipo["limite_mensual"],
+            "usadas_mes": usadas.get(tipo["id"], {}).get("mes", 0),
+            "limite_anual": tipo["limite_anual"],
+            "usadas_anio": usadas.get(tipo["id"], {}).get("anio", 0),
+        }
+        for tipo in tipos
+        if tipo["limite_mensual"] or tipo["limite_anual"]
+    ]
+
+    return {
+        "licencias": tipos,
+        "agente": perfil,
+        "supervisores": perfil["supervisores_detalle"],
+        "cupos": cupos,
+    }
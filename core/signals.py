@@ -0,0 +1,34 @@
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .busqueda import invalidar_indice_local
+from .calendario import anios_feriado, reconstruir_anio
+from .models import Agente, Feriado
+
+
+# Al cargar, mover o borrar un feriado regeneramos el mapa del año (y el del año
+# anterior si cambió de año). Las fechas de fin NO se corren acá: pueden chocar
+# con otra licencia y eso se resuelve a la vista (FeriadoAdmin o
+# manage.py recalcular_calendario), no dentro de un save.
+@receiver(pre_save, sender=Feriado)
+def feriado_por_guardar(sender, instance, **kwargs):
+    instance._fecha_anterior = (
+        Feriado.objects.filter(pk=instance.pk).values_list("fecha", flat=True).first()
+        if instance.pk
+        else None
+    )
+
+
+@receiver(post_save, sender=Feriado)
+@receiver(post_delete, sender=Feriado)
+def feriado_modificado(sender, instance, **kwargs):
+    for anio in anios_feriado(instance):
+        reconstruir_anio(anio)
+
+
+# El índice de búsqueda en memoria (bases sin pg_trgm) se rearma en el próximo uso.
+# Otros procesos lo ven al vencer BUSQUEDA_CACHE_SEGUNDOS.
+@receiver(post_save, sender=Agente)
+@receiver(post_delete, sender=Agente)
+def agente_modificado(sender, instance, **kwargs):
+    invalidar_indice_local()
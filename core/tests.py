@@ -1,3 +1,599 @@
-from django.test import TestCase
+import asyncio
+import json
+import time
+import unittest
+from datetime import date
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth import authenticate
+from django.contrib.auth.models import User
+from django.core import mail
+from django.core.cache import cache
+from django.db import connection, connections
+from django.test import RequestFactory, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.exceptions import ValidationError
+from rest_framework.test import APIClient
+
+from . import cola_rrhh, pendientes
+from .archivo import archivar, primer_anio_vivo
+from .eventos import CANAL_RRHH, BrokerPostgres, canal_jefe
+from .models import (
+    Agente,
+    Area,
+    ContadorPendientes,
+    HistorialEstado,
+    Solicitud,
+    SolicitudArchivada,
+    TipoLicencia,
+)
+from .replica import HEADER_PRIMARIA, leer_de_primaria, marca_vigente, nueva_marca
+from .transiciones import LA_TIENE_OTRO, ConflictoDeEstado, aplicar_transicion
+
+
+class TransicionesTests(TestCase):
+    """UPDATE condicional de estado (core/transiciones.py) y su uso desde la API."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(nombre="Alumnado")
+        cls.jefe = Agente.objects.create(
+            legajo=1, nombre="Jefe", apellido="Prueba", area=area, categoria="03"
+        )
+        cls.agente = Agente.objects.create(legajo=2, nombre="Agente", apellido="Prueba", area=area)
+        cls.tipo = TipoLicencia.objects.create(
+            codigo="art_85", descripcion="Razones particulares", texto_para_reloj="ART85"
+        )
+
+    def setUp(self):
+        self.solicitud = Solicitud.objects.create(
+            agente=self.agente,
+            tipo=self.tipo,
+            jefe_seleccionado=self.jefe,
+            fecha_inicio=date(2026, 3, 2),
+            dias=1,
+        )
+        self.client = APIClient()
+
+    def test_dos_operadores_gana_uno_y_el_otro_recibe_409(self):
+        # Los dos leyeron la solicitud antes de que cualquiera escribiera
+        primero = Solicitud.objects.get(pk=self.solicitud.pk)
+        segundo = Solicitud.objects.get(pk=self.solicitud.pk)
+
+        aplicar_transicion(primero, "AVISO_CONFIRMADO")
+        with self.assertRaises(ConflictoDeEstado) as error:
+            aplicar_transicion(segundo, "AVISO_NEGADO")
+
+        self.assertEqual(error.exception.status_code, 409)
+        self.solicitud.refresh_from_db()
+        self.assertEqual(self.solicitud.estado, "AVISO_CONFIRMADO")
+        self.assertEqual(
+            list(
+                HistorialEstado.objects.filter(solicitud_id=self.solicitud.pk).values_list(
+                    "estado_anterior", "estado_nuevo"
+                )
+            ),
+            [("PENDIENTE_VALIDACION", "AVISO_CONFIRMADO")],
+        )
+
+    def test_no_se_modifican_otros_campos_con_el_estado(self):
+        with self.assertRaises(ValidationError):
+            aplicar_transicion(self.solicitud, "AVISO_CONFIRMADO", dias=5)
+
+        self.solicitud.refresh_from_db()
+        self.assertEqual(self.solicitud.estado, "PENDIENTE_VALIDACION")
+        self.assertEqual(self.solicitud.dias, 1)
+
+    def test_patch_con_estado_y_dias_no_deja_fecha_fin_vieja(self):
+        fecha_fin = self.solicitud.fecha_fin
+        respuesta = self.client.patch(
+            f"/api/solicitudes/{self.solicitud.pk}/",
+            {"estado": "AVISO_CONFIRMADO", "dias": 3},
+            format="json",
+        )
+
+        self.assertEqual(respuesta.status_code, 400)
+        self.assertIn("dias", respuesta.json())
+        self.solicitud.refresh_from_db()
+        self.assertEqual((self.solicitud.estado, self.solicitud.dias), ("PENDIENTE_VALIDACION", 1))
+        self.assertEqual(self.solicitud.fecha_fin, fecha_fin)
+
+    def test_patch_con_motivo_de_rechazo(self):
+        respuesta = self.client.patch(
+            f"/api/solicitudes/{self.solicitud.pk}/",
+            {"estado": "AVISO_NEGADO", "motivo_rechazo": "No avisó"},
+            format="json",
+        )
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.solicitud.refresh_from_db()
+        self.assertEqual(self.solicitud.estado, "AVISO_NEGADO")
+        self.assertEqual(self.solicitud.motivo_rechazo, "No avisó")
+
+    def test_lease_de_rrhh_solo_lo_resuelve_quien_lo_tiene(self):
+        area = self.agente.area
+        uno = Agente.objects.create(legajo=3, nombre="Uno", apellido="RRHH", area=area, es_rrhh=True)
+        otro = Agente.objects.create(legajo=4, nombre="Otro", apellido="RRHH", area=area, es_rrhh=True)
+        aplicar_transicion(self.solicitud, "AVISO_CONFIRMADO")
+        self.assertEqual(list(cola_rrhh.reclamar(uno, 10)), [self.solicitud])
+
+        with self.assertRaisesMessage(ConflictoDeEstado, LA_TIENE_OTRO):
+            aplicar_transicion(Solicitud.objects.get(pk=self.solicitud.pk), "RECHAZADO", operador=otro)
+        with self.assertRaises(ConflictoDeEstado):
+            aplicar_transicion(Solicitud.objects.get(pk=self.solicitud.pk), "RECHAZADO")
+
+        aplicar_transicion(Solicitud.objects.get(pk=self.solicitud.pk), "APROBADO", operador=uno)
+        self.solicitud.refresh_from_db()
+        self.assertEqual(self.solicitud.estado, "APROBADO")
+        self.assertIsNone(self.solicitud.reclamada_por)
+
+
+class IdempotenciaTests(TestCase):
+    """Idempotency-Key en altas (core/idempotencia.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(nombre="Alumnado")
+        cls.jefe = Agente.objects.create(
+            legajo=1, nombre="Jefe", apellido="Prueba", area=area, categoria="03",
+            email="jefe@example.com", avisos_inmediatos=True,
+        )
+        cls.agente = Agente.objects.create(legajo=2, nombre="Agente", apellido="Prueba", area=area)
+        cls.otro = Agente.objects.create(legajo=3, nombre="Otro", apellido="Prueba", area=area)
+        cls.tipo = TipoLicencia.objects.create(
+            codigo="art_85", descripcion="Razones particulares", texto_para_reloj="ART85"
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _crear(self, clave, agente=None, fecha="2026-03-02"):
+        return self.client.post(
+            "/api/solicitudes/",
+            {
+                "agente": (agente or self.agente).pk,
+                "tipo": self.tipo.pk,
+                "jefe_seleccionado": self.jefe.pk,
+                "fecha_inicio": fecha,
+                "dias": 1,
+                "motivo": "Trámite",
+            },
+            format="json",
+            HTTP_IDEMPOTENCY_KEY=clave,
+        )
+
+    def test_reintento_devuelve_la_respuesta_guardada(self):
+        primera = self._crear("clave-1")
+        segunda = self._crear("clave-1")
+
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual(segunda.status_code, 201)
+        self.assertEqual(segunda["Idempotent-Replayed"], "true")
+        self.assertEqual(segunda.json(), primera.json())
+        self.assertEqual(Solicitud.objects.filter(agente=self.agente).count(), 1)
+        self.assertEqual(len(mail.outbox), 1)
+
+    def test_misma_clave_con_otro_cuerpo_da_422(self):
+        self.assertEqual(self._crear("clave-1").status_code, 201)
+
+        respuesta = self._crear("clave-1", fecha="2026-03-03")
+
+        self.assertEqual(respuesta.status_code, 422)
+        self.assertEqual(Solicitud.objects.filter(agente=self.agente).count(), 1)
+
+    def test_la_clave_es_de_cada_agente(self):
+        self.assertEqual(self._crear("clave-1").status_code, 201)
+
+        respuesta = self._crear("clave-1", agente=self.otro)
+
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertNotIn("Idempotent-Replayed", respuesta)
+        self.assertEqual(Solicitud.objects.filter(agente=self.otro).count(), 1)
+
+    def test_si_falla_el_email_el_alta_queda_y_el_reintento_la_repite(self):
+        with mock.patch("core.avisos.send_mail", side_effect=OSError("SMTP caído")):
+            with self.assertLogs("core.views", "ERROR"):
+                primera = self._crear("clave-1")
+        segunda = self._crear("clave-1")
+
+        self.assertEqual(primera.status_code, 201)
+        self.assertEqual((segunda.status_code, segunda["Idempotent-Replayed"]), (201, "true"))
+        self.assertEqual(Solicitud.objects.filter(agente=self.agente).count(), 1)
+
+
+@override_settings(
+    CACHES={"default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "tests"}},
+    LIMITES_ACCESO={
+        "login_ip": {"intentos": 3, "segundos": 60},
+        "login_legajo": {"intentos": 100, "segundos": 60},
+        "activacion_ip": {"intentos": 3, "segundos": 60},
+        "activacion_legajo": {"intentos": 100, "segundos": 60},
+    },
+    PASSWORD_HASHERS=["django.contrib.auth.hashers.MD5PasswordHasher"],  # Solo para que sea rápido
+)
+class LimitesDeAccesoTests(TestCase):
+    """Límites de login (core/throttles.py): lo rechazado no llega a authenticate()."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(nombre="Alumnado")
+        for legajo in (10, 11):
+            usuario = User.objects.create_user(username=str(legajo), password="482915")
+            Agente.objects.create(
+                legajo=legajo, nombre="Agente", apellido="Prueba", area=area, usuario=usuario
+            )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+
+    def _login(self, legajo=10, password="000000", **extra):
+        extra.setdefault("REMOTE_ADDR", "198.51.100.7")
+        return self.client.post(
+            "/api/agentes/login/", {"legajo": legajo, "password": password}, format="json", **extra
+        ).status_code
+
+    def test_rechazado_no_llega_a_authenticate(self):
+        with mock.patch("core.views.authenticate", wraps=authenticate) as espia:
+            codigos = [self._login() for _ in range(5)]
+
+        self.assertEqual(codigos, [401, 401, 401, 429, 429])
+        self.assertEqual(espia.call_count, 3)
+
+    def test_x_forwarded_for_inventado_no_abre_otro_contador(self):
+        codigos = [self._login(HTTP_X_FORWARDED_FOR=f"203.0.113.{i}") for i in range(5)]
+
+        self.assertEqual(codigos, [401, 401, 401, 429, 429])
+
+    @override_settings(
+        LIMITES_ACCESO={
+            "login_ip": {"intentos": 100, "segundos": 60},
+            "login_legajo": {"intentos": 2, "segundos": 60},
+        }
+    )
+    def test_el_legajo_se_limita_aunque_cambie_la_ip(self):
+        codigos = [self._login(REMOTE_ADDR=f"10.0.0.{i}") for i in range(1, 4)]
+
+        self.assertEqual(codigos, [401, 401, 429])
+        # Otro legajo desde la misma IP sigue pudiendo entrar
+        self.assertEqual(self._login(legajo=11, password="482915", REMOTE_ADDR="10.0.0.3"), 200)
+
+
+@override_settings(DELTA_SYNC_MARGEN=0)
+class SincronizacionTests(TestCase):
+    """Listados con ?since= (cambios, eliminadas y cursor)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(nombre="Alumnado")
+        cls.jefe = Agente.objects.create(
+            legajo=1, nombre="Jefe", apellido="Prueba", area=area, categoria="03"
+        )
+        cls.agente = Agente.objects.create(legajo=2, nombre="Agente", apellido="Prueba", area=area)
+        cls.tipo = TipoLicencia.objects.create(
+            codigo="art_85", descripcion="Razones particulares", texto_para_reloj="ART85"
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.quieta, self.tocada = (
+            Solicitud.objects.create(
+                agente=self.agente,
+                tipo=self.tipo,
+                jefe_seleccionado=self.jefe,
+                fecha_inicio=date(2026, 3, dia),
+                dias=1,
+            )
+            for dia in (2, 9)
+        )
+
+    def _bandeja(self, since):
+        respuesta = self.client.get("/api/solicitudes/", {"jefe": self.jefe.pk, "since": since})
+        self.assertEqual(respuesta.status_code, 200)
+        return respuesta.json()
+
+    def test_since_vacio_trae_la_bandeja_entera_y_un_cursor(self):
+        datos = self._bandeja("")
+
+        self.assertEqual({fila["id"] for fila in datos["cambios"]}, {self.quieta.pk, self.tocada.pk})
+        self.assertEqual(datos["eliminadas"], [])
+        self.assertTrue(datos["cursor"].endswith("Z"))
+
+    def test_solo_vuelve_lo_que_cambio_despues_del_cursor(self):
+        cursor = self._bandeja("")["cursor"]
+        self.client.patch(
+            f"/api/solicitudes/{self.tocada.pk}/", {"motivo": "Cambió"}, format="json"
+        )
+
+        datos = self._bandeja(cursor)
+
+        self.assertEqual([fila["id"] for fila in datos["cambios"]], [self.tocada.pk])
+        self.assertEqual(datos["cambios"][0]["motivo"], "Cambió")
+        self.assertEqual(datos["eliminadas"], [])
+
+    def test_borrada_o_fuera_del_filtro_vuelve_en_eliminadas(self):
+        cursor = self._bandeja("")["cursor"]
+        self.assertEqual(self.client.delete(f"/api/solicitudes/{self.quieta.pk}/").status_code, 204)
+        aplicar_transicion(self.tocada, "AVISO_CONFIRMADO")  # Sale de la bandeja del jefe
+
+        datos = self._bandeja(cursor)
+
+        self.assertEqual(datos["cambios"], [])
+        self.assertEqual(sorted(datos["eliminadas"]), sorted([self.quieta.pk, self.tocada.pk]))
+        # El tombstone no aparece en los listados comunes
+        listado = self.client.get("/api/solicitudes/", {"agente": self.agente.pk}).json()
+        self.assertEqual([fila["id"] for fila in listado], [self.tocada.pk])
+
+    def test_cursor_invalido(self):
+        respuesta = self.client.get("/api/solicitudes/", {"since": "ayer"})
+
+        self.assertEqual(respuesta.status_code, 400)
+
+
+class ArchivoTests(TestCase):
+    """Solicitudes de años cerrados movidas a SolicitudArchivada (core/archivo.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(nombre="Alumnado")
+        cls.jefe = Agente.objects.create(
+            legajo=1, nombre="Jefe", apellido="Prueba", area=area, categoria="03"
+        )
+        cls.agente = Agente.objects.create(legajo=2, nombre="Agente", apellido="Archivo", area=area)
+        cls.tipo = TipoLicencia.objects.create(
+            codigo="art_85", descripcion="Razones particulares", texto_para_reloj="ART85"
+        )
+        cls.anio = primer_anio_vivo() - 1
+
+    def setUp(self):
+        self.client = APIClient()
+        self.vieja = Solicitud.objects.create(
+            agente=self.agente,
+            tipo=self.tipo,
+            jefe_seleccionado=self.jefe,
+            fecha_inicio=date(self.anio, 3, 2),
+            dias=1,
+            estado="IMPACTADO",
+        )
+
+    def test_archivar_mueve_la_fila_con_el_mismo_id(self):
+        self.assertEqual(archivar(self.anio), 1)
+
+        self.assertFalse(Solicitud.todas.filter(pk=self.vieja.pk).exists())
+        self.assertEqual(SolicitudArchivada.objects.get(pk=self.vieja.pk).estado, "IMPACTADO")
+
+    def test_retrieve_busca_en_el_archivo(self):
+        archivar(self.anio)
+
+        respuesta = self.client.get(f"/api/solicitudes/{self.vieja.pk}/")
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertEqual(respuesta.json()["id"], self.vieja.pk)
+        self.assertEqual(self.client.get("/api/solicitudes/999999/").status_code, 404)
+
+    def test_exportar_excel_incluye_lo_archivado(self):
+        archivar(self.anio)
+
+        respuesta = self.client.get("/api/solicitudes/exportar_excel/")
+
+        contenido = b"".join(respuesta.streaming_content).decode("utf-8-sig")
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertIn(f"2,Archivo,Agente,Razones particulares,{self.anio}-03-02", contenido)
+
+    @override_settings(DELTA_SYNC_MARGEN=0)
+    def test_since_informa_la_fila_archivada(self):
+        cursor = self.client.get("/api/solicitudes/", {"since": ""}).json()["cursor"]
+        archivar(self.anio)
+
+        general = self.client.get("/api/solicitudes/", {"since": cursor}).json()
+        del_agente = self.client.get(
+            "/api/solicitudes/", {"since": cursor, "agente": self.agente.pk}
+        ).json()
+
+        # La bandeja general ya no la muestra; la del agente (que incluye el archivo) sí
+        self.assertEqual((general["cambios"], general["eliminadas"]), ([], [self.vieja.pk]))
+        self.assertEqual([fila["id"] for fila in del_agente["cambios"]], [self.vieja.pk])
+        self.assertEqual(del_agente["eliminadas"], [])
+
+
+class ContadoresPendientesTests(TestCase):
+    """Contadores materializados de las bandejas (core/pendientes.py)."""
+
+    @classmethod
+    def setUpTestData(cls):
+        area = Area.objects.create(nombre="Alumnado")
+        cls.jefe = Agente.objects.create(
+            legajo=1, nombre="Jefe", apellido="Prueba", area=area, categoria="03"
+        )
+        cls.agente = Agente.objects.create(legajo=2, nombre="Agente", apellido="Prueba", area=area)
+        cls.tipo = TipoLicencia.objects.create(
+            codigo="art_85", descripcion="Razones particulares", texto_para_reloj="ART85"
+        )
+
+    def setUp(self):
+        self.client = APIClient()
+
+    def _badges(self):
+        return self.client.get(
+            "/api/solicitudes/pendientes/", {"jefe": self.jefe.pk, "modo_rrhh": "true"}
+        ).json()
+
+    def _crear(self, mes):
+        # Un mes distinto cada una: el art. 85 tiene tope mensual
+        respuesta = self.client.post(
+            "/api/solicitudes/",
+            {
+                "agente": self.agente.pk,
+                "tipo": self.tipo.pk,
+                "jefe_seleccionado": self.jefe.pk,
+                "fecha_inicio": f"2026-{mes:02d}-02",
+                "dias": 1,
+            },
+            format="json",
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        return respuesta.json()["id"]
+
+    def test_altas_transiciones_y_bajas_mueven_los_contadores(self):
+        uno, dos, tres = (self._crear(mes) for mes in (3, 4, 5))
+        self.assertEqual(self._badges(), {"jefe": 3, "rrhh": 0})
+
+        self.client.patch(f"/api/solicitudes/{uno}/", {"estado": "AVISO_CONFIRMADO"}, format="json")
+        self.client.patch(f"/api/solicitudes/{dos}/", {"estado": "AVISO_NEGADO"}, format="json")
+        self.client.delete(f"/api/solicitudes/{tres}/")
+        self.assertEqual(self._badges(), {"jefe": 0, "rrhh": 2})
+
+        self.client.patch(f"/api/solicitudes/{uno}/", {"estado": "APROBADO"}, format="json")
+        self.assertEqual(self._badges(), {"jefe": 0, "rrhh": 1})
+        # Lo que se movió coincide con contar de cero
+        self.assertEqual(pendientes.reconstruir(), {})
+
+    def test_reconstruir_corrige_un_contador_desfasado(self):
+        self._crear(3)
+        ContadorPendientes.objects.filter(pk=canal_jefe(self.jefe.pk)).update(cantidad=7)
+
+        self.assertEqual(pendientes.reconstruir(), {canal_jefe(self.jefe.pk): (7, 1)})
+        self.assertEqual(self._badges(), {"jefe": 1, "rrhh": 0})
+
+
+@override_settings(REPLICA_LECTURAS=True)
+class ReplicaTests(TransactionTestCase):
+    """
+    Ruteo a la réplica (core/replica.py). En los tests "replica" es un espejo de
+    la base de test: se usan datos confirmados (TransactionTestCase) y se mira
+    por qué conexión pasó cada consulta.
+    """
+
+    databases = {"default", "replica"}
+
+    def setUp(self):
+        self.addCleanup(leer_de_primaria)  # Que el ruteo de un request no siga en el test
+        area = Area.objects.create(nombre="Alumnado")
+        self.jefe = Agente.objects.create(
+            legajo=1, nombre="Jefe", apellido="Prueba", area=area, categoria="03"
+        )
+        self.agente = Agente.objects.create(legajo=2, nombre="Agente", apellido="Prueba", area=area)
+        self.tipo = TipoLicencia.objects.create(
+            codigo="art_85", descripcion="Razones particulares", texto_para_reloj="ART85"
+        )
+        self.solicitud = Solicitud.objects.create(
+            agente=self.agente,
+            tipo=self.tipo,
+            jefe_seleccionado=self.jefe,
+            fecha_inicio=date(2026, 3, 2),
+            dias=1,
+            estado="IMPACTADO",
+        )
+        self.client = APIClient()
+
+    def _pedir(self, metodo, ruta, *args, **kwargs):
+        """Respuesta, su contenido y las consultas a core_solicitud que hizo cada base."""
+        with (
+            CaptureQueriesContext(connections["default"]) as primaria,
+            CaptureQueriesContext(connections["replica"]) as replica,
+        ):
+            respuesta = getattr(self.client, metodo)(ruta, *args, **kwargs)
+            # El CSV se consulta a medida que sale: hay que leerlo acá adentro
+            contenido = (
+                b"".join(respuesta.streaming_content) if respuesta.streaming else respuesta.content
+            )
+
+        def de_solicitudes(consultas):
+            return [c["sql"] for c in consultas if "core_solicitud" in c["sql"]]
+
+        return respuesta, contenido, de_solicitudes(primaria), de_solicitudes(replica)
+
+    def test_listados_detalle_y_exportacion_leen_de_la_replica(self):
+        for ruta in (
+            f"/api/solicitudes/?agente={self.agente.pk}",
+            f"/api/solicitudes/{self.solicitud.pk}/",
+            "/api/solicitudes/exportar_excel/",
+        ):
+            with self.subTest(ruta=ruta):
+                respuesta, contenido, primaria, replica = self._pedir("get", ruta)
+
+                self.assertEqual(respuesta.status_code, 200)
+                self.assertIn("Razones particulares".encode(), contenido)
+                self.assertTrue(replica)
+                self.assertEqual(primaria, [])
+
+    def test_las_escrituras_van_a_la_primaria_y_marcan_al_cliente(self):
+        respuesta, _, primaria, replica = self._pedir(
+            "post",
+            "/api/solicitudes/",
+            {
+                "agente": self.agente.pk,
+                "tipo": self.tipo.pk,
+                "jefe_seleccionado": self.jefe.pk,
+                "fecha_inicio": "2026-04-06",
+                "dias": 1,
+            },
+            format="json",
+        )
+
+        self.assertEqual(respuesta.status_code, 201)
+        self.assertTrue(any(sql.startswith("INSERT") for sql in primaria))
+        self.assertEqual(replica, [])
+        siguiente = RequestFactory().get("/", HTTP_X_PRIMARIA_HASTA=respuesta[HEADER_PRIMARIA])
+        self.assertTrue(marca_vigente(siguiente))
+
+    def test_con_marca_vigente_lee_de_la_primaria(self):
+        respuesta, _, primaria, replica = self._pedir(
+            "get",
+            f"/api/solicitudes/?agente={self.agente.pk}",
+            HTTP_X_PRIMARIA_HASTA=str(nueva_marca()),
+        )
+
+        self.assertEqual(respuesta.status_code, 200)
+        self.assertTrue(primaria)
+        self.assertEqual(replica, [])
+
+    def test_marca_vencida_o_inventada_no_pega_a_la_primaria(self):
+        for marca in (time.time() - 1, time.time() + 3600):
+            with self.subTest(marca=marca):
+                _, _, primaria, replica = self._pedir(
+                    "get",
+                    f"/api/solicitudes/?agente={self.agente.pk}",
+                    HTTP_X_PRIMARIA_HASTA=str(marca),
+                )
+
+                self.assertTrue(replica)
+                self.assertEqual(primaria, [])
+
+
+class BrokerPostgresTests(TransactionTestCase):
+    """
+    Broker compartido de eventos (core/eventos.py): lo que publica un worker
+    WSGI llega a los suscriptores del proceso ASGI por LISTEN/NOTIFY.
+    """
+
+    def test_reparte_solo_a_los_suscriptores_del_canal(self):
+        broker = BrokerPostgres()
+
+        async def escenario():
+            with mock.patch.object(BrokerPostgres, "_escuchar"):  # Sin conexión LISTEN
+                jefe = broker.suscribir([canal_jefe(1)])
+                rrhh = broker.suscribir([CANAL_RRHH])
+            broker._despachar(json.dumps({"canal": CANAL_RRHH, "evento": {"id": 7}}))
+            return await asyncio.wait_for(rrhh.get(), 1), jefe.empty()
+
+        evento, jefe_vacio = asyncio.run(escenario())
+
+        self.assertEqual(evento, {"id": 7})
+        self.assertTrue(jefe_vacio)
+
+    @unittest.skipUnless(connection.vendor == "postgresql", "LISTEN/NOTIFY requiere PostgreSQL")
+    def test_notify_llega_al_suscriptor(self):
+        broker = BrokerPostgres()
+
+        async def escenario():
+            cola = broker.suscribir([CANAL_RRHH])
+            # El hilo de LISTEN tarda en arrancar: se reintenta hasta que escuche
+            for _ in range(20):
+                await asyncio.to_thread(broker.publicar, CANAL_RRHH, {"id": 7})
+                try:
+                    return await asyncio.wait_for(cola.get(), 0.5)
+                except asyncio.TimeoutError:
+                    pass
+
+        self.assertEqual(asyncio.run(escenario()), {"id": 7})
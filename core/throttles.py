@@ -0,0 +1,105 @@
+"""
+Límites de intentos para login y activación de cuentas (ventana deslizante).
+
+Cada legajo y cada IP pueden gastar "intentos" por ventana de "segundos".
+No es un token bucket: el balde es un par (fichas, última recarga) que hay que
+leer, recalcular y volver a escribir, y la API de caché de Django no ofrece
+una escritura condicional para hacerlo atómico sin scripts propios de Redis;
+con get/set dos workers gastaban la misma ficha. Un contador por ventana sí se
+lleva con add/incr, que son atómicos (LocMem, Redis y Memcached): una ráfaga
+en paralelo no puede gastar dos veces el mismo intento. Si se pasó del
+límite, DRF corta el request en initial() y nunca llega a authenticate():
+rechazar cuesta dos operaciones de caché, no un hash PBKDF2.
+
+La IP es la que DRF obtiene con REST_FRAMEWORK["NUM_PROXIES"]: sin proxies
+propios delante, REMOTE_ADDR (un X-Forwarded-For inventado no abre otra cuenta).
+"""
+
+import time
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.throttling import BaseThrottle
+
+
+class VentanaDeslizanteThrottle(BaseThrottle):
+    """
+    Contador por ventana fija guardado en la caché, más la ventana anterior
+    pesada por lo que queda de ella (aproxima una ventana deslizante sin ráfagas
+    dobles en el borde).
+    """
+
+    scope = None  # Clave en settings.LIMITES_ACCESO
+
+    def __init__(self):
+        limite = settings.LIMITES_ACCESO[self.scope]
+        self.intentos = limite["intentos"]
+        self.ventana = float(limite["segundos"])
+        self.espera = None
+
+    def get_cache_key(self, request, view):
+        raise NotImplementedError
+
+    def allow_request(self, request, view):
+        clave = self.get_cache_key(request, view)
+        if clave is None:
+            return True
+
+        ahora = time.time()
+        numero = int(ahora // self.ventana)
+        transcurrido = (ahora % self.ventana) / self.ventana
+        actual = f"{clave}:{numero}"
+
+        anteriores = cache.get(f"{clave}:{numero - 1}", 0)
+        usados = self._sumar(actual)
+        estimado = anteriores * (1 - transcurrido) + usados
+        if estimado <= self.intentos:
+            return True
+
+        # Rechazado: devolvemos la ficha para que insistir no alargue el castigo
+        cache.decr(actual)
+        restante = (1 - transcurrido) * self.ventana
+        exceso = estimado - self.intentos
+        self.espera = min(restante, exceso * self.ventana / anteriores) if anteriores else restante
+        return False
+
+    def _sumar(self, clave):
+        vida = int(self.ventana * 2) + 1  # La ventana anterior se sigue leyendo
+        cache.add(clave, 0, vida)
+        try:
+            return cache.incr(clave)
+        except ValueError:  # Venció justo entre add e incr
+            cache.set(clave, 1, vida)
+            return 1
+
+    def wait(self):
+        return self.espera
+
+
+class PorIPThrottle(VentanaDeslizanteThrottle):
+    def get_cache_key(self, request, view):
+        return f"limite:{self.scope}:ip:{self.get_ident(request)}"
+
+
+class PorLegajoThrottle(VentanaDeslizanteThrottle):
+    def get_cache_key(self, request, view):
+        legajo = str(request.data.get("legajo", "")).strip()
+        if not legajo:
+            return None  # Sin legajo el request falla igual (400) y lo cuenta la IP
+        return f"limite:{self.scope}:legajo:{legajo[:20]}"
+
+
+class LoginIPThrottle(PorIPThrottle):
+    scope = "login_ip"
+
+
+class LoginLegajoThrottle(PorLegajoThrottle):
+    scope = "login_legajo"
+
+
+class ActivacionIPThrottle(PorIPThrottle):
+    scope = "activacion_ip"
+
+
+class ActivacionLegajoThrottle(PorLegajoThrottle):
+    scope = "activacion_legajo"
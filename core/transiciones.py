@@ -0,0 +1,116 @@
+"""
+Motor de transiciones de estado de las Solicitudes.
+
+Cada cambio de estado se aplica como un UPDATE condicional:
+    UPDATE solicitud SET estado = <nuevo> WHERE id = <id> AND estado = <esperado>
+Si otro operador se adelantó, el UPDATE no toca ninguna fila y devolvemos
+un conflicto (409) en lugar de duplicar PDFs o emails. No se usan locks.
+"""
+
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException, ValidationError
+
+from .cola_rrhh import sin_lease_ajeno
+from .historial import registrar_cambio
+from .models import Solicitud
+from .pendientes import mover
+
+# Grafo de estados: desde qué estado se puede pasar a cuáles
+TRANSICIONES = {
+    "PENDIENTE_VALIDACION": {"AVISO_CONFIRMADO", "AVISO_NEGADO"},  # Decide el Jefe
+    "AVISO_CONFIRMADO": {"APROBADO", "IMPACTADO", "RECHAZADO"},  # Decide RRHH
+    "AVISO_NEGADO": {"APROBADO", "IMPACTADO", "RECHAZADO"},  # Decide RRHH
+    "APROBADO": {"IMPACTADO", "RECHAZADO"},
+    "IMPACTADO": set(),  # Final
+    "RECHAZADO": set(),  # Final
+}
+
+# Único estado desde el que el agente puede borrar su solicitud
+ESTADO_BORRABLE = "PENDIENTE_VALIDACION"
+ESTADO_ELIMINADA = "ELIMINADA"  # Solo aparece en el historial
+
+# Lo único que puede viajar junto con un cambio de estado. El resto (fechas,
+# días, tipo, jefe...) se edita aparte: el UPDATE condicional no recalcula
+# fecha_fin ni vuelve a chequear superposiciones.
+CAMPOS_TRANSICION = {"motivo_rechazo"}
+
+LA_TIENE_OTRO = "⚠️ Otro operador de RRHH tiene reclamada esta solicitud. Recargue la bandeja."
+
+
+class ConflictoDeEstado(APIException):
+    status_code = status.HTTP_409_CONFLICT
+    default_detail = "⚠️ La solicitud fue modificada por otra persona. Recargue la bandeja."
+    default_code = "conflicto_estado"
+
+
+def validar_transicion(actual, nuevo):
+    if nuevo not in TRANSICIONES.get(actual, set()):
+        raise ValidationError(
+            {"estado": f"⛔ No se puede pasar de '{actual}' a '{nuevo}'."}
+        )
+
+
+def aplicar_transicion(solicitud, nuevo_estado, operador=None, **campos):
+    """
+    Pasa la solicitud de su estado actual (el que leímos) a nuevo_estado.
+    'campos' se guardan en el mismo UPDATE (solo CAMPOS_TRANSICION; los demás
+    se aceptan si no cambian). Si otro operador de RRHH la tiene reclamada
+    (lease vigente) tampoco se aplica. Devuelve la misma instancia actualizada
+    o lanza ConflictoDeEstado.
+    """
+    esperado = solicitud.estado
+    validar_transicion(esperado, nuevo_estado)
+
+    otros = {nombre for nombre in campos if nombre not in CAMPOS_TRANSICION}
+    for nombre in otros:
+        if campos[nombre] != getattr(solicitud, nombre):
+            raise ValidationError(
+                {nombre: "⛔ No se puede modificar junto con el estado. Envíe el cambio por separado."}
+            )
+    campos = {nombre: valor for nombre, valor in campos.items() if nombre not in otros}
+
+    ahora = timezone.now()
+    # Al resolverla se libera de la cola de RRHH (si estaba reclamada)
+    campos.setdefault("reclamada_por", None)
+    campos.setdefault("reclamada_hasta", None)
+
+    with transaction.atomic():
+        filas = Solicitud.objects.filter(
+            sin_lease_ajeno(ahora, operador), pk=solicitud.pk, estado=esperado
+        ).update(estado=nuevo_estado, actualizado=ahora, **campos)
+        if filas == 0:
+            if Solicitud.objects.filter(pk=solicitud.pk, estado=esperado).exists():
+                raise ConflictoDeEstado(LA_TIENE_OTRO)
+            raise ConflictoDeEstado()
+        registrar_cambio(solicitud, esperado, nuevo_estado, ahora)
+        jefe = solicitud.jefe_seleccionado_id
+        mover((esperado, jefe), (nuevo_estado, jefe))
+
+    # Reflejamos en memoria lo que quedó en la base (sin volver a consultar)
+    solicitud.estado = nuevo_estado
+    solicitud.actualizado = ahora
+    for nombre, valor in campos.items():
+        setattr(solicitud, nombre, valor)
+    return solicitud
+
+
+def eliminar_si_pendiente(solicitud):
+    """Borrado lógico condicional: solo si nadie la tocó todavía."""
+    ahora = timezone.now()
+    with transaction.atomic():
+        filas = Solicitud.objects.filter(pk=solicitud.pk, estado=ESTADO_BORRABLE).update(
+            eliminada_en=ahora, actualizado=ahora
+        )
+        if filas == 0:
+            raise ConflictoDeEstado(
+                "⛔ La solicitud ya fue procesada y no se puede eliminar. Comuníquese con RRHH."
+            )
+        registrar_cambio(solicitud, ESTADO_BORRABLE, ESTADO_ELIMINADA, ahora)
+        mover((ESTADO_BORRABLE, solicitud.jefe_seleccionado_id), None)
+
+    solicitud.eliminada_en = ahora
+    solicitud.actualizado = ahora
+    return solicitud
+
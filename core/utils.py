@@ -1,27 +1,21 @@
-import os
-from django.conf import settings
-from django.template.loader import render_to_string
-from django.utils import timezone
-from weasyprint import HTML
+import logging
 
+from .legajo import actualizar_legajo
 
-def generar_pdf_legajo(solicitud):
-    try:
-        context = {"solicitud": solicitud, "fecha_aprobacion": timezone.now()}
-        html_string = render_to_string("core/pdf_solicitud.html", context)
-
-        # Ruta: media/legajos/{legajo}/{año}/
-        legajo_str = str(solicitud.agente.legajo)
-        anio_str = str(solicitud.fecha_inicio.year)
-        path_legajo = os.path.join(settings.MEDIA_ROOT, "legajos", legajo_str, anio_str)
-        os.makedirs(path_legajo, exist_ok=True)
+logger = logging.getLogger(__name__)
 
-        nombre_archivo = f"solicitud_{solicitud.id}_{solicitud.tipo.codigo}.pdf"
-        ruta_completa = os.path.join(path_legajo, nombre_archivo)
 
-        HTML(string=html_string).write_pdf(ruta_completa)
-        print(f"📄 PDF Generado: {ruta_completa}")
+def generar_pdf_legajo(solicitud):
+    """Suma la solicitud aprobada al legajo anual del agente (ver core/legajo.py)."""
+    try:
+        legajo, agregadas = actualizar_legajo(
+            solicitud.agente, solicitud.fecha_inicio.year, [solicitud]
+        )
+        logger.info(
+            "Legajo anual actualizado",
+            extra={"solicitud": solicitud.id, "ruta": legajo.archivo, "agregadas": agregadas},
+        )
         return True
-    except Exception as e:
-        print(f"❌ Error PDF: {e}")
+    except Exception:
+        logger.exception("Error al generar PDF", extra={"solicitud": solicitud.id})
         return False
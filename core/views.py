@@ -1,27 +1,89 @@
 from rest_framework import viewsets
-from .models import Agente, TipoLicencia, Solicitud
+from .models import Agente, LoteDescuento, TipoLicencia, Solicitud, SolicitudArchivada
 from .serializers import (
     AgenteSerializer,
     TipoLicenciaSerializer,
     SolicitudSerializer,
+    SolicitudLoteSerializer,
+    datos_formulario,
+    filas_solicitudes,
     ActivacionPaso1Serializer,
     ActivacionPaso2Serializer,
 )
 from django.core.mail import send_mail
 from django.conf import settings
 import csv
-from django.http import HttpResponse
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.core.handlers.asgi import ASGIRequest
 from django.core.signing import TimestampSigner
 from django.contrib.auth.models import User
 from django.contrib.auth import authenticate
+from rest_framework.exceptions import NotFound, Throttled, ValidationError
+from rest_framework.renderers import JSONRenderer
+from .throttles import (
+    ActivacionIPThrottle,
+    ActivacionLegajoThrottle,
+    LoginIPThrottle,
+    LoginLegajoThrottle,
+)
 from .utils import generar_pdf_legajo
+from . import cola_rrhh, pendientes
+from contextlib import contextmanager
+from django.db import IntegrityError, transaction
+from .archivo import primer_anio_vivo
+from .avisos import avisar_jefe, avisar_jefe_lote
+from .busqueda import buscar_agentes
+from .descuentos import filas_lote, generar_lote
+from .idempotencia import idempotente
+from .reloj import ausencias_sin_justificar
+from .replica import LecturaEnReplicaMixin, alias_lectura
+from .historial import AGRUPACIONES, ETAPAS, registrar_cambio, reporte_sla
+from .transiciones import ESTADO_BORRABLE, aplicar_transicion, eliminar_si_pendiente
+import asyncio
+import logging
+from django.http import Http404, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.core.cache import cache
+from django.db.models import Max
+from django.utils.http import quote_etag
+import hashlib
+import heapq
+from operator import itemgetter
+from datetime import date, timedelta
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from .eventos import (
+    CANAL_RRHH,
+    ESTADOS_RRHH,
+    canal_jefe,
+    formatear_sse,
+    get_broker,
+    notificar_solicitud,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@contextmanager
+def guardia_superposicion():
+    """
+    Si dos cargas simultáneas pasan la validación, la restricción EXCLUDE de
+    PostgreSQL frena a la segunda: la convertimos en el mismo error 400.
+    """
+    try:
+        yield
+    except IntegrityError as e:
+        if "solicitud_sin_superposicion" not in str(e):
+            raise
+        raise ValidationError(
+            {"fecha_inicio": "⚠️ Ya existe una solicitud activa que cubre alguna de estas fechas."}
+        )
 
 
 # Vista para ver/editar Agentes
-class AgenteViewSet(viewsets.ModelViewSet):
+class AgenteViewSet(LecturaEnReplicaMixin, viewsets.ModelViewSet):
     serializer_class = AgenteSerializer
+    acciones_en_replica = ("list", "retrieve", "buscar", "ausencias")
 
     def get_queryset(self):
         # Empezamos con todos los agentes
@@ -37,7 +99,17 @@ class AgenteViewSet(viewsets.ModelViewSet):
 
         return queryset
 
-    @action(detail=False, methods=["post"])
+    def throttled(self, request, wait):
+        # Mensaje en castellano para el frontend (429)
+        raise Throttled(
+            wait, detail="⛔ Demasiados intentos. Espere unos segundos y vuelva a probar."
+        )
+
+    @action(
+        detail=False,
+        methods=["post"],
+        throttle_classes=[ActivacionIPThrottle, ActivacionLegajoThrottle],
+    )
     def validar_identidad(self, request):
         """Paso 1: Recibe Legajo+DNI+Fecha. Retorna un Token Temporal."""
         serializer = ActivacionPaso1Serializer(data=request.data)
@@ -64,7 +136,7 @@ class AgenteViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=400)
 
-    @action(detail=False, methods=["post"])
+    @action(detail=False, methods=["post"], throttle_classes=[ActivacionIPThrottle])
     def activar_cuenta(self, request):
         """Paso 2: Recibe Token+Clave. Crea el Usuario Django y activa."""
         serializer = ActivacionPaso2Serializer(data=request.data)
@@ -98,7 +170,11 @@ class AgenteViewSet(viewsets.ModelViewSet):
 
         return Response(serializer.errors, status=400)
 
-    @action(detail=False, methods=["post"])
+    @action(
+        detail=False,
+        methods=["post"],
+        throttle_classes=[LoginIPThrottle, LoginLegajoThrottle],
+    )
     def login(self, request):
         """Recibe Legajo y Password/PIN. Valida contra Django Auth con mensajes inteligentes."""
         legajo = request.data.get("legajo")
@@ -150,6 +226,74 @@ class AgenteViewSet(viewsets.ModelViewSet):
                 # CASO C: El legajo ni siquiera existe en la base de datos
                 return Response({"error": "⛔ Legajo no encontrado."}, status=404)
 
+    @action(detail=False, methods=["get"])
+    def buscar(self, request):
+        """
+        Buscador para RRHH: ?q=gonzales (apellido, nombre o legajo; tolera tildes
+        y errores de tipeo). Devuelve hasta ?limite= agentes (máx. 50).
+        """
+        try:
+            limite = min(max(int(request.query_params.get("limite", 20)), 1), 50)
+        except ValueError:
+            return Response({"error": "limite debe ser un número"}, status=400)
+
+        return Response(buscar_agentes(request.query_params.get("q", ""), limite))
+
+    @action(detail=True, methods=["get"])
+    def formulario(self, request, pk=None):
+        """
+        Todo lo que necesita NuevaSolicitud.vue en un solo viaje: catálogo de licencias,
+        perfil, jefes posibles y cupos usados. Se guarda en caché por agente y la versión
+        es la última modificación de sus solicitudes (si carga o borra una, se recalcula).
+        Con If-None-Match el navegador recibe un 304 sin cuerpo.
+        """
+        # Antes de tocar la base: un id que no es número (o no entra en un bigint) es un 404
+        try:
+            agente_id = int(pk)
+        except ValueError:
+            agente_id = 0
+        if not 0 < agente_id < 2**63:
+            raise NotFound("Agente no encontrado.")
+        version = Solicitud.todas.filter(agente_id=agente_id).aggregate(v=Max("actualizado"))["v"]
+        clave = f"formulario:{agente_id}:{version.timestamp() if version else 0}"
+
+        guardado = cache.get(clave)
+        if guardado is None:
+            try:
+                datos = datos_formulario(agente_id)
+            except Agente.DoesNotExist:
+                raise NotFound("Agente no encontrado.")
+            contenido = JSONRenderer().render(datos)
+            guardado = (quote_etag(hashlib.md5(contenido).hexdigest()), datos)
+            cache.set(clave, guardado, getattr(settings, "FORMULARIO_CACHE_SEGUNDOS", 300))
+
+        etag, datos = guardado
+        if etag in request.headers.get("If-None-Match", ""):
+            response = HttpResponseNotModified()
+        else:
+            response = Response(datos)
+        response["ETag"] = etag
+        # Privado (datos personales): el navegador revalida siempre con el ETag
+        response["Cache-Control"] = "private, no-cache"
+        return response
+
+    @action(detail=False, methods=["get"])
+    def ausencias(self, request):
+        """
+        /api/agentes/ausencias/?desde=2026-03-01&hasta=2026-03-31&area=
+        Días hábiles sin marcación en el reloj ni solicitud aprobada, por área.
+        """
+        try:
+            desde = parse_date(request.query_params.get("desde") or "")
+            hasta = parse_date(request.query_params.get("hasta") or "")
+            area = int(request.query_params.get("area") or 0) or None
+        except ValueError:
+            desde = hasta = None
+        if not desde or not hasta:
+            return Response({"error": "Indique desde y hasta (AAAA-MM-DD)"}, status=400)
+
+        return Response(ausencias_sin_justificar(desde, hasta, area))
+
 
 # Vista para ver/editar Tipos de Licencia
 class TipoLicenciaViewSet(viewsets.ModelViewSet):
@@ -158,13 +302,22 @@ class TipoLicenciaViewSet(viewsets.ModelViewSet):
 
 
 # Vista para ver/editar Solicitudes
-class SolicitudViewSet(viewsets.ModelViewSet):
+class SolicitudViewSet(LecturaEnReplicaMixin, viewsets.ModelViewSet):
     serializer_class = SolicitudSerializer
+    acciones_en_replica = ("list", "retrieve", "exportar_excel", "sla", "descuentos")
+
+    def lectura_en_replica(self, request):
+        # ?since= no: el cursor se toma con la hora de la primaria y una réplica
+        # atrasada más que DELTA_SYNC_MARGEN haría perder cambios para siempre.
+        return super().lectura_en_replica(request) and "since" not in request.query_params
 
     def get_queryset(self):
         # Ordenamos por fecha de inicio (las más nuevas primero)
         queryset = Solicitud.objects.all().order_by("-fecha_inicio")
+        return self._filtrar_estado(self._filtrar_alcance(queryset))
 
+    def _filtrar_alcance(self, queryset):
+        """Filtros de "dueño" de la bandeja (agente o jefe)."""
         # Filtramos por el ID del agente si viene en la URL
         agente_id = self.request.query_params.get("agente")
 
@@ -174,30 +327,152 @@ class SolicitudViewSet(viewsets.ModelViewSet):
         # Filtro 2: Solicitudes que me enviaron a mí (Soy jefe)
         jefe_id = self.request.query_params.get("jefe")
         if jefe_id:
-            # Solo me interesan los que están esperando MI validación
+            queryset = queryset.filter(jefe_seleccionado=jefe_id)
+
+        # Filtro 3: Un año puntual (?anio=2024), también de los ya archivados
+        anio = self.request.query_params.get("anio", "")
+        if anio.isdigit():
+            anio = int(anio)
             queryset = queryset.filter(
-                jefe_seleccionado=jefe_id, estado="PENDIENTE_VALIDACION"
+                fecha_inicio__gte=date(anio, 1, 1), fecha_inicio__lt=date(anio + 1, 1, 1)
             )
+
+        return queryset
+
+    def _filtrar_estado(self, queryset):
+        """Filtros de estado que definen qué se ve en cada bandeja."""
+        if self.request.query_params.get("jefe"):
+            # Solo me interesan los que están esperando MI validación
+            queryset = queryset.filter(estado="PENDIENTE_VALIDACION")
+
         # si la url dice ?modo_rrhh=true, devolvemos todo lo confirmado
         modo_rrhh = self.request.query_params.get("modo_rrhh")
         if modo_rrhh == "true":
-            queryset = queryset.filter(
-                estado__in=[
-                    "AVISO_CONFIRMADO",
-                    "AVISO_NEGADO",
-                    "APROBADO",
-                    "IMPACTADO",
-                    "RECHAZADO_RRHH",
-                    "RECHAZADO",
-                ]
-            )
+            queryset = queryset.filter(estado__in=ESTADOS_RRHH)
 
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        # Si viene ?since=<cursor> devolvemos solo lo que cambió
+        if "since" in request.query_params:
+            return self._listar_cambios(request.query_params.get("since"))
+
+        # Listado de solo lectura: filas directo desde .values_list()
+        return Response(self._filas_con_archivo())
+
+    def _filas_con_archivo(self):
+        filas = filas_solicitudes(self.get_queryset(), self.request)
+        if self._incluye_archivo():
+            # Van después: los años archivados son todos anteriores a los vivos
+            archivadas = SolicitudArchivada.objects.order_by("-fecha_inicio")
+            filas += filas_solicitudes(
+                self._filtrar_estado(self._filtrar_alcance(archivadas)), self.request
+            )
+        return filas
+
+    def _incluye_archivo(self):
+        """
+        Los años cerrados se suman solo en listados acotados a un agente o a un
+        año pasado. La bandeja del jefe muestra un estado que no se archiva; la de
+        RRHH sí (IMPACTADO/RECHAZADO) cuando se pide un año cerrado.
+        """
+        params = self.request.query_params
+        if params.get("jefe"):
+            return False
+        anio = params.get("anio", "")
+        if anio.isdigit():
+            return int(anio) < primer_anio_vivo()
+        return bool(params.get("agente"))
+
+    def retrieve(self, request, *args, **kwargs):
+        try:
+            return super().retrieve(request, *args, **kwargs)
+        except Http404:
+            # Puede estar en el archivo (solo lectura: no se edita ni se borra)
+            pk = kwargs["pk"]
+            if not pk.isdigit():
+                raise
+            filas = filas_solicitudes(SolicitudArchivada.objects.filter(pk=pk), request)
+            if not filas:
+                raise
+            return Response(filas[0])
+
+    # Altas y cambios de estado aceptan Idempotency-Key: un reintento con la
+    # misma clave devuelve la respuesta original sin repetir PDF ni emails.
+    @idempotente
+    def create(self, request, *args, **kwargs):
+        return super().create(request, *args, **kwargs)
+
+    @idempotente
+    def update(self, request, *args, **kwargs):
+        return super().update(request, *args, **kwargs)
+
+    def _listar_cambios(self, since):
+        """
+        Sincronización incremental de bandejas.
+        - cambios: filas nuevas o modificadas que HOY pertenecen a la bandeja.
+        - eliminadas: IDs a quitar (borradas o que ya no cumplen el filtro,
+          ej: el jefe la validó y salió de su bandeja).
+        - cursor: valor a enviar en el próximo ?since=
+        Con since vacío se devuelve la bandeja completa y el cursor inicial.
+        """
+        # Tomamos el cursor ANTES de consultar: lo que se confirme durante la
+        # consulta aparecerá en la próxima llamada.
+        nuevo_cursor = timezone.now()
+
+        if since:
+            desde = parse_datetime(since)
+            if desde is None:
+                return Response({"since": "Cursor inválido."}, status=400)
+            # Margen para transacciones que se confirmaron con un timestamp anterior
+            desde -= timedelta(seconds=getattr(settings, "DELTA_SYNC_MARGEN", 2))
+
+            tocadas = self._filtrar_alcance(
+                Solicitud.todas.filter(actualizado__gt=desde)
+            )
+            vigentes = self._filtrar_estado(tocadas.filter(eliminada_en__isnull=True))
+
+            cambios = filas_solicitudes(vigentes.order_by("-fecha_inicio"), self.request)
+            ids_vigentes = {fila["id"] for fila in cambios}
+            eliminadas = [
+                pk for pk in tocadas.values_list("id", flat=True) if pk not in ids_vigentes
+            ]
+
+            # Las que pasaron al archivo: si este listado incluye el archivo siguen
+            # siendo cambios; si no, hay que quitarlas de la bandeja.
+            archivadas = self._filtrar_alcance(
+                SolicitudArchivada.objects.filter(actualizado__gt=desde)
+            )
+            if self._incluye_archivo():
+                movidas = filas_solicitudes(
+                    self._filtrar_estado(archivadas).order_by("-fecha_inicio"), self.request
+                )
+                cambios += movidas
+                ids_vigentes.update(fila["id"] for fila in movidas)
+            eliminadas += [
+                pk for pk in archivadas.values_list("id", flat=True) if pk not in ids_vigentes
+            ]
+        else:
+            cambios = self._filas_con_archivo()
+            eliminadas = []
+
+        return Response(
+            {
+                # Formato UTC con "Z": viaja en la URL sin escapar el "+"
+                "cursor": nuevo_cursor.strftime("%Y-%m-%dT%H:%M:%S.%fZ"),
+                "cambios": cambios,
+                "eliminadas": eliminadas,
+            }
+        )
+
     # NUEVO: Interceptamos el guardado para mandar mail
     def perform_create(self, serializer):
-        # 1. Guardamos la solicitud
-        solicitud = serializer.save()
+        # 1. Guardamos la solicitud (y su primera fila de historial)
+        with guardia_superposicion(), transaction.atomic():
+            solicitud = serializer.save()
+            registrar_cambio(solicitud, None, solicitud.estado, solicitud.fecha_solicitud)
+            pendientes.mover(None, (solicitud.estado, solicitud.jefe_seleccionado_id))
+        notificar_solicitud(solicitud, "nueva")
 
         # 2. Preparamos el email
         jefe = solicitud.jefe_seleccionado
@@ -205,7 +480,7 @@ class SolicitudViewSet(viewsets.ModelViewSet):
 
         asunto = f"NUEVO AVISO: {agente.apellido} cargó una solicitud"
         mensaje = f"""
-        Hola {jefe.nombre},
+        Hola {jefe.nombre if jefe else ""},
         
         El agente {agente.nombre} {agente.apellido} (Legajo {agente.legajo}) ha cargado un aviso de ausencia.
         
@@ -216,25 +491,91 @@ class SolicitudViewSet(viewsets.ModelViewSet):
         Por favor, ingrese al sistema para validar si fue avisado en tiempo y forma.
         """
 
-        # 3. Enviamos (Esto saldrá en tu terminal negra)
-        if jefe and jefe.email:
-            print(f"--- INTENTANDO ENVIAR MAIL A {jefe.email} ---")
-            send_mail(
-                asunto,
-                mensaje,
-                settings.EMAIL_HOST_USER,
-                [jefe.email],
-                fail_silently=False,
+        # 3. Enviamos ya o lo dejamos para el resumen del jefe (según su preferencia).
+        # La solicitud ya está guardada: si el SMTP falla, el alta no debe fallar
+        # (un reintento con la misma Idempotency-Key la volvería a crear).
+        try:
+            avisar_jefe(jefe, solicitud, "NUEVA", asunto, mensaje)
+        except Exception:
+            logger.exception("Error avisando al jefe", extra={"solicitud": solicitud.pk})
+
+    @action(detail=False, methods=["post"])
+    @idempotente
+    def lote(self, request):
+        """
+        Varias fechas sueltas en un solo envío:
+        {"agente", "tipo", "jefe_seleccionado", "fechas": ["2026-03-02", ...], "dias", "motivo"}
+        Se guardan todas o ninguna, y el Jefe recibe un solo aviso.
+        """
+        serializer = SolicitudLoteSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+
+        with guardia_superposicion(), transaction.atomic():
+            solicitudes = serializer.save()
+        for solicitud in solicitudes:
+            notificar_solicitud(solicitud, "nueva")
+
+        jefe = serializer.validated_data["jefe_seleccionado"]
+        agente = serializer.validated_data["agente"]
+        fechas = ", ".join(f"{s.fecha_inicio:%d/%m/%Y}" for s in solicitudes)
+
+        asunto = f"NUEVO AVISO: {agente.apellido} cargó {len(solicitudes)} solicitudes"
+        mensaje = f"""
+        Hola {jefe.nombre},
+        
+        El agente {agente.nombre} {agente.apellido} (Legajo {agente.legajo}) ha cargado avisos de ausencia.
+        
+        Tipo: {solicitudes[0].tipo.descripcion}
+        Fechas: {fechas}
+        Motivo: {solicitudes[0].motivo}
+        
+        Por favor, ingrese al sistema para validar si fue avisado en tiempo y forma.
+        """
+        try:
+            avisar_jefe_lote(jefe, solicitudes, "NUEVA", asunto, mensaje)
+        except Exception:
+            logger.exception(
+                "Error avisando al jefe", extra={"solicitudes": [s.pk for s in solicitudes]}
             )
 
+        creadas = Solicitud.objects.filter(pk__in=[s.pk for s in solicitudes]).order_by("fecha_inicio")
+        return Response(filas_solicitudes(creadas, request), status=201)
+
     def perform_update(self, serializer):
         """
         Se ejecuta cuando RRHH o un Jefe actualiza una solicitud.
         Envía emails automáticos según el nuevo estado.
         """
         # 1. Guardar los cambios
-        instance = serializer.save()
+        estado_anterior = serializer.instance.estado
+        nuevo_estado = serializer.validated_data.get("estado", estado_anterior)
+
+        if nuevo_estado != estado_anterior:
+            # Cambio de estado: UPDATE condicional. Si otro operador se adelantó,
+            # sale un 409 y NO se genera PDF ni email por segunda vez.
+            campos = {
+                k: v for k, v in serializer.validated_data.items() if k != "estado"
+            }
+            # RRHH manda su "operador": con eso puede resolver lo que tiene reclamado
+            instance = aplicar_transicion(
+                serializer.instance,
+                nuevo_estado,
+                operador=self._operador_rrhh(self.request),
+                **campos,
+            )
+        else:
+            jefe_anterior = serializer.instance.jefe_seleccionado_id
+            with guardia_superposicion(), transaction.atomic():
+                instance = serializer.save()
+                if instance.jefe_seleccionado_id != jefe_anterior:
+                    # Cambió de jefe: la solicitud pasa de una bandeja a la otra
+                    pendientes.mover(
+                        (instance.estado, jefe_anterior),
+                        (instance.estado, instance.jefe_seleccionado_id),
+                    )
+
         agente = instance.agente
+        notificar_solicitud(instance, "actualizada", estado_anterior)
 
         # 2. Preparar variables para el email
         asunto = None
@@ -244,7 +585,6 @@ class SolicitudViewSet(viewsets.ModelViewSet):
 
         # CASO A: SOLICITUD APROBADA (Impactada en el sistema)
         if instance.estado == "IMPACTADO":
-            print("🖨️ Generando PDF de respaldo...")
             generar_pdf_legajo(instance)
 
             asunto = f"✅ Solicitud Aprobada: {instance.tipo.descripcion}"
@@ -309,14 +649,7 @@ class SolicitudViewSet(viewsets.ModelViewSet):
 
         # 4. ENVIAR EL EMAIL (si corresponde)
         if asunto and mensaje and agente.email:
-            print(f"\n{'=' * 60}")
-            print("📧 ENVIANDO EMAIL")
-            print(f"{'=' * 60}")
-            print(f"Para: {agente.email}")
-            print(f"Asunto: {asunto}")
-            print(f"Estado de la solicitud: {instance.estado}")
-            print(f"{'=' * 60}\n")
-
+            datos_log = {"solicitud": instance.pk, "estado": instance.estado, "para": agente.email}
             try:
                 send_mail(
                     asunto,
@@ -325,19 +658,14 @@ class SolicitudViewSet(viewsets.ModelViewSet):
                     [agente.email],
                     fail_silently=False,
                 )
-                print("✅ ¡Email enviado correctamente!\n")
-            except Exception as e:
-                print(f"❌ Error al enviar email: {e}\n")
-        else:
-            # Debug: ¿Por qué no se envió?
-            if not asunto:
-                print(
-                    f"ℹ️  No se envió email - Estado '{instance.estado}' no requiere notificación"
-                )
-            elif not agente.email:
-                print(
-                    f"⚠️  No se envió email - Agente {agente.legajo} no tiene email configurado"
-                )
+                logger.info("Email enviado al agente", extra=datos_log)
+            except Exception:
+                logger.exception("Error al enviar email al agente", extra=datos_log)
+        elif asunto and not agente.email:
+            logger.warning(
+                "No se envió email: el agente no tiene email configurado",
+                extra={"solicitud": instance.pk, "legajo": agente.legajo},
+            )
 
     # Función para manejo de borrado de solicitud
     def destroy(self, request, *args, **kwargs):
@@ -346,14 +674,17 @@ class SolicitudViewSet(viewsets.ModelViewSet):
 
         # 2. VERIFICACIÓN DE SEGURIDAD
         # Solo permitimos borrar si el Jefe todavía no la tocó (Pendiente)
-        if instance.estado != "PENDIENTE_VALIDACION":
-            # Importar ValidationError de rest_framework.exceptions al inicio del archivo si no está
-            from rest_framework.exceptions import ValidationError
-
+        if instance.estado != ESTADO_BORRABLE:
             raise ValidationError(
                 f"⛔ No se puede eliminar esta solicitud porque ya se encuentra en estado '{instance.estado}'. Comuníquese con RRHH."
             )
 
+        # Borrado lógico condicional (WHERE estado = 'PENDIENTE_VALIDACION'):
+        # si el Jefe la validó en este mismo instante, gana él y devolvemos 409.
+        # Dejamos un tombstone para que las bandejas con ?since= se enteren de la baja.
+        eliminar_si_pendiente(instance)
+        notificar_solicitud(instance, "eliminada")
+
         # 3. LÓGICA ANTI-GHOSTING (El punto que planteaste)
         # Si la solicitud tenía un jefe asignado, le avisamos que se canceló.
         jefe = instance.jefe_seleccionado
@@ -374,20 +705,96 @@ class SolicitudViewSet(viewsets.ModelViewSet):
             
             Saludos.
             """
-            print(f"🗑️ Enviando aviso de cancelación a {jefe.email}...")
             try:
-                send_mail(
-                    asunto,
-                    mensaje,
-                    settings.EMAIL_HOST_USER,
-                    [jefe.email],
-                    fail_silently=False,
+                avisar_jefe(jefe, instance, "CANCELADA", asunto, mensaje)
+            except Exception:
+                logger.exception(
+                    "Error enviando aviso de cancelación", extra={"solicitud": instance.pk, "para": jefe.email}
                 )
-            except Exception as e:
-                print(f"Error enviando aviso de cancelación: {e}")
 
-        # 4. Procedemos al borrado físico
-        return super().destroy(request, *args, **kwargs)
+        return Response(status=204)
+
+    # --- COLA DE TRABAJO DE RRHH (Varios operadores en paralelo) ---
+    @action(detail=False, methods=["post"])
+    def reclamar(self, request):
+        """
+        Recibe {operador, cantidad}. Asigna al operador las próximas solicitudes
+        libres de la bandeja de RRHH por RRHH_LEASE_MINUTOS minutos.
+        """
+        operador = self._operador_rrhh(request)
+        if operador is None:
+            return Response({"error": "⛔ Operador de RRHH inválido."}, status=403)
+
+        try:
+            cantidad = int(request.data.get("cantidad", 10))
+        except (TypeError, ValueError):
+            return Response({"cantidad": "Debe ser un número."}, status=400)
+        cantidad = max(1, min(cantidad, 50))
+
+        reclamadas = cola_rrhh.reclamar(operador, cantidad)
+        return Response({"reclamadas": filas_solicitudes(reclamadas, request)})
+
+    @action(detail=False, methods=["post"])
+    def liberar(self, request):
+        """Recibe {operador, ids (opcional)}. Devuelve esas solicitudes a la cola."""
+        operador = self._operador_rrhh(request)
+        if operador is None:
+            return Response({"error": "⛔ Operador de RRHH inválido."}, status=403)
+
+        liberadas = cola_rrhh.liberar(operador, request.data.get("ids"))
+        return Response({"liberadas": liberadas})
+
+    @staticmethod
+    def _operador_rrhh(request):
+        operador_id = request.data.get("operador")
+        if not operador_id:
+            return None
+        return Agente.objects.filter(pk=operador_id, es_rrhh=True).first()
+
+    # --- BADGES DE PENDIENTES (Sin traer la bandeja) ---
+    @action(detail=False, methods=["get"])
+    def pendientes(self, request):
+        """
+        /api/solicitudes/pendientes/?jefe=ID&modo_rrhh=true -> {"jefe": 3, "rrhh": 12}
+        Lee los contadores materializados (core/pendientes.py) de la primaria.
+        """
+        claves = {}
+        jefe_id = request.query_params.get("jefe", "")
+        if jefe_id.isdigit():
+            claves["jefe"] = canal_jefe(jefe_id)
+        if request.query_params.get("modo_rrhh") == "true":
+            claves["rrhh"] = CANAL_RRHH
+
+        if not claves:
+            return Response({"error": "Indique ?jefe=ID o ?modo_rrhh=true"}, status=400)
+
+        cantidades = pendientes.consultar(*claves.values())
+        return Response({nombre: cantidades[clave] for nombre, clave in claves.items()})
+
+    # --- REPORTE DE TIEMPOS (SLA) ---
+    @action(detail=False, methods=["get"])
+    def sla(self, request):
+        """
+        /api/solicitudes/sla/?etapa=jefe|rrhh&agrupar=jefe|area|mes&desde=&hasta=
+        Horas que pasan las solicitudes en cada etapa (promedio y percentiles).
+        """
+        etapa = request.query_params.get("etapa", "jefe")
+        agrupar = request.query_params.get("agrupar", "jefe")
+
+        if etapa not in ETAPAS or agrupar not in AGRUPACIONES:
+            return Response(
+                {"error": f"etapa: {list(ETAPAS)} / agrupar: {list(AGRUPACIONES)}"},
+                status=400,
+            )
+
+        return Response(
+            reporte_sla(
+                etapa=etapa,
+                agrupar=agrupar,
+                desde=request.query_params.get("desde"),
+                hasta=request.query_params.get("hasta"),
+            )
+        )
 
     # Método de Reportes
     @action(
@@ -400,56 +807,170 @@ class SolicitudViewSet(viewsets.ModelViewSet):
 
         # 2. Base de la consulta (Solo cosas Cerradas: Aprobadas o Rechazadas)
         # No nos interesan las pendientes para un reporte de cierre.
-        queryset = Solicitud.objects.filter(
-            estado__in=["IMPACTADO", "RECHAZADO", "RECHAZADO_RRHH"]
-        ).order_by("fecha_inicio")
+        # Años cerrados incluidos: salen de la tabla de archivo (core/archivo.py).
+        # (Atadas a la base elegida ahora: el CSV se lee después de salir de la vista)
+        consultas = []
+        for modelo in (SolicitudArchivada, Solicitud):
+            queryset = modelo.objects.using(alias_lectura()).filter(
+                estado__in=["IMPACTADO", "RECHAZADO", "RECHAZADO_RRHH"]
+            ).order_by("fecha_inicio")
+
+            # 3. Aplicamos el rango de fechas (Si el usuario lo pidió)
+            if fecha_desde and fecha_hasta:
+                queryset = queryset.filter(fecha_inicio__range=[fecha_desde, fecha_hasta])
+            consultas.append(queryset)
+
+        # 4. Escribimos el CSV (Excel) fila por fila, sin armarlo entero en memoria.
+        # Así el middleware de compresión lo comprime a medida que sale.
+        writer = csv.writer(_Eco())
+
+        def filas():
+            # ENCABEZADOS
+            yield writer.writerow(
+                [
+                    "Legajo",
+                    "Apellido",
+                    "Nombre",
+                    "Tipo Licencia",
+                    "Fecha Inicio",
+                    "Fecha Fin",
+                    "Días",
+                    "Estado",
+                    "Motivo Rechazo",
+                    "Observaciones",
+                ]
+            )
 
-        # 3. Aplicamos el rango de fechas (Si el usuario lo pidió)
-        if fecha_desde and fecha_hasta:
-            queryset = queryset.filter(fecha_inicio__range=[fecha_desde, fecha_hasta])
+            # FILAS DE DATOS (Una consulta con JOIN por tabla, leídas por tandas)
+            datos = [
+                queryset.values_list(
+                    "agente__legajo",
+                    "agente__apellido",
+                    "agente__nombre",
+                    "tipo__descripcion",
+                    "fecha_inicio",
+                    "fecha_fin",
+                    "dias",
+                    "estado",
+                    "motivo_rechazo",
+                    "motivo",
+                ).iterator(chunk_size=2000)
+                for queryset in consultas
+            ]
+            # Las dos vienen ordenadas por fecha_inicio: las intercalamos sin reordenar
+            for *columnas, motivo_rechazo, motivo in heapq.merge(*datos, key=itemgetter(4)):
+                # Limpiamos el motivo de rechazo (si es None, ponemos guión)
+                rechazo = motivo_rechazo if motivo_rechazo else "-"
+                motivo_agente = motivo if motivo else "-"
+
+                yield writer.writerow([*columnas, rechazo, motivo_agente])
 
-        # 4. Preparamos la respuesta HTTP tipo "Archivo Adjunto"
-        response = HttpResponse(content_type="text/csv")
+        # 5. Preparamos la respuesta HTTP tipo "Archivo Adjunto"
+        response = StreamingHttpResponse(filas(), content_type="text/csv")
         response["Content-Disposition"] = (
             f'attachment; filename="Reporte_Licencias_{fecha_desde}_al_{fecha_hasta}.csv"'
         )
+        return response
 
-        # 5. Escribimos el CSV (Excel)
-        writer = csv.writer(response)
-
-        # ENCABEZADOS
-        writer.writerow(
-            [
-                "Legajo",
-                "Apellido",
-                "Nombre",
-                "Tipo Licencia",
-                "Fecha Inicio",
-                "Días",
-                "Estado",
-                "Motivo Rechazo",
-                "Observaciones",
-            ]
+    # --- DESCUENTOS PARA LIQUIDACIÓN DE HABERES ---
+    @action(detail=False, methods=["get", "post"])
+    def descuentos(self, request):
+        """
+        POST {"mes": "2026-09"} -> genera el lote del mes (si ya existe, devuelve el mismo).
+        GET ?mes=2026-09        -> descarga el archivo del lote ya generado.
+        """
+        mes = request.data.get("mes") if request.method == "POST" else request.query_params.get("mes")
+        try:
+            anio, numero = (int(parte) for parte in str(mes).split("-"))
+            periodo = date(anio, numero, 1)
+        except ValueError:
+            return Response({"error": "mes debe tener el formato AAAA-MM"}, status=400)
+
+        if request.method == "POST":
+            lote, creado = generar_lote(anio, numero)
+            return Response(
+                {
+                    "periodo": lote.periodo.strftime("%Y-%m"),
+                    "generado": lote.generado,
+                    "nuevo": creado,
+                    "agentes": lote.agentes,
+                    "dias": lote.dias,
+                    "solicitudes": lote.cantidad_solicitudes,
+                    "faltas": lote.dias_faltas,
+                },
+                status=201 if creado else 200,
+            )
+
+        lote = LoteDescuento.objects.filter(periodo=periodo).first()
+        if lote is None:
+            return Response({"error": "El lote de ese mes todavía no se generó."}, status=404)
+
+        writer = csv.writer(_Eco())
+        response = StreamingHttpResponse(
+            (writer.writerow(fila) for fila in filas_lote(lote)), content_type="text/csv"
         )
+        response["Content-Disposition"] = (
+            f'attachment; filename="Descuentos_{lote.periodo:%Y_%m}.csv"'
+        )
+        return response
 
-        # FILAS DE DATOS
-        for soli in queryset:
-            # Limpiamos el motivo de rechazo (si es None, ponemos guión)
-            rechazo = soli.motivo_rechazo if soli.motivo_rechazo else "-"
-            motivo_agente = soli.motivo if soli.motivo else "-"
 
-            writer.writerow(
-                [
-                    soli.agente.legajo,
-                    soli.agente.apellido,
-                    soli.agente.nombre,
-                    soli.tipo.descripcion,
-                    soli.fecha_inicio,
-                    soli.dias,
-                    soli.estado,
-                    rechazo,
-                    motivo_agente,
-                ]
-            )
+class _Eco:
+    """Pseudo-archivo para csv.writer: devuelve la línea en lugar de guardarla."""
+
+    def write(self, valor):
+        return valor
+
+
+# ---------------------------------------------------------
+# STREAM EN TIEMPO REAL PARA BANDEJAS (Server-Sent Events)
+# ---------------------------------------------------------
+# Vista asíncrona: en producción solo esta ruta se sirve con ASGI (uvicorn), el
+# resto de la API sigue en gunicorn; los eventos cruzan de un proceso a otro por
+# el broker compartido (settings.EVENTOS_BROKER). Bajo ASGI cada conexión
+# abierta es solo una corrutina esperando en una cola. Bajo WSGI (gunicorn,
+# runserver) Django la corre con async_to_sync y cada bandeja abierta ocupa un
+# worker entero mientras dure la conexión: fuera de DEBUG se rechaza con 503 y
+# las bandejas siguen funcionando con su botón de actualizar.
+async def stream_eventos(request):
+    """
+    /api/eventos/?jefe=ID      -> Eventos de la bandeja del Jefe
+    /api/eventos/?modo_rrhh=true -> Eventos de la bandeja de RRHH
+    """
+    if not isinstance(request, ASGIRequest) and not settings.DEBUG:
+        return JsonResponse(
+            {"error": "⛔ Los eventos en tiempo real requieren el servidor ASGI."}, status=503
+        )
 
-        return response
+    canales = []
+    jefe_id = request.GET.get("jefe")
+    if jefe_id:
+        canales.append(canal_jefe(jefe_id))
+    if request.GET.get("modo_rrhh") == "true":
+        canales.append(CANAL_RRHH)
+
+    if not canales:
+        return JsonResponse({"error": "Indique ?jefe=ID o ?modo_rrhh=true"}, status=400)
+
+    broker = get_broker()
+    cola = broker.suscribir(canales)
+    intervalo_ping = getattr(settings, "EVENTOS_HEARTBEAT", 15)
+
+    async def generador():
+        try:
+            # El navegador reconecta solo a los 5 segundos si se corta
+            yield "retry: 5000\n\n"
+            while True:
+                try:
+                    evento = await asyncio.wait_for(cola.get(), timeout=intervalo_ping)
+                    yield formatear_sse(evento)
+                except asyncio.TimeoutError:
+                    # Comentario SSE: mantiene viva la conexión a través de proxies
+                    yield ": ping\n\n"
+        finally:
+            broker.desuscribir(canales, cola)
+
+    response = StreamingHttpResponse(generador(), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Evita que nginx acumule el stream
+    return response
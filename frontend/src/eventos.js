@@ -0,0 +1,7 @@
+// Cada evento del stream (SSE) trae "primaria_hasta": la recarga que dispara la
+// reenvía como X-Primaria-Hasta y se lee de la base primaria, que ya tiene el
+// cambio anunciado (la réplica puede estar unos segundos atrasada).
+export function headersDelEvento(evento) {
+  const { primaria_hasta } = JSON.parse(evento.data)
+  return primaria_hasta ? { 'X-Primaria-Hasta': String(primaria_hasta) } : {}
+}
@@ -1,4 +1,23 @@
 import { createApp } from 'vue'
+import axios from 'axios'
 import App from './App.vue'
 
+// Después de una escritura el backend manda X-Primaria-Hasta: lo reenviamos
+// para que las lecturas sigan en la base principal y no en la réplica
+// (que puede estar unos segundos atrasada) hasta que venza.
+let primariaHasta = null
+
+axios.interceptors.response.use((respuesta) => {
+  const hasta = respuesta.headers['x-primaria-hasta']
+  if (hasta) primariaHasta = hasta
+  return respuesta
+})
+
+axios.interceptors.request.use((config) => {
+  if (primariaHasta && Date.now() / 1000 < Number(primariaHasta)) {
+    config.headers['X-Primaria-Hasta'] = primariaHasta
+  }
+  return config
+})
+
 createApp(App).mount('#app')
@@ -0,0 +1,20 @@
+// Envíos con Idempotency-Key: si la red falla, reintentamos con la MISMA clave
+// y el backend devuelve la respuesta del primer intento (sin duplicar nada).
+const REINTENTOS = 3
+
+const esperar = (ms) => new Promise(resolve => setTimeout(resolve, ms))
+
+export async function enviarConReintentos(enviar) {
+  const headers = { 'Idempotency-Key': crypto.randomUUID() }
+
+  for (let intento = 1; ; intento++) {
+    try {
+      return await enviar({ headers })
+    } catch (e) {
+      // Sin respuesta (red caída) o 409 "todavía procesando": vale la pena reintentar
+      const reintentable = !e.response || (e.response.status === 409 && e.response.headers['retry-after'])
+      if (!reintentable || intento >= REINTENTOS) throw e
+      await esperar(1000 * intento)
+    }
+  }
+}